@@ -0,0 +1,6 @@
+"""
+Benchmarks do tratamento, agregação, PNL e exportação.
+
+    python -m benchmarks.rodar                 # compara com benchmarks/baseline.json
+    python -m benchmarks.rodar --salvar-baseline
+"""
@@ -0,0 +1,78 @@
+"""
+Mede o tempo de importação a frio dos módulos do núcleo e dos imports de
+topo de cada app, cada um num processo Python novo.
+
+    python -m benchmarks.importacao [--repeticoes 5]
+
+Para os apps (pnl*.py) só os `import` de topo do script são executados, que
+é o que o Streamlit paga na primeira execução de cada processo. Também lista
+quais dependências pesadas (Streamlit, Plotly Express, escritores de Excel, PyArrow)
+cada alvo arrasta.
+"""
+
+import argparse
+import ast
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+MODULOS = ["nucleo.ingestao", "nucleo.calculo", "nucleo.lote", "graficos"]
+APPS = ["pnl.py", "pnl_2.py", "pnl_3.py", "pnl_4.py"]
+
+PESADOS = ["streamlit", "plotly.express", "xlsxwriter", "openpyxl", "pyarrow"]
+
+_MEDIR = """
+import json, sys, time
+inicio = time.perf_counter()
+exec(compile(sys.argv[1], "<imports>", "exec"))
+segundos = time.perf_counter() - inicio
+print(json.dumps({
+    "segundos": segundos,
+    "pesados": [m for m in %r if m in sys.modules],
+}))
+""" % (PESADOS,)
+
+
+def imports_do_script(caminho):
+    """Código só com os `import` de topo de um script."""
+    arvore = ast.parse(Path(caminho).read_text(encoding="utf-8"))
+    nos = [no for no in arvore.body if isinstance(no, (ast.Import, ast.ImportFrom))]
+    return ast.unparse(ast.Module(body=nos, type_ignores=[]))
+
+
+def medir(codigo, repeticoes):
+    """(mediana em segundos, dependências pesadas carregadas) de `codigo`."""
+    tempos = []
+    pesados = []
+    for _ in range(repeticoes):
+        saida = subprocess.run(
+            [sys.executable, "-c", _MEDIR, codigo],
+            cwd=RAIZ, capture_output=True, text=True, check=True,
+        ).stdout
+        medida = json.loads(saida.strip().splitlines()[-1])
+        tempos.append(medida["segundos"])
+        pesados = medida["pesados"]
+    return statistics.median(tempos), pesados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tempo de importação a frio.")
+    parser.add_argument("--repeticoes", type=int, default=5,
+                        help="processos por alvo; vale a mediana (padrão: 5)")
+    args = parser.parse_args(argv)
+
+    alvos = [(m, f"import {m}") for m in MODULOS]
+    alvos += [(app, imports_do_script(RAIZ / app)) for app in APPS]
+
+    for nome, codigo in alvos:
+        segundos, pesados = medir(codigo, args.repeticoes)
+        print(f"  {nome:<18} {segundos:7.3f}s  {', '.join(pesados) or '-'}", flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""
+Mede tempo e pico de memória de cada etapa (leitura, agregação, filtros,
+PNL e exportação) em bases sintéticas de vários tamanhos e compara com a
+baseline gravada em benchmarks/baseline.json.
+
+    python -m benchmarks.rodar [--tamanhos 10000 100000 1000000]
+                               [--salvar-baseline] [--tolerancia 0.25] [--sem-memoria]
+
+As planilhas geradas ficam em benchmarks/.dados/ para não serem refeitas.
+O pico de memória vem do tracemalloc (alocações Python e NumPy, sem as do
+DuckDB, que tem alocador próprio); como ele
+deixa o código Python bem mais lento, cada etapa roda uma vez sem rastreio
+para medir o tempo e outra com rastreio para medir a memória.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from benchmarks import sintetico
+from nucleo import armazem, consulta_duckdb
+from nucleo.calculo import agregar_assessor_mes, pnl_anual, pnl_mensal
+from nucleo.exportacao import to_excel_bytes
+from nucleo.ingestao import montar_dados, tratar_detalhado, tratar_relatorio_aa
+
+PASTA = Path(__file__).parent
+ARQUIVO_BASELINE = PASTA / "baseline.json"
+PASTA_DADOS = PASTA / ".dados"
+
+TAMANHOS_PADRAO = [10_000, 100_000]
+MESES = tuple(f"2025-{m:02d}" for m in range(1, 13))
+
+# acima disso o xlsx de exportação passa do limite de linhas do Excel
+MAX_LINHAS_EXPORTACAO = 1_000_000
+
+
+def medir(funcao, *args, memoria=True, **kwargs):
+    """(resultado, segundos, pico de memória em MB ou None) de uma chamada."""
+    inicio = time.perf_counter()
+    resultado = funcao(*args, **kwargs)
+    segundos = time.perf_counter() - inicio
+
+    pico = None
+    if memoria:
+        tracemalloc.start()
+        funcao(*args, **kwargs)
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        pico = pico / 1024 / 1024
+
+    return resultado, segundos, pico
+
+
+def planilha(nome, gerar):
+    """Bytes da planilha sintética, gerando e guardando em disco na primeira vez."""
+    caminho = PASTA_DADOS / nome
+    if not caminho.exists():
+        PASTA_DADOS.mkdir(exist_ok=True)
+        caminho.write_bytes(gerar())
+    return caminho.read_bytes()
+
+
+def filtrar(df, assessores):
+    mask = df["Assessor"].isin(assessores) & df["Origem"].isin(["AA", "CORBAN"])
+    return df[mask]
+
+
+def rodar_tamanho(n, memoria=True):
+    """Resultados (etapa -> {segundos, memoria_mb}) para bases com n linhas."""
+    detalhado = planilha(
+        f"detalhado_{n}.xlsx",
+        lambda: sintetico.planilha_detalhada(n, meses=MESES, seed=n),
+    )
+    b2b = planilha(f"b2b_{n}.xlsx", lambda: sintetico.planilha_b2b(n, seed=n))
+
+    etapas = {}
+
+    def registrar(etapa, funcao, *args, **kwargs):
+        resultado, segundos, pico = medir(funcao, *args, memoria=memoria, **kwargs)
+        etapas[etapa] = {"segundos": round(segundos, 4)}
+        texto_memoria = ""
+        if pico is not None:
+            etapas[etapa]["memoria_mb"] = round(pico, 2)
+            texto_memoria = f"{pico:10.1f} MB"
+        print(f"  {etapa:<28} {segundos:9.3f}s {texto_memoria}", flush=True)
+        return resultado
+
+    base = registrar("ingestao_detalhado", tratar_detalhado, detalhado, 0, "sintetico")
+    registrar("ingestao_b2b", tratar_relatorio_aa, b2b, "2025-01-01")
+
+    dados = registrar("agregacao_cubo", montar_dados, [base])
+    cubo = dados["cubo"]
+
+    # cubo a partir do armazém Parquet: tudo no pandas x agregado no DuckDB
+    with tempfile.TemporaryDirectory() as raiz:
+        armazem.gravar_arquivo(raiz, "sintetico", "detalhado", base, {"hash": "sintetico"})
+        registrar(
+            "armazem_cubo_pandas",
+            lambda: montar_dados(armazem.ler_tipo(raiz, "detalhado"))["cubo"],
+        )
+        if consulta_duckdb.disponivel():
+            registrar("armazem_cubo_duckdb", consulta_duckdb.cubo, raiz)
+
+    metade = sorted(cubo["Assessor"].unique())[::2]
+    registrar("filtro_base", filtrar, base, metade)
+    cubo_filtrado = registrar("filtro_cubo", filtrar, cubo, metade)
+
+    df_ass_mes = registrar("agregacao_assessor_mes", agregar_assessor_mes, cubo_filtrado)
+    registrar("pnl_mensal", pnl_mensal, df_ass_mes)
+    registrar("pnl_anual", pnl_anual, df_ass_mes)
+
+    if n <= MAX_LINHAS_EXPORTACAO:
+        registrar("exportacao_xlsx", to_excel_bytes, base)
+
+    return etapas
+
+
+def comparar(atual, baseline, tolerancia):
+    """Lista de regressões de tempo acima da tolerância (fração) em relação à baseline."""
+    regressoes = []
+    for tamanho, etapas in atual.items():
+        for etapa, medida in etapas.items():
+            ref = baseline.get(tamanho, {}).get(etapa)
+            if ref is None or ref["segundos"] <= 0:
+                continue
+            variacao = medida["segundos"] / ref["segundos"] - 1
+            sinal = "+" if variacao >= 0 else ""
+            print(f"  {tamanho:>8} {etapa:<28} {sinal}{variacao*100:6.1f}%")
+            if variacao > tolerancia:
+                regressoes.append((tamanho, etapa, variacao))
+    return regressoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks do PNL com bases sintéticas.")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=TAMANHOS_PADRAO,
+                        help="quantidades de linhas (padrão: 10000 100000)")
+    parser.add_argument("--salvar-baseline", action="store_true",
+                        help="grava os resultados como nova baseline")
+    parser.add_argument("--tolerancia", type=float, default=0.25,
+                        help="piora máxima aceita em relação à baseline (padrão: 0.25)")
+    parser.add_argument("--sem-memoria", action="store_true",
+                        help="não mede o pico de memória (roda cada etapa uma vez só)")
+    args = parser.parse_args(argv)
+
+    resultados = {}
+    for n in args.tamanhos:
+        print(f"{n} linhas:")
+        resultados[str(n)] = rodar_tamanho(n, memoria=not args.sem_memoria)
+
+    if args.salvar_baseline:
+        ARQUIVO_BASELINE.write_text(json.dumps({
+            "python": platform.python_version(),
+            "maquina": platform.machine(),
+            "resultados": resultados,
+        }, indent=1))
+        print(f"Baseline gravada em {ARQUIVO_BASELINE}")
+        return 0
+
+    if not ARQUIVO_BASELINE.exists():
+        print("Sem baseline para comparar (use --salvar-baseline).")
+        return 0
+
+    print("Variação em relação à baseline:")
+    baseline = json.loads(ARQUIVO_BASELINE.read_text())["resultados"]
+    regressoes = comparar(resultados, baseline, args.tolerancia)
+    if regressoes:
+        print(f"{len(regressoes)} etapa(s) mais lentas que a tolerância de "
+              f"{args.tolerancia*100:.0f}%.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
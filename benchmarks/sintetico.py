@@ -0,0 +1,123 @@
+"""
+Gerador de planilhas sintéticas com o layout dos relatórios reais.
+
+- B2B (pnl.py / pnl_2.py): dados nas colunas 5..8 (Assessor, Conta, Receita
+  Líquida, Comissão); para cada assessor uma linha de subtotal com o nome e
+  Conta vazia, seguida das linhas das contas com o assessor em branco
+  (o tratamento preenche para baixo).
+- Detalhado (pnl_3.py / pnl_4.py): linhas de título antes do cabeçalho
+  "Data Receita" e as colunas do RENAME_MAP_DETALHADO.
+"""
+
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+from nucleo.ingestao import CATEGORIAS_CORBAN, RENAME_MAP_DETALHADO
+
+CATEGORIAS_AA = [
+    "RENDA FIXA",
+    "RENDA VARIAVEL",
+    "FUNDOS",
+    "PREVIDENCIA",
+    "SEGUROS",
+    "COE",
+    "OFERTA PUBLICA",
+]
+
+PRODUTOS_POR_CATEGORIA = 6
+
+LINHAS_TITULO = ["Relatório de Receitas Detalhado", "Período: sintético", ""]
+
+
+def assessores(n):
+    return [f"ASSESSOR SINTETICO {i:03d}" for i in range(n)]
+
+
+def base_detalhada(n_linhas, meses=("2025-01",), n_assessores=35, n_contas=None, seed=0):
+    """DataFrame com as colunas originais do relatório detalhado."""
+    rng = np.random.default_rng(seed)
+    n_contas = n_contas or max(n_linhas // 20, 10)
+
+    categorias = np.array(CATEGORIAS_AA + sorted(CATEGORIAS_CORBAN))
+    cat_idx = rng.integers(0, len(categorias), n_linhas)
+    prod_idx = rng.integers(0, PRODUTOS_POR_CATEGORIA, n_linhas)
+
+    inicio_mes = pd.to_datetime([f"{m}-01" for m in meses]).values
+    datas = pd.to_datetime(
+        inicio_mes[rng.integers(0, len(meses), n_linhas)]
+    ) + pd.to_timedelta(rng.integers(0, 28, n_linhas), unit="D")
+
+    contas = rng.integers(100000, 100000 + n_contas, n_linhas)
+    # cada conta pertence a um assessor fixo, como nos relatórios reais
+    nomes = np.array(assessores(n_assessores))
+    assessor_conta = nomes[contas % n_assessores]
+
+    receita_bruta = np.round(rng.gamma(2.0, 150.0, n_linhas), 2)
+    receita_liquida = np.round(receita_bruta * 0.9, 2)
+    comissao = np.round(receita_liquida * rng.uniform(0.2, 0.5, n_linhas), 2)
+
+    colunas = list(RENAME_MAP_DETALHADO)
+    return pd.DataFrame({
+        colunas[0]: datas.strftime("%d/%m/%Y"),
+        colunas[1]: contas,
+        colunas[2]: [f"CLIENTE {c}" for c in contas],
+        colunas[3]: [f"A{c % n_assessores:03d}" for c in contas],
+        colunas[4]: assessor_conta,
+        colunas[5]: categorias[cat_idx],
+        colunas[6]: [f"{categorias[c]} {p}" for c, p in zip(cat_idx, prod_idx)],
+        colunas[7]: [f"ATIVO {p}" for p in prod_idx],
+        colunas[8]: "00.000.000/0001-00",
+        colunas[9]: rng.choice(["CORRETAGEM", "TAXA", "REBATE"], n_linhas),
+        colunas[10]: receita_bruta,
+        colunas[11]: receita_liquida,
+        colunas[12]: comissao,
+    })
+
+
+def planilha_detalhada(n_linhas, aba="Receitas", **kwargs):
+    """Bytes de um .xlsx no layout detalhado (cabeçalho depois das linhas de título)."""
+    df = base_detalhada(n_linhas, **kwargs)
+    buffer = BytesIO()
+    with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
+        pd.DataFrame({0: LINHAS_TITULO}).to_excel(
+            writer, sheet_name=aba, index=False, header=False
+        )
+        df.to_excel(writer, sheet_name=aba, index=False, startrow=len(LINHAS_TITULO))
+    return buffer.getvalue()
+
+
+def relatorio_b2b(n_linhas, n_assessores=35, seed=0):
+    """
+    DataFrame no layout B2B: subtotal por assessor (Conta vazia) seguido das
+    contas, com o nome do assessor só na linha de subtotal.
+    """
+    rng = np.random.default_rng(seed)
+    nomes = assessores(n_assessores)
+    por_assessor = np.array_split(np.arange(n_linhas), n_assessores)
+
+    blocos = []
+    for nome, linhas in zip(nomes, por_assessor):
+        n = len(linhas)
+        receita = np.round(rng.gamma(2.0, 150.0, n), 2)
+        comissao = np.round(receita * rng.uniform(0.2, 0.5, n), 2)
+        blocos.append(pd.DataFrame({
+            "Assessor Principal": [nome] + [None] * n,
+            "Conta": [None] + list(rng.integers(100000, 999999, n)),
+            "Receita Líquida": [receita.sum().round(2)] + list(receita),
+            "Comissão": [comissao.sum().round(2)] + list(comissao),
+        }))
+
+    df = pd.concat(blocos, ignore_index=True)
+    # colunas 0..4 existem no relatório real mas não são usadas
+    for i, col in enumerate(["Código", "Escritório", "Filial", "Equipe", "Canal"]):
+        df.insert(i, col, "X")
+    return df
+
+
+def planilha_b2b(n_linhas, **kwargs):
+    """Bytes de um .xlsx no layout B2B."""
+    buffer = BytesIO()
+    relatorio_b2b(n_linhas, **kwargs).to_excel(buffer, index=False, engine="xlsxwriter")
+    return buffer.getvalue()
@@ -0,0 +1,211 @@
+"""
+Montagem dos gráficos do dashboard.
+
+Os gráficos com uma série por assessor (ou por categoria) crescem com
+assessores x meses x categorias. Aqui as séries são limitadas aos N maiores
+grupos, o restante é somado em "Outros" antes de ir para o Plotly, as linhas
+usam WebGL e as figuras prontas ficam guardadas por (versão dos dados, filtros)
+para não serem refeitas a cada rerun.
+
+O Plotly só é importado quando um gráfico é de fato montado: a tela inicial
+(sem arquivos) e quem importa este módulo sem desenhar nada não pagam por ele.
+"""
+
+import numpy as np
+
+from nucleo import medicao
+
+TOP_N_PADRAO = 10
+ROTULO_OUTROS = "Outros"
+
+# acima disso os marcadores só poluem o gráfico e pesam no JSON
+MAX_PONTOS_COM_MARCADOR = 300
+
+# séries diárias longas são reduzidas a isso antes de ir para o gráfico
+MAX_PONTOS_POR_SERIE = 400
+
+MAX_FIGURAS_EM_CACHE = 32
+
+
+def limitar_top_n(df, grupo, valor, eixos, n=TOP_N_PADRAO, rotulo_outros=ROTULO_OUTROS):
+    """
+    Mantém os `n` grupos com maior soma de `valor` e agrega os demais em
+    `rotulo_outros`, somando por `eixos` (ex.: Mes_Ano).
+
+    Retorna um DataFrame com as colunas eixos + [grupo, valor].
+    """
+    colunas = list(eixos) + [grupo, valor]
+    if df.empty or n is None:
+        return df[colunas]
+
+    totais = df.groupby(grupo, observed=True)[valor].sum()
+    if len(totais) <= n:
+        return df[colunas]
+
+    principais = totais.nlargest(n).index
+    grupo_limitado = df[grupo].where(df[grupo].isin(principais), rotulo_outros)
+
+    return (
+        df.assign(**{grupo: grupo_limitado})
+        .groupby(list(eixos) + [grupo], as_index=False, observed=True)[valor]
+        .sum()
+    )
+
+
+def reduzir_pontos(df, x, y, grupo, max_pontos=MAX_PONTOS_POR_SERIE):
+    """
+    Junta valores consecutivos de `x` em blocos para que cada série tenha no
+    máximo `max_pontos` pontos; `y` vira a média por valor de `x` do bloco
+    (ex.: média diária) e o `x` do bloco é o primeiro. Séries curtas ficam
+    como estão.
+    """
+    valores_x = np.sort(df[x].unique())
+    if len(valores_x) <= max_pontos:
+        return df
+    tamanho = -(-len(valores_x) // max_pontos)
+    inicios = valores_x[(np.arange(len(valores_x)) // tamanho) * tamanho]
+    inicio_bloco = dict(zip(valores_x, inicios))
+    inicio_unico, valores_por_bloco = np.unique(inicios, return_counts=True)
+
+    reduzido = (
+        df.assign(**{x: df[x].map(inicio_bloco)})
+        .groupby([x, grupo], as_index=False, observed=True)[y]
+        .sum()
+    )
+    # o último bloco pode ser menor que os outros
+    reduzido[y] = reduzido[y] / reduzido[x].map(dict(zip(inicio_unico, valores_por_bloco)))
+    return reduzido
+
+
+def linha_simples(df, x, y, titulo, labels):
+    """Uma série só, com marcadores (ex.: comissão total por mês)."""
+    import plotly.express as px
+
+    fig = px.line(df, x=x, y=y, markers=True, labels=labels, title=titulo)
+    fig.update_xaxes(type="category")
+    return fig
+
+
+def barra_horizontal(df, x, y, titulo, labels):
+    """Barras horizontais de `x` por `y` (rankings)."""
+    import plotly.express as px
+
+    return px.bar(df, x=x, y=y, orientation="h", labels=labels, title=titulo)
+
+
+def barras_pnl(df_pnl, titulo):
+    """Barras agrupadas com a parte do assessor e a da empresa de cada assessor."""
+    import plotly.express as px
+
+    df_plot = df_pnl.melt(
+        id_vars=["Assessor"],
+        value_vars=["Para_Assessor", "Para_Empresa"],
+        var_name="Tipo",
+        value_name="Valor"
+    )
+    df_plot["Tipo"] = df_plot["Tipo"].replace({
+        "Para_Assessor": "Para o assessor",
+        "Para_Empresa": "Para a empresa"
+    })
+
+    return px.bar(
+        df_plot,
+        x="Assessor",
+        y="Valor",
+        color="Tipo",
+        barmode="group",
+        labels={"Valor": "Valor", "Assessor": "Assessor", "Tipo": "Tipo"},
+        title=titulo
+    )
+
+
+def mapa_calor(tabela, titulo, labels):
+    """Mapa de calor de uma tabela (linhas x colunas), com o valor em cada célula."""
+    import plotly.express as px
+
+    fig = px.imshow(
+        tabela,
+        text_auto=".3s",
+        aspect="auto",
+        color_continuous_scale="RdYlGn",
+        labels=labels,
+        title=titulo
+    )
+    fig.update_xaxes(type="category")
+    fig.update_yaxes(type="category")
+    return fig
+
+
+def treemap(df, caminho, valor, titulo):
+    """Treemap de `valor` pelos níveis de `caminho` (só valores positivos entram)."""
+    import plotly.express as px
+
+    df_plot = df[df[valor] > 0]
+    return px.treemap(df_plot, path=list(caminho), values=valor, title=titulo)
+
+
+def linha_por_grupo(df, x, y, cor, titulo, labels, top_n=TOP_N_PADRAO, tipo_eixo="category"):
+    """
+    Gráfico de linhas com uma série por grupo, limitado aos top N + Outros.
+    `tipo_eixo="date"` para séries com datas no eixo x.
+    """
+    import plotly.express as px
+
+    df_plot = limitar_top_n(df, cor, y, [x], n=top_n).sort_values([x, cor])
+
+    fig = px.line(
+        df_plot,
+        x=x,
+        y=y,
+        color=cor,
+        markers=len(df_plot) <= MAX_PONTOS_COM_MARCADOR,
+        render_mode="webgl",
+        labels=labels,
+        title=titulo
+    )
+    fig.update_xaxes(type=tipo_eixo)
+    return fig
+
+
+def barra_empilhada(df, x, y, cor, titulo, labels, top_n=TOP_N_PADRAO, top_n_eixo=TOP_N_PADRAO):
+    """
+    Barras empilhadas de `x` por `cor`, com as cores limitadas aos top N +
+    Outros e as barras do eixo x aos top `top_n_eixo` + Outros.
+    """
+    import plotly.express as px
+
+    df_plot = limitar_top_n(df, x, y, [cor], n=top_n_eixo)
+    df_plot = limitar_top_n(df_plot, cor, y, [x], n=top_n)
+
+    fig = px.bar(
+        df_plot,
+        x=x,
+        y=y,
+        color=cor,
+        title=titulo,
+        labels=labels
+    )
+    fig.update_xaxes(type="category")
+    return fig
+
+
+def figura_em_cache(cache, chave, construir):
+    """
+    Devolve a figura guardada em `cache` (um dict, normalmente do
+    session_state) para `chave`, construindo-a só quando ainda não existe.
+
+    A chave deve combinar a versão dos dados e o estado dos filtros.
+    """
+    medicao.contar_cache("figuras", chave in cache)
+    if chave in cache:
+        fig = cache.pop(chave)
+    else:
+        nome = chave[0] if isinstance(chave, tuple) else chave
+        with medicao.etapa(f"grafico {nome}"):
+            fig = construir()
+        while len(cache) >= MAX_FIGURAS_EM_CACHE:
+            cache.pop(next(iter(cache)))
+
+    # reinsere no fim: o dict fica ordenado do menos para o mais recente
+    cache[chave] = fig
+    return fig
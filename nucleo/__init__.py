@@ -0,0 +1,6 @@
+"""
+Núcleo de cálculo dos dashboards de comissões.
+
+Nada neste pacote importa Streamlit: os módulos podem ser usados pelos apps,
+por scripts e por jobs agendados.
+"""
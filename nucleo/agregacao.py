@@ -0,0 +1,38 @@
+"""
+Filtros e agregações do painel sobre o cubo (ou a base detalhada).
+"""
+
+
+def filtrar_cubo(cubo, assessores, origens, categorias, produtos):
+    """Linhas do cubo dentro das seleções dos filtros."""
+    mask = (
+        cubo["Assessor"].isin(assessores)
+        & cubo["Origem"].isin(origens)
+        & cubo["Categoria"].isin(categorias)
+        & cubo["Produto"].isin(produtos)
+    )
+    return cubo[mask]
+
+
+def comissao_por_mes(cubo):
+    """Comissão total de cada Mes_Ano, em ordem cronológica."""
+    return (
+        cubo.groupby("Mes_Ano", as_index=False)["Comissao"]
+        .sum()
+        .sort_values("Mes_Ano")
+    )
+
+
+def comissao_no_mes(cubo, mes, chaves):
+    """Comissão do mês `mes` agrupada por `chaves`, da maior para a menor."""
+    return (
+        cubo[cubo["Mes_Ano"] == mes]
+        .groupby(list(chaves), as_index=False)["Comissao"]
+        .sum()
+        .sort_values("Comissao", ascending=False)
+    )
+
+
+def participacao(df, coluna="Comissao"):
+    """Fração de cada linha no total de `coluna`."""
+    return df[coluna] / df[coluna].sum()
@@ -0,0 +1,93 @@
+"""
+Alertas de quedas e picos na comissão mensal por assessor ou categoria
+(ex.: um arquivo Corban que não foi enviado).
+
+Cada mês é comparado com os JANELA meses anteriores do mesmo grupo pelo
+z-score robusto:
+
+    z = (valor - mediana) / (1,4826 * MAD)
+
+onde MAD é a mediana dos desvios absolutos em torno da mediana. Mediana e
+MAD não se deixam levar por um mês fora da curva na própria janela.
+
+Numa série estável o MAD é zero e qualquer centavo de diferença daria
+z infinito; por isso a escala tem um piso (uma fração da mediana e um
+mínimo em reais). Janelas com poucos meses com comissão (ex.: assessor que
+acabou de entrar, com os meses anteriores zerados na grade) não são
+avaliadas.
+
+O cálculo é feito de uma vez sobre a matriz grupo x mês inteira (janelas
+deslizantes do NumPy), então o custo não depende de quantos assessores
+estão selecionados no painel.
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from nucleo.variacao import grade_mensal
+
+JANELA = 6
+MIN_MESES = 3  # meses de histórico com comissão exigidos para avaliar um mês
+LIMITE_Z = 3.5
+
+# 1,4826 * MAD estima o desvio padrão numa distribuição normal
+_ESCALA_MAD = 1.4826
+
+# piso da escala: fração da mediana e valor mínimo (R$)
+FRACAO_MEDIANA = 0.1
+ESCALA_MINIMA = 1.0
+
+
+def zscores(matriz, janela=JANELA, min_meses=MIN_MESES):
+    """
+    (mediana, z) de cada célula da matriz grupo x mês contra os `janela`
+    meses anteriores da mesma linha; NaN onde há menos de `min_meses` meses
+    com valor diferente de zero.
+    """
+    grupos, meses = matriz.shape
+    historico = np.concatenate([np.full((grupos, janela), np.nan), matriz[:, :-1]], axis=1)
+    # janelas[g, m] = os `janela` meses antes do mês m
+    janelas = sliding_window_view(historico, janela, axis=1)[:, :meses]
+
+    with np.errstate(all="ignore"):
+        suficientes = np.sum(~np.isnan(janelas) & (janelas != 0), axis=2) >= min_meses
+        # janelas sem histórico suficiente viram zeros (o resultado é descartado)
+        validas = np.where(suficientes[..., None], janelas, 0.0)
+        mediana = np.nanmedian(validas, axis=2)
+        mad = np.nanmedian(np.abs(validas - mediana[..., None]), axis=2)
+        escala = np.maximum.reduce([
+            _ESCALA_MAD * mad,
+            FRACAO_MEDIANA * np.abs(mediana),
+            np.full_like(mad, ESCALA_MINIMA),
+        ])
+        z = (matriz - mediana) / escala
+
+    mediana[~suficientes] = np.nan
+    z[~suficientes] = np.nan
+    return mediana, z
+
+
+def anomalias(cubo, chave, janela=JANELA, limite=LIMITE_Z):
+    """
+    Por `chave` (ex.: "Assessor") e Mes_Ano: Comissao, Mediana dos meses
+    anteriores, Z e Alerta ("queda", "alta" ou "" quando |Z| < `limite`).
+    """
+    grupos, meses, matriz = grade_mensal(cubo, [chave])
+    mediana, z = zscores(matriz, janela)
+
+    linhas, mes = np.indices(matriz.shape).reshape(2, -1)
+    resultado = grupos.to_frame(index=False).iloc[linhas].reset_index(drop=True)
+    resultado["Mes_Ano"] = np.asarray(meses)[mes]
+    resultado["Comissao"] = matriz.ravel()
+    resultado["Mediana"] = mediana.ravel()
+    resultado["Z"] = z.ravel()
+    resultado["Alerta"] = np.select(
+        [resultado["Z"] <= -limite, resultado["Z"] >= limite], ["queda", "alta"], ""
+    )
+    return resultado
+
+
+def alertas_do_mes(df_anomalias, chave, mes):
+    """{grupo: "queda" | "alta"} dos grupos com alerta em `mes`."""
+    df = df_anomalias[(df_anomalias["Mes_Ano"] == mes) & (df_anomalias["Alerta"] != "")]
+    return dict(zip(df[chave], df["Alerta"]))
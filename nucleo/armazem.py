@@ -0,0 +1,198 @@
+"""
+Armazém local das bases já tratadas, em Parquet.
+
+Cada arquivo de origem vira um Parquet por mês, particionado por tipo de
+relatório e competência:
+
+    <raiz>/manifesto.json
+    <raiz>/detalhado/mes=2025-01/<hash do arquivo>.parquet
+    <raiz>/aa/mes=2025-01/<hash do arquivo>.parquet
+    <raiz>/corban/mes=2025-01/<hash do arquivo>.parquet
+
+O manifesto guarda, por arquivo de origem, o hash, tamanho, mtime, o
+período coberto e as partes gravadas, além de um número de versão que aumenta a cada mudança.
+O app compara essa versão para saber quando recarregar.
+"""
+
+import json
+import os
+import tempfile
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+
+TIPOS = ("detalhado", "aa", "corban")
+
+ARQUIVO_MANIFESTO = "manifesto.json"
+
+
+def carregar_manifesto(raiz):
+    caminho = Path(raiz) / ARQUIVO_MANIFESTO
+    if not caminho.exists():
+        return {"versao": 0, "arquivos": {}}
+    with open(caminho, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def versao(raiz):
+    """Versão atual do armazém (0 se ainda não existe)."""
+    return carregar_manifesto(raiz)["versao"]
+
+
+def _gravar_manifesto(raiz, manifesto):
+    # grava em arquivo temporário e troca: quem lê nunca vê um JSON pela metade
+    raiz = Path(raiz)
+    raiz.mkdir(parents=True, exist_ok=True)
+    fd, temporario = tempfile.mkstemp(dir=raiz, suffix=".json")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=1)
+    os.replace(temporario, raiz / ARQUIVO_MANIFESTO)
+
+
+def _para_parquet(df):
+    # colunas object podem misturar números e textos (ex.: Conta); o Parquet
+    # exige um tipo só, então vão como texto
+    colunas_texto = df.select_dtypes(include="object").columns
+    return df.astype({c: "string" for c in colunas_texto})
+
+
+def gravar_arquivo(raiz, origem, tipo, df, info):
+    """
+    Grava a base tratada de um arquivo de origem, substituindo as partes
+    gravadas anteriormente para ele, e sobe a versão do armazém.
+
+    `info` é guardado no manifesto (hash, tamanho, mtime, competência...).
+    """
+    if tipo not in TIPOS:
+        raise ValueError(f"Tipo de relatório desconhecido: {tipo}")
+
+    raiz = Path(raiz)
+    manifesto = carregar_manifesto(raiz)
+    anterior = manifesto["arquivos"].get(origem)
+
+    partes = []
+    df = _para_parquet(df)
+    for mes, df_mes in df.groupby("Mes_Ano"):
+        pasta = raiz / tipo / f"mes={mes}"
+        pasta.mkdir(parents=True, exist_ok=True)
+        parte = pasta / f"{info['hash']}.parquet"
+        df_mes.drop(columns="Mes_Ano").to_parquet(parte, index=False)
+        partes.append(str(parte.relative_to(raiz)))
+
+    if anterior is not None:
+        for parte in set(anterior["partes"]) - set(partes):
+            (raiz / parte).unlink(missing_ok=True)
+    _soltar_duplicados(manifesto, origem, hash_atual=info["hash"])
+
+    manifesto["arquivos"][origem] = {
+        **info,
+        "tipo": tipo,
+        "linhas": int(len(df)),
+        "partes": partes,
+    }
+    manifesto["versao"] += 1
+    _gravar_manifesto(raiz, manifesto)
+
+
+def registrar_sem_partes(raiz, origem, tipo, info):
+    """
+    Registra um arquivo no manifesto sem gravar dados, para que a varredura
+    não o leia de novo enquanto ele não mudar:
+
+    - cópia de outro arquivo (`info["duplicado_de"]`): os dados já estão no
+      armazém, e as partes, nomeadas pelo hash, seriam as mesmas;
+    - arquivo em quarentena (`info["quarentena"]` com o motivo): a leitura
+      falhou.
+    """
+    raiz = Path(raiz)
+    manifesto = carregar_manifesto(raiz)
+    anterior = manifesto["arquivos"].get(origem)
+
+    manifesto["arquivos"][origem] = {
+        **info,
+        "tipo": tipo,
+        "linhas": 0,
+        "partes": [],
+    }
+    if anterior is not None and anterior["partes"]:
+        for parte in anterior["partes"]:
+            (raiz / parte).unlink(missing_ok=True)
+        manifesto["versao"] += 1
+    _soltar_duplicados(manifesto, origem, hash_atual=info["hash"])
+    _gravar_manifesto(raiz, manifesto)
+
+
+def _soltar_duplicados(manifesto, origem, hash_atual=None):
+    # as cópias de `origem` que não batem mais com ele (o original mudou ou
+    # sumiu) saem do manifesto e são lidas de novo na próxima varredura
+    copias = [
+        o for o, info in manifesto["arquivos"].items()
+        if info.get("duplicado_de") == origem and info["hash"] != hash_atual
+    ]
+    for o in copias:
+        del manifesto["arquivos"][o]
+
+
+def atualizar_info(raiz, origem, **campos):
+    """Atualiza metadados de um arquivo sem mudar os dados (não sobe a versão)."""
+    manifesto = carregar_manifesto(raiz)
+    manifesto["arquivos"][origem].update(campos)
+    _gravar_manifesto(raiz, manifesto)
+
+
+def remover_arquivo(raiz, origem):
+    """Remove as partes de um arquivo de origem que saiu da pasta."""
+    raiz = Path(raiz)
+    manifesto = carregar_manifesto(raiz)
+    anterior = manifesto["arquivos"].pop(origem, None)
+    if anterior is None:
+        return
+
+    for parte in anterior["partes"]:
+        (raiz / parte).unlink(missing_ok=True)
+    _soltar_duplicados(manifesto, origem)
+
+    manifesto["versao"] += 1
+    _gravar_manifesto(raiz, manifesto)
+
+
+def ler_tipo(raiz, tipo):
+    """Todas as partes de um tipo de relatório, com a coluna Mes_Ano de volta."""
+    raiz = Path(raiz)
+    manifesto = carregar_manifesto(raiz)
+
+    frames = []
+    for info in manifesto["arquivos"].values():
+        if info["tipo"] != tipo:
+            continue
+        for parte in info["partes"]:
+            df = pd.read_parquet(raiz / parte)
+            # a partição "mes=AAAA-MM" é o próprio Mes_Ano
+            df["Mes_Ano"] = Path(parte).parent.name.split("=", 1)[1]
+            frames.append(df)
+
+    return frames
+
+
+def periodos(raiz, tipo):
+    """(origem, (início, fim)) dos arquivos do tipo com período no manifesto."""
+    manifesto = carregar_manifesto(raiz)
+    resultado = []
+    for origem, info in manifesto["arquivos"].items():
+        if info["tipo"] == tipo and info.get("periodo"):
+            inicio, fim = info["periodo"]
+            resultado.append(
+                (origem, (date.fromisoformat(inicio), date.fromisoformat(fim)))
+            )
+    return resultado
+
+
+def quarentena(raiz, tipo):
+    """(origem, motivo) dos arquivos do tipo cuja leitura falhou."""
+    manifesto = carregar_manifesto(raiz)
+    return [
+        (origem, info["quarentena"])
+        for origem, info in manifesto["arquivos"].items()
+        if info["tipo"] == tipo and info.get("quarentena")
+    ]
@@ -0,0 +1,174 @@
+"""
+Cache de bases compartilhado entre sessões.
+
+Vários usuários abrem o dashboard com os mesmos relatórios; sem isso cada
+sessão lê e agrega tudo de novo. Aqui as bases (e a leitura de cada arquivo)
+ficam guardadas uma única vez por processo, indexadas pelo hash do conteúdo
+dos arquivos.
+
+Regras:
+
+- os valores guardados são somente leitura: quem usa não altera o DataFrame
+  (filtra, copia, agrega, mas nunca escreve nele);
+- cada sessão que usa uma entrada segura uma reserva; a entrada só pode ser
+  descartada quando ninguém mais a reserva;
+- a soma do tamanho das entradas respeita ORCAMENTO_BYTES, descartando primeiro
+  as entradas sem reserva usadas há mais tempo.
+
+Reservas coletadas pelo GC podem ser finalizadas no meio de um bloco que já
+segura a trava, na mesma thread; por isso o finalizador só enfileira a
+chave, e a fila é esvaziada com a trava adquirida.
+"""
+
+import collections
+import os
+import sys
+import threading
+import time
+import weakref
+
+import pandas as pd
+
+ORCAMENTO_BYTES = int(float(os.environ.get("PNL_CACHE_MB", "1024")) * 1024 * 1024)
+
+_trava = threading.Lock()
+_entradas = {}  # chave -> dict(valor, bytes, reservas, ultimo_uso)
+_construindo = {}  # chave -> Lock, evita que duas sessões montem a mesma base
+_estatisticas = {"acertos": 0, "faltas": 0, "descartes": 0}
+_soltas = collections.deque()  # chaves de reservas finalizadas, a descontar
+
+
+class Reserva:
+    """
+    Reserva de uma entrada do cache. É liberada com `liberar(reserva)` ou
+    automaticamente quando o objeto é coletado (ex.: fim da sessão).
+    """
+
+    __slots__ = ("chave", "_finalizador", "__weakref__")
+
+    def __init__(self, chave):
+        self.chave = chave
+        self._finalizador = weakref.finalize(self, _soltar, chave)
+
+
+def tamanho_bytes(valor):
+    """Estimativa de memória de um valor guardado (DataFrames, dicts, listas)."""
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        uso = valor.memory_usage(deep=True)
+        return int(uso.sum() if isinstance(uso, pd.Series) else uso)
+    if isinstance(valor, dict):
+        return sum(tamanho_bytes(v) for v in valor.values())
+    if isinstance(valor, (list, tuple)):
+        return sum(tamanho_bytes(v) for v in valor)
+    return sys.getsizeof(valor)
+
+
+def reservar(chave, construir):
+    """
+    Devolve (valor, reserva) para `chave`, chamando `construir()` apenas se a
+    entrada ainda não existe no processo.
+
+    Guarde a reserva enquanto o valor estiver em uso (ex.: no session_state).
+    """
+    with _trava:
+        entrada = _entradas.get(chave)
+        if entrada is None:
+            trava_chave = _construindo.setdefault(chave, threading.Lock())
+
+    if entrada is None:
+        with trava_chave:
+            with _trava:
+                entrada = _entradas.get(chave)
+            if entrada is None:
+                # constrói fora da trava global: outras chaves seguem livres
+                valor = construir()
+                with _trava:
+                    _estatisticas["faltas"] += 1
+                    entrada = {
+                        "valor": valor,
+                        "bytes": tamanho_bytes(valor),
+                        "reservas": 0,
+                        "ultimo_uso": time.monotonic(),
+                    }
+                    _entradas[chave] = entrada
+                    _construindo.pop(chave, None)
+            else:
+                with _trava:
+                    _estatisticas["acertos"] += 1
+    else:
+        with _trava:
+            _estatisticas["acertos"] += 1
+
+    with _trava:
+        entrada["reservas"] += 1
+        entrada["ultimo_uso"] = time.monotonic()
+        if chave not in _entradas:
+            # foi descartada entre a construção e a reserva: volta para o cache
+            _entradas[chave] = entrada
+        _descontar_soltas()
+        _respeitar_orcamento()
+        return entrada["valor"], Reserva(chave)
+
+
+def consultar(chave):
+    """Devolve o valor guardado em `chave` sem reservar, ou None."""
+    with _trava:
+        entrada = _entradas.get(chave)
+        return None if entrada is None else entrada["valor"]
+
+
+def liberar(reserva):
+    """Solta a reserva; a entrada continua no cache até precisar de espaço."""
+    if reserva is not None:
+        reserva._finalizador()
+
+
+def _soltar(chave):
+    # pode rodar dentro do GC com _trava já adquirida por esta thread: só
+    # enfileira e desconta agora se a trava estiver livre
+    _soltas.append(chave)
+    if _trava.acquire(blocking=False):
+        try:
+            _descontar_soltas()
+            _respeitar_orcamento()
+        finally:
+            _trava.release()
+
+
+def _descontar_soltas():
+    # chamado com _trava adquirida
+    while _soltas:
+        entrada = _entradas.get(_soltas.popleft())
+        if entrada is not None:
+            entrada["reservas"] = max(entrada["reservas"] - 1, 0)
+
+
+def _respeitar_orcamento():
+    # chamado com _trava adquirida
+    total = sum(e["bytes"] for e in _entradas.values())
+    if total <= ORCAMENTO_BYTES:
+        return
+
+    livres = sorted(
+        (e["ultimo_uso"], chave)
+        for chave, e in _entradas.items()
+        if e["reservas"] == 0
+    )
+    for _, chave in livres:
+        if total <= ORCAMENTO_BYTES:
+            break
+        total -= _entradas.pop(chave)["bytes"]
+        _estatisticas["descartes"] += 1
+
+
+def estatisticas():
+    """Resumo do cache: entradas, bytes em uso, reservas, acertos e faltas."""
+    with _trava:
+        _descontar_soltas()
+        return {
+            "entradas": len(_entradas),
+            "bytes": sum(e["bytes"] for e in _entradas.values()),
+            "orcamento_bytes": ORCAMENTO_BYTES,
+            "reservas": sum(e["reservas"] for e in _entradas.values()),
+            **_estatisticas,
+        }
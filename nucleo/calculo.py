@@ -0,0 +1,132 @@
+"""
+Configuração de repasse/imposto e cálculo do PNL por assessor.
+"""
+
+import json
+
+import pandas as pd
+
+# Dicionário de repasse por assessor para a seção PNL
+# use sempre o nome em maiúsculas, igual vem na planilha tratada
+repasse_por_assessor = {
+    "ABRAAO RIBEIRO DA SILVA": 0.70,
+    "ARTHUR MOTA RODRIGUES": 0.50,
+    "BRUNO TERRA DE ASSUNCAO": 0.60,
+    "CAIO DOS SANTOS CARLOS": 0.40,
+    "CARLOS ALEXANDRE IGNACIO DA SILVA": 0.50,
+    "CARLOS EDUARDO CAMERA LOUREIRO PINTO": 0.60,
+    "CELSO LUIZ DE OLIVEIRA JUNIOR": 0.60,
+    "DANIEL MAGRINA GUIMARAES": 0.40,
+    "EDUARDO KAZAY": 0.70,
+    "EDUARDO MEYER": 0.70,
+    "EMANUEL NASCIMENTO CAVALCANTI": 0.80,
+    "EMERSON CERBINO DOBLAS": 0.50,
+    "EMERSON VIEIRA DE FARIAS JUNIOR": 0.70,
+    "FABIANO JOSE RAMOS BITTENCOURT": 0.75,
+    "FLAVIO LUIZ NUNES DE BARROS": 0.85,
+    "JADER DA MOTA MENDONCA": 0.80,
+    "JOAO VITOR ARAUJO SACCARDO": 0.50,
+    "JOICE ELIANA BRITES DE OLIVEIRA": 0.60,
+    "JONATHAN DA CUNHA VALENTE": 0.80,
+    "LEONARDO BARBOSA FRISONI": 0.80,
+    "LUCIANO HENRIQUE MATTOS DE ALMEIDA": 0.80,
+    "LUIZ FILIPE COSTA GARCIA": 0.80,
+    "MANSUR PAPICHO MIRANDA": 0.90,
+    "OTAVIO NUNES CARDOZO JÚNIOR": 0.60,
+    "PEDRO AMMAR FORATO": 0.80,
+    "PEDRO BORGERTH TEIXEIRA DE LUCA": 0.70,
+    "RAFAEL MADALENA MARTINS": 0.80,
+    "RAFAEL DADOORIAN PREGNOLATI": 0.80,
+    "ROBERTO DE MATTOS BRUNER": 0.70,
+    "RODRIGO RODRIGUES MARINO": 0.70,
+    "RUAN MARINS NOGUEIRA": 0.80,
+    "THIAGO KEMPER RICCIOPPO": 0.90,
+    "TIAGO DE CARVALHO RAMOS": 0.60,
+    "VANESSA PEREIRA DE OLIVEIRA": 0.70,
+}
+
+default_repasse = 0.70
+
+ALIQUOTA_IMPOSTO = 0.1953
+FATOR_LIQUIDO = 1 - ALIQUOTA_IMPOSTO  # 0.8047
+
+
+def get_repasse(assessor):
+    if pd.isna(assessor):
+        return default_repasse
+    chave = str(assessor).strip().upper()
+    return repasse_por_assessor.get(chave, default_repasse)
+
+
+def config_padrao():
+    """Configuração de PNL usada pelos apps."""
+    return {
+        "repasse_por_assessor": dict(repasse_por_assessor),
+        "default_repasse": default_repasse,
+        "aliquota_imposto": ALIQUOTA_IMPOSTO,
+    }
+
+
+def carregar_config(caminho=None):
+    """
+    Lê a configuração de PNL de um JSON com as chaves repasse_por_assessor,
+    default_repasse e aliquota_imposto; o que faltar vem de config_padrao().
+    """
+    config = config_padrao()
+    if caminho is not None:
+        with open(caminho, encoding="utf-8") as f:
+            lido = json.load(f)
+        config.update({k: v for k, v in lido.items() if k in config})
+        config["repasse_por_assessor"] = {
+            str(k).strip().upper(): float(v)
+            for k, v in config["repasse_por_assessor"].items()
+        }
+    return config
+
+
+def repasses(assessores, config=None):
+    """Repasse de cada assessor de uma Series (versão vetorizada de get_repasse)."""
+    config = config or config_padrao()
+    chaves = assessores.astype(str).str.strip().str.upper()
+    return (
+        chaves.map(config["repasse_por_assessor"])
+        .astype(float)
+        .fillna(config["default_repasse"])
+    )
+
+
+def calcular_pnl(df, config=None):
+    """
+    Acrescenta Comissao_Liquida, Repasse, Para_Assessor e Para_Empresa a um
+    DataFrame com as colunas Assessor e Comissao.
+    """
+    config = config or config_padrao()
+    df = df.copy()
+    df["Comissao_Liquida"] = df["Comissao"] * (1 - config["aliquota_imposto"])
+    df["Repasse"] = repasses(df["Assessor"], config)
+    df["Para_Assessor"] = df["Comissao_Liquida"] * df["Repasse"]
+    df["Para_Empresa"] = df["Comissao_Liquida"] - df["Para_Assessor"]
+    return df
+
+
+def agregar_assessor_mes(cubo, coluna="Comissao"):
+    """Comissão por Ano, Mes_Ano e Assessor a partir do cubo (ou da base)."""
+    return (
+        cubo.groupby(["Ano", "Mes_Ano", "Assessor"], as_index=False)[coluna]
+        .sum()
+        .sort_values(["Ano", "Mes_Ano", "Assessor"])
+    )
+
+
+def pnl_mensal(df_ass_mes, config=None):
+    """PNL por assessor em cada mês."""
+    return calcular_pnl(df_ass_mes, config)
+
+
+def pnl_anual(df_ass_mes, config=None):
+    """PNL acumulado no ano por assessor, com a fatia de cada um no total da empresa."""
+    df = df_ass_mes.groupby(["Ano", "Assessor"], as_index=False)["Comissao"].sum()
+    df = calcular_pnl(df, config)
+    total_ano = df.groupby("Ano")["Para_Empresa"].transform("sum")
+    df["Pct_Empresa_sobre_Total"] = df["Para_Empresa"] / total_ano
+    return df.sort_values(["Ano", "Para_Empresa"], ascending=[True, False])
@@ -0,0 +1,72 @@
+"""
+Simulação de cenários de repasse e imposto sobre o PNL da empresa.
+
+Em vez de editar `repasse_por_assessor` e rodar o app de novo para cada
+proposta, a comissão fica numa matriz assessor x mês e cada cenário
+(alíquota, repasses) é avaliado de uma vez com NumPy:
+
+    Para_Empresa[k, s, a, m] = C[a, m] * (1 - aliquota[k]) * (1 - repasse[s, a])
+
+Centenas de cenários sobre um ano de dados custam milissegundos.
+"""
+
+import numpy as np
+import pandas as pd
+
+from nucleo.calculo import config_padrao, repasses
+
+
+def matriz_comissao(df_ass_mes):
+    """
+    (assessores, meses, matriz assessor x mês) a partir da comissão por
+    Assessor e Mes_Ano (ver calculo.agregar_assessor_mes).
+    """
+    tabela = df_ass_mes.pivot_table(
+        index="Assessor", columns="Mes_Ano", values="Comissao",
+        aggfunc="sum", fill_value=0.0,
+    )
+    return tabela.index, tabela.columns, tabela.to_numpy(dtype=float)
+
+
+def grade_repasses(repasse_atual, variacoes):
+    """
+    Repasses de cada cenário (cenário x assessor): o repasse atual de cada
+    assessor somado a cada variação, limitado entre 0 e 1.
+    """
+    atual = np.asarray(repasse_atual, dtype=float)
+    return np.clip(atual[None, :] + np.asarray(variacoes, dtype=float)[:, None], 0.0, 1.0)
+
+
+def para_empresa(comissao, grade, aliquotas):
+    """Parte da empresa por alíquota x cenário de repasse x assessor x mês."""
+    liquido = 1 - np.asarray(aliquotas, dtype=float)
+    return np.einsum("k,sa,am->ksam", liquido, 1 - grade, comissao)
+
+
+def cenarios(df_ass_mes, variacoes, aliquotas, config=None):
+    """
+    Para_Empresa de cada cenário (variação do repasse x alíquota) sobre a
+    comissão por assessor e mês.
+
+    Devolve {"total": alíquota x variação com o total do período,
+    "por_assessor": linhas Aliquota, Variacao, Assessor, Para_Empresa}.
+    """
+    config = config or config_padrao()
+    assessores, _, comissao = matriz_comissao(df_ass_mes)
+    grade = grade_repasses(repasses(assessores.to_series(), config), variacoes)
+
+    por_assessor = para_empresa(comissao, grade, aliquotas).sum(axis=3)
+
+    total = pd.DataFrame(
+        por_assessor.sum(axis=2),
+        index=pd.Index(aliquotas, name="Aliquota"),
+        columns=pd.Index(variacoes, name="Variacao"),
+    )
+    k, s, a = np.indices(por_assessor.shape).reshape(3, -1)
+    longo = pd.DataFrame({
+        "Aliquota": np.asarray(aliquotas, dtype=float)[k],
+        "Variacao": np.asarray(variacoes, dtype=float)[s],
+        "Assessor": assessores.to_numpy()[a],
+        "Para_Empresa": por_assessor.ravel(),
+    })
+    return {"total": total, "por_assessor": longo}
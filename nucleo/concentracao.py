@@ -0,0 +1,72 @@
+"""
+Concentração da comissão de cada assessor nos seus maiores clientes.
+
+Tudo parte da comissão por Assessor, Mes_Ano e Conta (ver
+contas.por_assessor_conta). Em vez de um nlargest por grupo, as contas são
+ordenadas uma única vez por (assessor, mês, comissão decrescente) e a
+posição de cada conta no seu grupo sai de um cumcount; os N maiores de
+todos os grupos são as linhas com posição <= N.
+
+Só comissões positivas entram: estornos não são "clientes" da carteira.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def _ordenar(df_conta, grupos):
+    df = df_conta[df_conta["Comissao"] > 0]
+    df = df.sort_values(grupos + ["Comissao"], ascending=[True] * len(grupos) + [False])
+    return df.assign(Posicao=df.groupby(grupos).cumcount() + 1)
+
+
+def concentracao(df_conta, n=10):
+    """
+    Por Assessor e Mes_Ano: Clientes, Comissao, Comissao_Top (dos `n`
+    maiores clientes), Pct_Top e HHI (soma dos quadrados das participações,
+    de 1/Clientes a 1).
+    """
+    grupos = ["Assessor", "Mes_Ano"]
+    df = _ordenar(df_conta, grupos)
+    total = df.groupby(grupos)["Comissao"].transform("sum")
+    participacao = df["Comissao"] / total
+
+    resultado = (
+        df.assign(
+            Comissao_Top=df["Comissao"].where(df["Posicao"] <= n, 0.0),
+            Quadrado=participacao ** 2,
+        )
+        .groupby(grupos, as_index=False)
+        .agg(
+            Clientes=("Conta", "size"),
+            Comissao=("Comissao", "sum"),
+            Comissao_Top=("Comissao_Top", "sum"),
+            HHI=("Quadrado", "sum"),
+        )
+    )
+    resultado["Pct_Top"] = resultado["Comissao_Top"] / resultado["Comissao"]
+    return resultado
+
+
+def pareto(df_conta, assessor, max_pontos=500):
+    """
+    Curva de Pareto dos clientes de `assessor` (somando os meses de
+    `df_conta`): para cada posição, a fração dos clientes até ela e a fração
+    acumulada da comissão. Carteiras grandes são reduzidas a `max_pontos`
+    posições espaçadas (sempre com a primeira e a última) para o gráfico.
+    """
+    por_conta = (
+        df_conta[(df_conta["Assessor"] == assessor) & (df_conta["Comissao"] > 0)]
+        .groupby("Conta", as_index=False)["Comissao"]
+        .sum()
+    )
+    comissao = np.sort(por_conta["Comissao"].to_numpy())[::-1]
+    posicoes = np.arange(1, len(comissao) + 1)
+    curva = pd.DataFrame({
+        "Posicao": posicoes,
+        "Pct_Clientes": posicoes / max(len(comissao), 1),
+        "Pct_Comissao": np.cumsum(comissao) / comissao.sum() if len(comissao) else [],
+    })
+    if len(curva) > max_pontos:
+        curva = curva.iloc[np.unique(np.linspace(0, len(curva) - 1, max_pontos).astype(int))]
+    return curva
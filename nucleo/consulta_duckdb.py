@@ -0,0 +1,204 @@
+"""
+Consultas ao armazém Parquet com DuckDB (opcional: `pip install duckdb`).
+
+Em vez de carregar todas as partes no pandas para só então filtrar e agrupar,
+os filtros e o GROUP BY vão como SQL para o DuckDB embutido, que lê apenas
+as colunas e partições (mes=AAAA-MM) necessárias, em várias threads, e
+devolve só o resultado. Assim o histórico inteiro do armazém não precisa
+caber na memória do app.
+
+Sem o DuckDB instalado, `disponivel()` devolve False e os apps seguem lendo
+o armazém com nucleo.armazem.ler_tipo.
+
+Variáveis de ambiente:
+
+    PNL_DUCKDB_THREADS   threads por consulta (padrão: todos os núcleos)
+    PNL_DUCKDB_MEMORIA   limite de memória por consulta, ex.: "2GB"
+"""
+
+import os
+from pathlib import Path
+
+import pandas as pd
+
+from nucleo import armazem
+from nucleo.ingestao import DIMENSOES_CUBO
+
+THREADS = int(os.environ.get("PNL_DUCKDB_THREADS", "0"))
+LIMITE_MEMORIA = os.environ.get("PNL_DUCKDB_MEMORIA", "")
+
+# a partição "mes=AAAA-MM" volta como a coluna Mes_Ano, lida do caminho da
+# parte: com hive_partitioning a coluna "mes" da partição colide com a coluna
+# Mes dos dados (identificadores do DuckDB não diferenciam maiúsculas)
+_FONTE = """(
+    SELECT * EXCLUDE (filename),
+           regexp_extract(filename, 'mes=([0-9]{4}-[0-9]{2})', 1) AS Mes_Ano
+    FROM read_parquet(?, hive_partitioning = false, filename = true,
+                      union_by_name = true)
+)"""
+
+# chaves calculadas a partir das colunas das partes
+_EXPRESSOES = {
+    # dia da receita, como o Data_Receita.dt.normalize() das séries diárias
+    "Data": "CAST(Data_Receita AS DATE)",
+}
+
+# a conta como nucleo.contas.chave_conta: texto, sem espaços e sem ".0"
+_CHAVE_CONTA = "regexp_replace(trim(CAST(Conta AS VARCHAR)), '\\.0$', '')"
+
+
+def disponivel():
+    """True se o DuckDB estiver instalado."""
+    try:
+        import duckdb  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _partes(raiz, tipo, filtros, datas=None):
+    """
+    Partes do manifesto para o tipo, já sem os meses fora do filtro de
+    Mes_Ano ou do intervalo `datas` (a poda de partições é feita aqui, pela
+    pasta mes=AAAA-MM).
+    """
+    # só as partes do manifesto: arquivos soltos de uma gravação pela metade
+    # não entram na consulta
+    manifesto = armazem.carregar_manifesto(raiz)
+    meses = (filtros or {}).get("Mes_Ano")
+    meses = None if meses is None else set(meses)
+    if datas is not None:
+        # Mes_Ano vem do Data_Receita: só os meses do intervalo têm linhas nele
+        no_intervalo = set(pd.period_range(*datas, freq="M").strftime("%Y-%m"))
+        meses = no_intervalo if meses is None else meses & no_intervalo
+    return [
+        str(Path(raiz) / parte)
+        for info in manifesto["arquivos"].values()
+        if info["tipo"] == tipo
+        for parte in info["partes"]
+        if meses is None or Path(parte).parent.name.split("=", 1)[1] in meses
+    ]
+
+
+def _conectar():
+    import duckdb
+
+    con = duckdb.connect()
+    if THREADS:
+        con.execute(f"SET threads = {THREADS}")
+    if LIMITE_MEMORIA:
+        con.execute(f"SET memory_limit = '{LIMITE_MEMORIA}'")
+    return con
+
+
+def _coluna(nome):
+    return '"' + nome.replace('"', '""') + '"'
+
+
+def _onde(filtros, datas=None):
+    """
+    Cláusula WHERE e parâmetros para {coluna: valores aceitos} e, se dado,
+    o intervalo `datas` (inicio, fim) de Data_Receita, inclusive.
+    """
+    condicoes = []
+    parametros = []
+    if datas is not None:
+        inicio, fim = datas
+        condicoes.append("Data_Receita >= ? AND Data_Receita < ?")
+        parametros.extend([
+            pd.Timestamp(inicio).to_pydatetime(),
+            (pd.Timestamp(fim) + pd.Timedelta(days=1)).to_pydatetime(),
+        ])
+    for coluna, valores in (filtros or {}).items():
+        if coluna == "Mes_Ano":
+            # já aplicado na escolha das partes
+            continue
+        valores = list(valores)
+        if not valores:
+            condicoes.append("FALSE")
+            continue
+        marcadores = ", ".join("?" * len(valores))
+        condicoes.append(f"{_coluna(coluna)} IN ({marcadores})")
+        parametros.extend(valores)
+
+    if not condicoes:
+        return "", parametros
+    return " WHERE " + " AND ".join(condicoes), parametros
+
+
+def _chave(nome):
+    expressao = _EXPRESSOES.get(nome)
+    if expressao is None:
+        return _coluna(nome)
+    return f"{expressao} AS {_coluna(nome)}"
+
+
+def agregar(raiz, chaves, filtros=None, valor="Comissao", tipo="detalhado", datas=None):
+    """
+    Soma de `valor` (uma coluna ou uma lista delas) por `chaves` nas partes
+    do armazém que passam em `filtros` ({coluna: valores aceitos}) e no
+    intervalo `datas` (inicio, fim) de Data_Receita, calculada pelo DuckDB.
+    A chave "Data" é o dia do Data_Receita.
+    """
+    chaves = list(chaves)
+    valores = [valor] if isinstance(valor, str) else list(valor)
+    partes = _partes(raiz, tipo, filtros, datas)
+    if not partes:
+        return pd.DataFrame(columns=chaves + valores)
+
+    selecao = ", ".join(
+        [_chave(c) for c in chaves]
+        + [f"SUM({_coluna(v)}) AS {_coluna(v)}" for v in valores]
+    )
+    posicoes = ", ".join(str(i + 1) for i in range(len(chaves)))
+    onde, parametros = _onde(filtros, datas)
+    sql = (
+        f"SELECT {selecao} FROM {_FONTE}{onde} "
+        f"GROUP BY {posicoes} ORDER BY {posicoes}"
+    )
+    with _conectar() as con:
+        return con.execute(sql, [partes] + parametros).df()
+
+
+def cubo(raiz):
+    """O mesmo cubo de nucleo.ingestao.montar_dados, só com as partes do armazém."""
+    return agregar(raiz, DIMENSOES_CUBO)
+
+
+def linhas(raiz, filtros=None, tipo="detalhado"):
+    """Linhas detalhadas do armazém que passam em `filtros`."""
+    partes = _partes(raiz, tipo, filtros)
+    if not partes:
+        return pd.DataFrame()
+
+    onde, parametros = _onde(filtros)
+    with _conectar() as con:
+        return con.execute(f"SELECT * FROM {_FONTE}{onde}", [partes] + parametros).df()
+
+
+def limites_datas(raiz, tipo="detalhado"):
+    """(primeira, última) Data_Receita do armazém, ou None se não houver linhas."""
+    partes = _partes(raiz, tipo, None)
+    if not partes:
+        return None
+
+    with _conectar() as con:
+        primeira, ultima = con.execute(
+            f"SELECT MIN(Data_Receita), MAX(Data_Receita) FROM {_FONTE}", [partes]
+        ).fetchone()
+    if primeira is None:
+        return None
+    return pd.Timestamp(primeira), pd.Timestamp(ultima)
+
+
+def linhas_da_conta(raiz, conta, tipo="detalhado"):
+    """Linhas do armazém da `conta` (comparada como nucleo.contas.chave_conta)."""
+    partes = _partes(raiz, tipo, None)
+    if not partes:
+        return pd.DataFrame()
+
+    conta = str(conta).strip().removesuffix(".0")
+    with _conectar() as con:
+        return con.execute(
+            f"SELECT * FROM {_FONTE} WHERE {_CHAVE_CONTA} = ?", [partes, conta]
+        ).df()
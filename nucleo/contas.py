@@ -0,0 +1,68 @@
+"""
+Consulta por conta (cliente) na base detalhada.
+
+Procurar uma conta filtrando a base inteira percorre todas as linhas a cada
+consulta. Aqui a base ganha um índice ordenado por Conta (as contas em
+ordem e a permutação das linhas), montado uma vez por versão dos dados:
+achar as linhas de uma conta vira duas buscas binárias e uma fatia.
+"""
+
+import numpy as np
+
+
+def chave_conta(contas):
+    """
+    Conta como texto, sem espaços e sem o ".0" que o Excel deixa em números
+    (1234.0 e "1234" são a mesma conta).
+    """
+    return contas.astype(str).str.strip().str.replace(r"\.0$", "", regex=True)
+
+
+def indexar(base):
+    """Índice da base por conta: {"chaves": contas em ordem, "ordem": linhas nessa ordem}."""
+    chaves = chave_conta(base["Conta"]).to_numpy(dtype=str)
+    ordem = np.argsort(chaves, kind="stable")
+    return {"chaves": chaves[ordem], "ordem": ordem}
+
+
+def linhas_da_conta(base, indice, conta):
+    """Linhas da base da `conta`, pelo índice (busca binária, sem varrer a base)."""
+    conta = str(conta).strip().removesuffix(".0")
+    inicio = np.searchsorted(indice["chaves"], conta, side="left")
+    fim = np.searchsorted(indice["chaves"], conta, side="right")
+    return base.iloc[indice["ordem"][inicio:fim]]
+
+
+def resumo_conta(linhas):
+    """Comissão da conta por mês, categoria, produto e assessor."""
+    resumo = {"Mes_Ano": linhas.groupby("Mes_Ano", as_index=False)["Comissao"].sum()}
+    for dimensao in ["Categoria", "Produto", "Assessor"]:
+        resumo[dimensao] = (
+            linhas.groupby(dimensao, as_index=False)["Comissao"]
+            .sum()
+            .sort_values("Comissao", ascending=False)
+        )
+    return resumo
+
+
+def por_assessor_conta(base):
+    """
+    Comissão por Assessor, Mes_Ano e Conta (com o nome do Cliente), base das
+    tabelas de maiores clientes e de concentração. `base` pode ser de linhas
+    ou de somas já agrupadas (ex.: do armazém, pelo DuckDB).
+    """
+    return (
+        base.assign(Conta=chave_conta(base["Conta"]))
+        .groupby(["Assessor", "Mes_Ano", "Conta"], as_index=False)
+        .agg(Cliente=("Cliente", "first"), Comissao=("Comissao", "sum"))
+    )
+
+
+def top_clientes(df_conta, n=10):
+    """As `n` contas com mais comissão de cada assessor, somando os meses de `df_conta`."""
+    por_conta = (
+        df_conta.groupby(["Assessor", "Conta"], as_index=False)
+        .agg(Cliente=("Cliente", "first"), Comissao=("Comissao", "sum"))
+        .sort_values(["Assessor", "Comissao"], ascending=[True, False])
+    )
+    return por_conta.groupby("Assessor").head(n).reset_index(drop=True)
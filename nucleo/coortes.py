@@ -0,0 +1,45 @@
+"""
+Coortes de clientes: cada conta entra na coorte do primeiro mês em que
+gerou receita na base, e a comissão de cada mês é somada por coorte.
+
+Parte da comissão por Assessor, Mes_Ano e Conta (ver
+contas.por_assessor_conta): um único groupby-min dá o primeiro mês de cada
+conta, que volta para as linhas com um join, sem laço por conta.
+
+O "primeiro mês" é o primeiro mês presente na base carregada: contas mais
+antigas que o primeiro relatório caem na coorte desse relatório.
+"""
+
+
+def primeiro_mes(df_conta):
+    """Coorte (primeiro Mes_Ano com receita) de cada conta."""
+    return df_conta.groupby("Conta")["Mes_Ano"].min().rename("Coorte")
+
+
+def coortes(df_conta):
+    """Comissão e número de contas por Coorte, Assessor e Mes_Ano."""
+    return (
+        df_conta.join(primeiro_mes(df_conta), on="Conta")
+        .groupby(["Coorte", "Assessor", "Mes_Ano"], as_index=False)
+        .agg(Comissao=("Comissao", "sum"), Contas=("Conta", "nunique"))
+    )
+
+
+def tabela_coortes(df_coortes, valor="Comissao"):
+    """Coorte x Mes_Ano com a soma de `valor`."""
+    return df_coortes.pivot_table(
+        index="Coorte", columns="Mes_Ano", values=valor, aggfunc="sum"
+    )
+
+
+def fatia_coortes_do_ano(df_coortes, mes):
+    """
+    Fração da comissão de `mes` que vem de contas cuja coorte é do mesmo ano
+    (contas que começaram a gerar receita neste ano).
+    """
+    do_mes = df_coortes[df_coortes["Mes_Ano"] == mes]
+    total = do_mes["Comissao"].sum()
+    if not total:
+        return None
+    novas = do_mes.loc[do_mes["Coorte"].str[:4] == mes[:4], "Comissao"].sum()
+    return novas / total
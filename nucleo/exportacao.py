@@ -0,0 +1,15 @@
+"""
+Exportação das bases para Excel.
+"""
+
+from io import BytesIO
+
+import pandas as pd
+
+
+def to_excel_bytes(df, sheet_name="Base"):
+    buffer = BytesIO()
+    with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
+        df.to_excel(writer, index=False, sheet_name=sheet_name)
+    buffer.seek(0)
+    return buffer
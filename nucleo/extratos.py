@@ -0,0 +1,123 @@
+"""
+Extratos mensais por assessor (XLSX e HTML), gerados em lote num ZIP.
+
+A base do mês é particionada por assessor uma única vez (índices do
+groupby), e cada extrato é montado a partir da sua fatia, em paralelo.
+Os arquivos entram no ZIP à medida que ficam prontos.
+"""
+
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from io import BytesIO
+
+import pandas as pd
+
+from nucleo.calculo import calcular_pnl, config_padrao
+from nucleo.formatacao import formata_brl, formata_pct
+
+COLUNAS_VALOR = ["Comissao", "Comissao_Liquida", "Para_Assessor"]
+
+NOMES_COLUNAS = {
+    "Mes_Ano": "Mês",
+    "Comissao": "Comissão bruta",
+    "Comissao_Liquida": "Comissão líquida",
+    "Repasse": "Repasse",
+    "Para_Assessor": "Valor a receber",
+}
+
+
+def particionar(base_mes):
+    """Assessor -> fatia da base, a partir de um único groupby."""
+    indices = base_mes.groupby("Assessor", sort=True).indices
+    return {assessor: base_mes.iloc[posicoes] for assessor, posicoes in indices.items()}
+
+
+def montar_extrato(assessor, df, mes, config):
+    """Tabelas do extrato de um assessor: resumo e comissão por categoria/produto."""
+    por_produto = df.groupby(["Categoria", "Produto"], as_index=False)["Comissao"].sum()
+    por_produto["Assessor"] = assessor
+    por_produto = calcular_pnl(por_produto, config).sort_values(
+        "Comissao", ascending=False
+    )
+
+    resumo = calcular_pnl(
+        pd.DataFrame({"Assessor": [assessor], "Comissao": [df["Comissao"].sum()]}),
+        config,
+    )
+    resumo.insert(1, "Mes_Ano", mes)
+
+    return {
+        "resumo": resumo[["Assessor", "Mes_Ano", "Comissao", "Comissao_Liquida",
+                          "Repasse", "Para_Assessor"]],
+        "por_produto": por_produto[["Categoria", "Produto"] + COLUNAS_VALOR],
+    }
+
+
+def extrato_xlsx(extrato):
+    buffer = BytesIO()
+    with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
+        extrato["resumo"].rename(columns=NOMES_COLUNAS).to_excel(
+            writer, index=False, sheet_name="Resumo"
+        )
+        extrato["por_produto"].rename(columns=NOMES_COLUNAS).to_excel(
+            writer, index=False, sheet_name="Por categoria e produto"
+        )
+    return buffer.getvalue()
+
+
+def extrato_html(extrato):
+    resumo = extrato["resumo"].copy()
+    por_produto = extrato["por_produto"].copy()
+    for tabela in (resumo, por_produto):
+        for col in COLUNAS_VALOR:
+            tabela[col] = tabela[col].apply(formata_brl)
+    resumo["Repasse"] = resumo["Repasse"].apply(lambda x: formata_pct(x, 0))
+
+    assessor = resumo["Assessor"].iloc[0]
+    mes = resumo["Mes_Ano"].iloc[0]
+    return (
+        "<html><head><meta charset='utf-8'>"
+        f"<title>Extrato {assessor} {mes}</title></head><body>"
+        f"<h2>Extrato de comissões - {assessor} ({mes})</h2>"
+        + resumo.rename(columns=NOMES_COLUNAS).to_html(index=False)
+        + "<h3>Comissão por categoria e produto</h3>"
+        + por_produto.rename(columns=NOMES_COLUNAS).to_html(index=False)
+        + "</body></html>"
+    ).encode("utf-8")
+
+
+def _gerar_arquivos(assessor, df, mes, config, formatos):
+    extrato = montar_extrato(assessor, df, mes, config)
+    nome = f"{mes}/{assessor.replace('/', '-')}"
+    arquivos = []
+    if "xlsx" in formatos:
+        arquivos.append((f"{nome}.xlsx", extrato_xlsx(extrato)))
+    if "html" in formatos:
+        arquivos.append((f"{nome}.html", extrato_html(extrato)))
+    return arquivos
+
+
+def gerar_zip(base, mes, destino=None, config=None, formatos=("xlsx", "html"),
+              assessores=None, max_threads=4):
+    """
+    Gera os extratos do mês `mes` (Mes_Ano) de cada assessor da base e grava
+    no ZIP `destino` (caminho ou arquivo aberto). Sem destino, devolve os
+    bytes do ZIP.
+    """
+    config = config or config_padrao()
+    base_mes = base[base["Mes_Ano"] == mes]
+    if assessores is not None:
+        base_mes = base_mes[base_mes["Assessor"].isin(assessores)]
+
+    buffer = BytesIO() if destino is None else destino
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as zf, \
+            ThreadPoolExecutor(max_workers=max_threads) as pool:
+        futuros = [
+            pool.submit(_gerar_arquivos, assessor, df, mes, config, formatos)
+            for assessor, df in particionar(base_mes).items()
+        ]
+        for futuro in as_completed(futuros):
+            for nome, conteudo in futuro.result():
+                zf.writestr(nome, conteudo)
+
+    return buffer.getvalue() if destino is None else None
@@ -0,0 +1,11 @@
+"""
+Formatação de valores para exibição (tabelas do app, extratos).
+"""
+
+
+def formata_brl(x):
+    return f"R$ {x:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def formata_pct(x, casas=1):
+    return f"{x*100:.{casas}f}%"
@@ -0,0 +1,52 @@
+"""
+Composição da receita em níveis (Origem > Categoria > Produto > Tipo de
+receita > Ativo), para o treemap e a tabela de drill-down.
+
+O rollup é montado uma vez por versão dos dados: um groupby sobre as
+linhas no nível mais fino e, a partir dele, cada nível acima somando o de
+baixo (nunca voltando às linhas). Cada nível é uma Series com MultiIndex
+ordenado, então abrir um nível é um `.loc` no índice, não um novo groupby.
+"""
+
+NIVEIS = ["Origem", "Categoria", "Produto", "Tipo_Receita", "Ativo"]
+SEM_VALOR = "(sem valor)"
+
+
+def rollup(base, niveis=NIVEIS, prefixo=("Mes_Ano",), valor="Comissao"):
+    """
+    {profundidade: Series de `valor` indexada por `prefixo` + os primeiros
+    `profundidade` níveis}, de 0 até len(niveis). `base` pode ser de linhas
+    ou de somas já agrupadas por `prefixo` + `niveis`.
+    """
+    niveis = list(niveis)
+    chaves = list(prefixo) + niveis
+    textos = {
+        c: base[c].where(base[c].notna(), SEM_VALOR).astype(str).str.strip()
+        for c in niveis
+    }
+    atual = (
+        base.assign(**textos)
+        .groupby(chaves, sort=True)[valor]
+        .sum()
+    )
+    resultado = {len(niveis): atual}
+    for profundidade in range(len(niveis) - 1, -1, -1):
+        atual = atual.groupby(level=list(range(len(prefixo) + profundidade))).sum()
+        resultado[profundidade] = atual
+    return resultado
+
+
+def filhos(niveis_rollup, prefixo, caminho):
+    """
+    Valor de cada item do nível logo abaixo de `caminho` (valores já
+    escolhidos nos primeiros níveis), do maior para o menor; vazio no último
+    nível ou se o caminho não existir.
+    """
+    serie = niveis_rollup.get(len(caminho) + 1)
+    if serie is None:
+        return niveis_rollup[0].iloc[:0]
+    try:
+        abaixo = serie.loc[tuple(prefixo) + tuple(caminho)]
+    except KeyError:
+        return serie.iloc[:0]
+    return abaixo.sort_values(ascending=False)
@@ -0,0 +1,352 @@
+"""
+Leitura e normalização das planilhas de receitas.
+
+As funções recebem o arquivo (caminho, bytes ou objeto tipo arquivo) e
+devolvem DataFrames prontos; problemas de layout viram ValueError com a
+mensagem que o app mostra ao usuário. `ler_detalhado` não levanta: devolve
+o resultado da leitura de um arquivo (ok ou erro, com motivo e avisos) para
+que um arquivo ruim não derrube a leitura dos demais.
+"""
+
+from io import BytesIO
+
+import pandas as pd
+
+# categorias da planilha Corban para identificar origem
+CATEGORIAS_CORBAN = {
+    "CAMBIO",
+    "CONTA VIRADA",
+    "CREDITO",
+    "CREDITO ESTRUTURADO",
+    "ENERGIA",
+    "FEE TRANSACIONAL",
+    "FEE TRANSACIONAL PME",
+    "MESA CAMBIO",
+}
+
+RENAME_MAP_DETALHADO = {
+    "Data Receita": "Data_Receita",
+    "Conta": "Conta",
+    "Cliente": "Cliente",
+    "Código Assessor": "Codigo_Assessor",
+    "Assessor Principal": "Assessor",
+    "Categoria": "Categoria",
+    "Produto": "Produto",
+    "Ativo": "Ativo",
+    "Código/CNPJ": "Codigo_CNPJ",
+    "Tipo Receita": "Tipo_Receita",
+    "Receita Bruta": "Receita_Bruta",
+    "Receita Líquida": "Receita_Liquida",
+    "Comissão": "Comissao",
+}
+
+# linhas do topo de cada aba olhadas ao procurar as abas com o layout detalhado
+LINHAS_BUSCA_CABECALHO = 50
+
+# dimensões do cubo: tudo que os filtros e as agregações do painel usam
+DIMENSOES_CUBO = ["Ano", "Mes_Ano", "Assessor", "Origem", "Categoria", "Produto"]
+
+
+def _como_arquivo(arquivo):
+    if isinstance(arquivo, (bytes, bytearray)):
+        return BytesIO(arquivo)
+    return arquivo
+
+
+def _tem_cabecalho_detalhado(raw):
+    if raw.empty:
+        return False
+    return bool((raw.iloc[:, 0].astype(str).str.strip().str.upper() == "DATA RECEITA").any())
+
+
+def abas_detalhadas(xls):
+    """
+    Abas do `pd.ExcelFile` com o cabeçalho do relatório detalhado ("Data
+    Receita" na primeira coluna) nas primeiras LINHAS_BUSCA_CABECALHO linhas.
+    Só o topo de cada aba é lido.
+    """
+    encontradas = []
+    for aba in xls.sheet_names:
+        try:
+            topo = xls.parse(aba, header=None, nrows=LINHAS_BUSCA_CABECALHO)
+        except Exception:  # aba de gráfico, protegida...
+            continue
+        if _tem_cabecalho_detalhado(topo):
+            encontradas.append(aba)
+    return encontradas
+
+
+def tratar_detalhado(arquivo, aba_escolhida, nome, avisos=None):
+    """
+    Lê a aba escolhida da planilha detalhada e normaliza as colunas.
+    Funciona mesmo que o cabeçalho não esteja na primeira linha.
+
+    `nome` é usado apenas nas mensagens de erro. Se `avisos` for uma lista,
+    recebe o que foi descartado ou corrigido na leitura.
+    """
+    if avisos is None:
+        avisos = []
+
+    # 1. Lê a aba escolhida sem cabeçalho fixo
+    try:
+        raw = pd.read_excel(_como_arquivo(arquivo), sheet_name=aba_escolhida, header=None)
+    except Exception as erro:  # não é Excel, arquivo corrompido, aba inexistente...
+        raise ValueError(
+            f"Não foi possível ler a aba '{aba_escolhida}' do arquivo {nome}: {erro}"
+        ) from erro
+
+    # 2. Procura a linha onde a primeira coluna é "Data Receita"
+    first_col = raw.iloc[:, 0].astype(str).str.strip().str.upper()
+    header_mask = first_col == "DATA RECEITA"
+    if not header_mask.any():
+        raise ValueError(
+            f"Não encontrei a linha de cabeçalho com 'Data Receita' "
+            f"na aba '{aba_escolhida}' do arquivo {nome}."
+        )
+
+    header_idx = header_mask[header_mask].index[0]
+    header = raw.iloc[header_idx].tolist()
+
+    # 3. Dados a partir da linha seguinte ao cabeçalho
+    df = raw.iloc[header_idx + 1 :].copy()
+    df.columns = header
+    df.columns = df.columns.astype(str).str.strip()
+
+    faltando = [c for c in RENAME_MAP_DETALHADO.keys() if c not in df.columns]
+    if faltando:
+        raise ValueError(
+            f"No arquivo {nome}, aba '{aba_escolhida}', ainda faltam as colunas: {faltando}"
+        )
+
+    df = df.rename(columns=RENAME_MAP_DETALHADO)
+
+    # 4. Conversões
+    # linhas totalmente vazias (rodapé, espaçamento) saem sem aviso
+    preenchidas = df.notna().any(axis=1)
+    df["Data_Receita"] = pd.to_datetime(
+        df["Data_Receita"], errors="coerce", dayfirst=True
+    )
+    sem_data = df["Data_Receita"].isna()
+    descartadas = int((sem_data & preenchidas).sum())
+    if descartadas:
+        avisos.append(
+            f"{descartadas} linha(s) sem Data Receita válida ficaram de fora."
+        )
+    df = df[~sem_data]
+
+    for col in ["Receita_Bruta", "Receita_Liquida", "Comissao"]:
+        valores = pd.to_numeric(df[col], errors="coerce")
+        invalidos = int((valores.isna() & df[col].notna()).sum())
+        if invalidos:
+            avisos.append(
+                f"{invalidos} valor(es) não numéricos em {col} foram tratados como 0."
+            )
+        df[col] = valores.fillna(0)
+
+    df["Assessor"] = df["Assessor"].astype(str).str.strip()
+    df["Categoria"] = df["Categoria"].astype(str).str.strip()
+    df["Produto"] = df["Produto"].astype(str).str.strip()
+
+    df["Ano"] = df["Data_Receita"].dt.year
+    df["Mes"] = df["Data_Receita"].dt.month
+    df["Mes_Ano"] = df["Data_Receita"].dt.strftime("%Y-%m")
+    # várias abas do mesmo arquivo podem entrar na base
+    df["Aba_Origem"] = str(aba_escolhida)
+
+    # 5. Origem (AA x Corban) com base na categoria
+    cat_upper = df["Categoria"].str.upper()
+    df["Origem"] = cat_upper.apply(
+        lambda x: "CORBAN" if x in CATEGORIAS_CORBAN else "AA"
+    )
+
+    return df
+
+
+def ler_detalhado(arquivo, aba_escolhida, nome):
+    """
+    Resultado da leitura de uma planilha detalhada, sem levantar erro:
+
+        {"arquivo", "aba", "status": "ok" | "erro", "motivo", "avisos", "linhas", "df"}
+
+    Com erro, `df` é None e `motivo` explica o problema.
+    """
+    resultado = {
+        "arquivo": nome,
+        "aba": aba_escolhida,
+        "status": "ok",
+        "motivo": None,
+        "avisos": [],
+        "linhas": 0,
+        "df": None,
+    }
+    try:
+        df = tratar_detalhado(arquivo, aba_escolhida, nome, resultado["avisos"])
+    except ValueError as erro:
+        resultado.update(status="erro", motivo=str(erro))
+    except Exception as erro:  # planilha corrompida, formato desconhecido...
+        resultado.update(
+            status="erro",
+            motivo=f"Não foi possível ler o arquivo {nome}: {erro}",
+        )
+    else:
+        resultado.update(df=df, linhas=len(df))
+    return resultado
+
+
+# diferença aceita entre o subtotal do relatório e a soma das contas (centavos)
+TOLERANCIA_SUBTOTAL = 0.01
+
+
+def conferir_subtotais(df, col_receita, col_comissao, tolerancia=TOLERANCIA_SUBTOTAL):
+    """
+    Confere as linhas de subtotal de um relatório B2B (nome do assessor com
+    Conta vazia) contra a soma das contas de cada assessor.
+
+    `df` tem as colunas Assessor, Conta, `col_receita` e `col_comissao` como
+    vieram da planilha (antes de preencher o assessor para baixo). Devolve
+    um DataFrame com Assessor, Coluna, Subtotal, Soma_Contas e Diferenca das
+    divergências (vazio se tudo bate).
+
+    Linhas com nome e Conta vazia sem nenhuma conta abaixo (ex.: total geral
+    no rodapé) não são subtotais de assessor e ficam de fora.
+    """
+    valores = [col_receita, col_comissao]
+    numeros = df[valores].apply(pd.to_numeric, errors="coerce")
+    assessor = df["Assessor"].ffill()
+    valido = assessor.notna() & (assessor != "Assessor Principal")
+
+    e_subtotal = valido & df["Assessor"].notna() & df["Conta"].isna() & numeros.notna().any(axis=1)
+    e_conta = valido & df["Conta"].notna()
+
+    subtotais = numeros[e_subtotal].groupby(assessor[e_subtotal]).sum(min_count=1)
+    subtotais = subtotais[subtotais.index.isin(assessor[e_conta].unique())]
+    somas = (
+        numeros[e_conta].groupby(assessor[e_conta]).sum()
+        .reindex(subtotais.index, fill_value=0.0)
+    )
+    diferenca = somas - subtotais
+
+    divergencias = (
+        pd.DataFrame({
+            "Subtotal": subtotais.stack(),
+            "Soma_Contas": somas.stack(),
+            "Diferenca": diferenca.stack(),
+        })
+        .rename_axis(["Assessor", "Coluna"])
+        .reset_index()
+    )
+    return divergencias[divergencias["Diferenca"].abs() > tolerancia].reset_index(drop=True)
+
+
+def descrever_divergencias(nome, divergencias):
+    """
+    Aviso para o arquivo `nome` a partir da lista de divergências preenchida
+    pelos tratamentos B2B (ver conferir_subtotais), ou None se tudo bate.
+    """
+    if not divergencias:
+        return None
+    assessores = pd.concat(divergencias)["Assessor"].nunique()
+    return f"{nome}: {assessores} assessor(es) com subtotal diferente da soma das contas."
+
+
+def _tratar_relatorio_b2b(arquivo, competencia_date, col_receita, col_comissao, divergencias=None):
+    """
+    Layout comum dos relatórios B2B (AA e Corban): colunas 5..8 com
+    Assessor, Conta, Receita Líquida e Comissão.
+
+    Preenche o nome do assessor para baixo, remove cabeçalhos internos,
+    linhas vazias e as linhas de subtotal (Conta vazia) e adiciona a
+    competência. Antes de descartar os subtotais, confere cada um com a
+    soma das contas do assessor; se `divergencias` for uma lista, recebe o
+    DataFrame de conferir_subtotais quando algo não bate.
+    """
+    df = pd.read_excel(_como_arquivo(arquivo))
+
+    df2 = df.iloc[:, [5, 6, 7, 8]].copy()
+    df2.columns = ["Assessor", "Conta", col_receita, col_comissao]
+
+    if divergencias is not None:
+        conferencia = conferir_subtotais(df2, col_receita, col_comissao)
+        if not conferencia.empty:
+            divergencias.append(conferencia)
+
+    df2["Assessor"] = df2["Assessor"].ffill()
+
+    df2 = df2[df2["Assessor"].notna()]
+    df2 = df2[df2["Assessor"] != "Assessor Principal"]
+
+    df2[col_receita] = pd.to_numeric(df2[col_receita], errors="coerce")
+    df2[col_comissao] = pd.to_numeric(df2[col_comissao], errors="coerce")
+
+    df2 = df2[df2["Conta"].notna()]
+
+    df2 = df2[~(df2[col_receita].isna() & df2[col_comissao].isna())]
+
+    competencia_ts = pd.to_datetime(competencia_date)
+    df2["Competencia"] = competencia_ts
+    df2["Ano"] = df2["Competencia"].dt.year
+    df2["Mes"] = df2["Competencia"].dt.month
+    df2["Mes_Ano"] = df2["Competencia"].dt.strftime("%Y-%m")
+
+    return df2
+
+
+def tratar_relatorio_aa(arquivo, competencia_date, divergencias=None):
+    """
+    Tratamento do relatório B2B de AA.
+
+    Colunas usadas (por índice):
+    5 -> Assessor
+    6 -> Conta
+    7 -> Receita Líquida
+    8 -> Comissão AA
+
+    Retorna DataFrame com:
+    Assessor, Conta, Receita_Liquida_AA, Comissao_AA, Competencia, Ano, Mes, Mes_Ano
+    """
+    return _tratar_relatorio_b2b(
+        arquivo, competencia_date, "Receita_Liquida_AA", "Comissao_AA", divergencias
+    )
+
+
+def tratar_relatorio_corban(arquivo, competencia_date, divergencias=None):
+    """
+    Tratamento do relatório de Corban.
+
+    Assumo o mesmo layout geral: colunas 5..8,
+    onde a 8ª coluna é a Comissão de Corban.
+
+    Retorna DataFrame com:
+    Assessor, Conta, Receita_Liquida_Corban (se existir), Comissao_Corban,
+    Competencia, Ano, Mes, Mes_Ano
+    """
+    return _tratar_relatorio_b2b(
+        arquivo, competencia_date, "Receita_Liquida_Corban", "Comissao_Corban", divergencias
+    )
+
+
+def montar_dados(frames, cubos=()):
+    """
+    Junta as bases já tratadas e monta o cubo (comissão somada por
+    DIMENSOES_CUBO), que é o que os filtros do painel usam.
+
+    `cubos` são cubos já agregados em outro lugar (ex.: pelo DuckDB sobre o
+    armazém); entram só no cubo, não na base.
+    """
+    cubos = list(cubos)
+    base = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    if frames:
+        cubos.append(base.groupby(DIMENSOES_CUBO, as_index=False)["Comissao"].sum())
+
+    if not cubos:
+        # nenhum arquivo lido com sucesso
+        return {"base": base, "cubo": pd.DataFrame(columns=DIMENSOES_CUBO + ["Comissao"])}
+
+    cubo = cubos[0]
+    if len(cubos) > 1:
+        cubo = (
+            pd.concat(cubos, ignore_index=True)
+            .groupby(DIMENSOES_CUBO, as_index=False)["Comissao"]
+            .sum()
+        )
+    return {"base": base, "cubo": cubo}
@@ -0,0 +1,73 @@
+"""
+Consultas por intervalo: janelas de meses (trimestre, semestre, últimos N
+meses...) e intervalos de datas quaisquer.
+
+- Janelas de meses saem de somas acumuladas sobre a grade grupo x mês do
+  cubo: a soma de qualquer intervalo de meses é a diferença de duas colunas,
+  sem filtrar o cubo de novo.
+- Intervalos de datas usam a base ordenada por Data_Receita (a permutação
+  das linhas, montada uma vez por versão dos dados): as linhas do intervalo
+  são achadas com duas buscas binárias e formam uma fatia.
+"""
+
+import numpy as np
+import pandas as pd
+
+from nucleo.variacao import grade_mensal
+
+JANELAS = ["Trimestre", "Semestre", "Ano", "Últimos 3 meses", "Últimos 6 meses", "Últimos 12 meses"]
+
+
+def acumulados(cubo, chaves, valor="Comissao"):
+    """
+    {"grupos", "meses", "soma"}: `soma[:, j]` é o total de cada grupo nos j
+    primeiros meses (a primeira coluna é zero).
+    """
+    grupos, meses, matriz = grade_mensal(cubo, chaves, valor)
+    soma = np.zeros((matriz.shape[0], matriz.shape[1] + 1))
+    np.cumsum(matriz, axis=1, out=soma[:, 1:])
+    return {"grupos": grupos, "meses": list(meses), "soma": soma}
+
+
+def soma_meses(acumulado, mes_inicio, mes_fim):
+    """Total de cada grupo de `mes_inicio` a `mes_fim` (inclusive), como Series."""
+    meses = acumulado["meses"]
+    inicio = np.searchsorted(meses, mes_inicio, side="left")
+    fim = np.searchsorted(meses, mes_fim, side="right")
+    soma = acumulado["soma"]
+    return pd.Series(soma[:, fim] - soma[:, inicio], index=acumulado["grupos"])
+
+
+def janela(nome, mes):
+    """(primeiro mês, último mês) da janela `nome` (ver JANELAS) que contém ou termina em `mes`."""
+    periodo = pd.Period(mes, freq="M")
+    if nome == "Trimestre":
+        inicio = pd.Period(year=periodo.year, month=3 * ((periodo.month - 1) // 3) + 1, freq="M")
+        fim = inicio + 2
+    elif nome == "Semestre":
+        inicio = pd.Period(year=periodo.year, month=1 if periodo.month <= 6 else 7, freq="M")
+        fim = inicio + 5
+    elif nome == "Ano":
+        inicio = pd.Period(year=periodo.year, month=1, freq="M")
+        fim = inicio + 11
+    else:
+        # "Últimos N meses"
+        inicio = periodo - (int(nome.split()[1]) - 1)
+        fim = periodo
+    return str(inicio), str(fim)
+
+
+def indexar_datas(base):
+    """Índice da base por Data_Receita: {"datas": datas em ordem, "ordem": linhas nessa ordem}."""
+    datas = base["Data_Receita"].to_numpy(dtype="datetime64[ns]")
+    ordem = np.argsort(datas, kind="stable")
+    return {"datas": datas[ordem], "ordem": ordem}
+
+
+def linhas_no_intervalo(base, indice, inicio, fim):
+    """Linhas da base com Data_Receita entre `inicio` e `fim` (datas, inclusive)."""
+    inicio = np.datetime64(pd.Timestamp(inicio), "ns")
+    depois_do_fim = np.datetime64(pd.Timestamp(fim) + pd.Timedelta(days=1), "ns")
+    a = np.searchsorted(indice["datas"], inicio, side="left")
+    b = np.searchsorted(indice["datas"], depois_do_fim, side="left")
+    return base.iloc[indice["ordem"][a:b]]
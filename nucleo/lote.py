@@ -0,0 +1,143 @@
+"""
+Modo em lote (sem interface): lê uma pasta de relatórios, calcula o PNL e
+grava os resultados em Parquet e XLSX. Pensado para rodar agendado (cron).
+
+A pasta segue o mesmo formato do vigia (subpastas detalhado/, aa/ e corban/).
+A leitura passa pelo armazém, então uma segunda execução só relê os arquivos
+novos ou alterados.
+
+Uso:
+
+    python -m nucleo.lote PASTA SAIDA [--config pnl.json] [--armazem DIR] [--processos N]
+                                      [--extratos AAAA-MM ...]
+
+O JSON de configuração pode trazer repasse_por_assessor, default_repasse e
+aliquota_imposto; o que faltar usa os valores padrão dos apps.
+"""
+
+import argparse
+import logging
+import os
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from nucleo import armazem, extratos, vigia
+from nucleo.calculo import agregar_assessor_mes, carregar_config, pnl_anual, pnl_mensal
+from nucleo.ingestao import montar_dados
+
+log = logging.getLogger("nucleo.lote")
+
+
+def comissao_b2b(frames_aa, frames_corban):
+    """
+    Comissão por assessor e mês dos relatórios B2B:
+    Comissão total = Comissão AA + Comissão Corban.
+    """
+    partes = []
+    for frames, coluna in [(frames_aa, "Comissao_AA"), (frames_corban, "Comissao_Corban")]:
+        if frames:
+            partes.append(
+                agregar_assessor_mes(pd.concat(frames, ignore_index=True), coluna)
+                .set_index(["Ano", "Mes_Ano", "Assessor"])
+            )
+    if not partes:
+        return None
+
+    df = pd.concat(partes, axis=1).fillna(0)
+    for coluna in ["Comissao_AA", "Comissao_Corban"]:
+        if coluna not in df:
+            df[coluna] = 0.0
+    df["Comissao"] = df["Comissao_AA"] + df["Comissao_Corban"]
+    return df.reset_index()
+
+
+def calcular(raiz_armazem, config):
+    """Tabelas de saída (nome -> DataFrame) a partir do armazém."""
+    tabelas = {}
+
+    frames_detalhado = armazem.ler_tipo(raiz_armazem, "detalhado")
+    if frames_detalhado:
+        dados = montar_dados(frames_detalhado)
+        df_ass_mes = agregar_assessor_mes(dados["cubo"])
+        tabelas["base_detalhada"] = dados["base"]
+        tabelas["cubo_detalhado"] = dados["cubo"]
+        tabelas["pnl_mensal_detalhado"] = pnl_mensal(df_ass_mes, config)
+        tabelas["pnl_anual_detalhado"] = pnl_anual(df_ass_mes, config)
+
+    df_b2b = comissao_b2b(
+        armazem.ler_tipo(raiz_armazem, "aa"),
+        armazem.ler_tipo(raiz_armazem, "corban"),
+    )
+    if df_b2b is not None:
+        tabelas["pnl_mensal_b2b"] = pnl_mensal(df_b2b, config)
+        tabelas["pnl_anual_b2b"] = pnl_anual(df_b2b, config)
+
+    return tabelas
+
+
+def gravar(tabelas, saida):
+    """
+    Um Parquet por tabela e um XLSX com as tabelas agregadas
+    (as bases linha a linha ficam só no Parquet).
+    """
+    saida = Path(saida)
+    saida.mkdir(parents=True, exist_ok=True)
+
+    for nome, df in tabelas.items():
+        df.to_parquet(saida / f"{nome}.parquet", index=False)
+
+    agregadas = {n: df for n, df in tabelas.items() if not n.startswith("base_")}
+    if agregadas:
+        with pd.ExcelWriter(saida / "pnl.xlsx", engine="xlsxwriter") as writer:
+            for nome, df in agregadas.items():
+                df.to_excel(writer, index=False, sheet_name=nome[:31])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calcula o PNL em lote, sem interface.")
+    parser.add_argument("pasta", help="pasta com as subpastas detalhado/, aa/ e corban/")
+    parser.add_argument("saida", help="pasta onde gravar os Parquet e o pnl.xlsx")
+    parser.add_argument("--config", help="JSON com repasse_por_assessor, default_repasse "
+                                         "e aliquota_imposto")
+    parser.add_argument("--armazem", help="pasta do armazém (padrão: SAIDA/armazem)")
+    parser.add_argument("--processos", type=int, default=os.cpu_count() or 1,
+                        help="processos para ler os arquivos (padrão: núcleos da máquina)")
+    parser.add_argument("--extratos", nargs="+", metavar="AAAA-MM", default=[],
+                        help="gera extratos_AAAA-MM.zip por assessor para esses meses")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    inicio = time.perf_counter()
+    config = carregar_config(args.config)
+    raiz_armazem = args.armazem or os.path.join(args.saida, "armazem")
+
+    # no lote não há cópia em andamento: lê tudo o que estiver na pasta
+    vigia.varrer(args.pasta, raiz_armazem, espera=0, processos=args.processos)
+
+    tabelas = calcular(raiz_armazem, config)
+    if not tabelas:
+        log.warning("Nenhum relatório encontrado em %s", args.pasta)
+        return 1
+
+    gravar(tabelas, args.saida)
+
+    for mes in args.extratos:
+        if "base_detalhada" not in tabelas:
+            log.warning("Extratos precisam do relatório detalhado; nada gerado.")
+            break
+        extratos.gerar_zip(
+            tabelas["base_detalhada"], mes,
+            destino=Path(args.saida) / f"extratos_{mes}.zip", config=config,
+        )
+    log.info(
+        "PNL gravado em %s (%s) em %.1fs",
+        args.saida, ", ".join(tabelas), time.perf_counter() - inicio
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
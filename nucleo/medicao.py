@@ -0,0 +1,116 @@
+"""
+Medição leve das etapas do app (tempo, tamanho das tabelas, acertos de cache).
+
+Cada rerun abre um registro com `iniciar_rerun()`; as etapas são medidas com
+
+    with etapa("filtro") as m:
+        cubo_filtrado = cubo[mask]
+        m["df"] = cubo_filtrado
+
+e `finalizar_rerun()` fecha o registro com os totais e emite uma linha de log
+JSON no logger "nucleo.medicao". O registro fica numa ContextVar, então cada
+sessão (thread do script) mede só o seu rerun.
+
+O `memory_usage(deep=True)` percorre as strings da tabela; por isso só é
+calculado quando o registro foi aberto com `memoria=True` (painel de debug).
+"""
+
+import contextvars
+import json
+import logging
+import time
+from contextlib import contextmanager
+
+log = logging.getLogger("nucleo.medicao")
+
+_registro = contextvars.ContextVar("registro_medicao", default=None)
+
+
+def configurar_log(destino="-"):
+    """
+    Liga a saída dos logs de medição: "-" para o stderr ou o caminho de um
+    arquivo (uma linha JSON por rerun).
+    """
+    if log.handlers:
+        return
+    handler = logging.StreamHandler() if destino == "-" else logging.FileHandler(destino)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    log.addHandler(handler)
+    log.setLevel(logging.INFO)
+    log.propagate = False
+
+
+def iniciar_rerun(rotulo="rerun", memoria=False):
+    registro = {
+        "rotulo": rotulo,
+        "memoria": memoria,
+        "inicio": time.perf_counter(),
+        "etapas": [],
+        "cache": {},
+    }
+    _registro.set(registro)
+    return registro
+
+
+@contextmanager
+def etapa(nome):
+    """
+    Mede o bloco. O dict devolvido aceita "df" (DataFrame produzido pela
+    etapa, para linhas e memória) e outros campos livres.
+
+    Fora de um rerun (ex.: o arquivo de um download gerado sob demanda) a
+    medida vira uma linha de log avulsa.
+    """
+    medida = {}
+    inicio = time.perf_counter()
+    try:
+        yield medida
+    finally:
+        registro = _registro.get()
+        df = medida.pop("df", None)
+        item = {"etapa": nome, "segundos": time.perf_counter() - inicio, **medida}
+        if df is not None:
+            item["linhas"] = len(df)
+            if registro is not None and registro["memoria"]:
+                item["memoria_mb"] = df.memory_usage(deep=True).sum() / 1024 / 1024
+        if registro is not None:
+            registro["etapas"].append(item)
+        else:
+            evento("etapa", **item)
+
+
+def contar_cache(nome, acerto):
+    """Conta um acerto ou uma falta do cache `nome` no rerun atual."""
+    registro = _registro.get()
+    if registro is not None:
+        contagem = registro["cache"].setdefault(nome, {"acertos": 0, "faltas": 0})
+        contagem["acertos" if acerto else "faltas"] += 1
+
+
+def evento(nome, **campos):
+    """Linha de log JSON avulsa (ex.: leitura de um arquivo em segundo plano)."""
+    log.info(json.dumps({"evento": nome, **campos}, ensure_ascii=False, default=str))
+
+
+def finalizar_rerun():
+    """Fecha o registro do rerun atual, emite o log JSON e devolve o resumo."""
+    registro = _registro.get()
+    if registro is None:
+        return None
+    _registro.set(None)
+
+    resumo = {
+        "evento": registro["rotulo"],
+        "segundos_total": time.perf_counter() - registro["inicio"],
+        "segundos_etapas": sum(e["segundos"] for e in registro["etapas"]),
+        "etapas": registro["etapas"],
+        "cache": {
+            nome: {
+                **c,
+                "taxa_acerto": c["acertos"] / (c["acertos"] + c["faltas"]),
+            }
+            for nome, c in registro["cache"].items()
+        },
+    }
+    log.info(json.dumps(resumo, ensure_ascii=False, default=str))
+    return resumo
@@ -0,0 +1,44 @@
+"""
+Séries diárias e semanais de receita e comissão por assessor e categoria,
+a partir da data real (Data_Receita) em vez do Mes_Ano.
+
+Um único groupby por dia, assessor e categoria é feito sobre as linhas
+(`diario`, ou o mesmo GROUP BY no DuckDB para o armazém); as séries por
+assessor, por categoria e semanais saem dele, sem voltar à base. O conjunto
+é montado uma vez por versão dos dados.
+"""
+
+VALORES = ["Comissao", "Receita_Liquida"]
+CHAVES = ["Assessor", "Categoria"]
+
+
+def _por(df, chaves):
+    return df.groupby(chaves, as_index=False, sort=True)[VALORES].sum()
+
+
+def diario(base):
+    """Soma dos VALORES por dia (Data), assessor e categoria nas linhas da base."""
+    return _por(
+        base.assign(Data=base["Data_Receita"].dt.normalize()),
+        ["Data"] + CHAVES,
+    )
+
+
+def series(diario):
+    """
+    {(granularidade, chave): DataFrame Data, chave, Comissao, Receita_Liquida}
+    com granularidade "D" (dia) ou "W" (semana, começando na segunda) e
+    chave "Assessor" ou "Categoria", a partir das somas diárias de `diario`
+    (que pode juntar as de mais de uma fonte).
+    """
+    diario = _por(diario.astype({"Data": "datetime64[ns]"}), ["Data"] + CHAVES)
+    semanal = _por(
+        diario.assign(Data=diario["Data"].dt.to_period("W-SUN").dt.start_time),
+        ["Data"] + CHAVES,
+    )
+
+    resultado = {}
+    for chave in CHAVES:
+        resultado[("D", chave)] = _por(diario, ["Data", chave])
+        resultado[("W", chave)] = _por(semanal, ["Data", chave])
+    return resultado
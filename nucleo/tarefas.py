@@ -0,0 +1,179 @@
+"""
+Leitura dos arquivos em segundo plano.
+
+Os arquivos são lidos em um pool de threads enquanto o app continua
+mostrando os dados já carregados. Não usamos pool de processos: o Streamlit
+registra o script do app como __main__, e os processos filhos (spawn) o
+executariam inteiro de novo ao iniciar.
+
+Uma tarefa é um dict com um par (nome, Future) por arquivo; o app consulta
+o progresso a cada rerun e troca a base de uma vez quando tudo termina.
+
+O resultado de cada arquivo (ok ou erro, ver ingestao.ler_detalhado) fica no
+cache compartilhado por (hash do conteúdo, aba): quando um arquivo com erro
+é corrigido e enviado de novo, só ele é relido.
+
+A planilha aberta (pd.ExcelFile) também fica no cache por hash: listar as
+abas, detectar as abas detalhadas e ler cada aba usam o mesmo ExcelFile, sem
+reabrir o arquivo. Abrir custa o parse dos textos compartilhados da planilha
+(~1s numa planilha com 80 mil textos distintos), pago uma vez por arquivo e
+não uma vez por aba.
+
+O ExcelFile não pode ser usado por duas threads ao mesmo tempo, então as
+abas de um mesmo arquivo são lidas uma de cada vez (arquivos diferentes
+seguem em paralelo). Isso não custa tempo: o parse do openpyxl é Python puro
+e segura o GIL, e ler as abas em threads não era mais rápido.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import pandas as pd
+
+from nucleo import cache_compartilhado, medicao
+from nucleo.ingestao import abas_detalhadas, ler_detalhado
+
+MAX_THREADS = int(os.environ.get("PNL_THREADS_INGESTAO", "4"))
+
+_trava = threading.Lock()
+_executor = None
+
+
+def executor():
+    """Pool de threads do processo (compartilhado pelas sessões), criado no primeiro uso."""
+    global _executor
+    with _trava:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=MAX_THREADS, thread_name_prefix="ingestao"
+            )
+        return _executor
+
+
+def _abrir(conteudo):
+    xls = pd.ExcelFile(BytesIO(conteudo))
+    return {
+        "xls": xls,
+        "abas": xls.sheet_names,
+        # o ExcelFile não pode ser lido por duas threads ao mesmo tempo
+        "trava": threading.Lock(),
+        # só para o orçamento do cache contar o arquivo guardado
+        "conteudo": conteudo,
+    }
+
+
+def abrir_planilha(conteudo, hash_conteudo):
+    """
+    Planilha aberta de um upload: {"xls", "abas", "trava", ...}, do cache
+    compartilhado quando já aberta. Levanta o erro do pandas se o arquivo não
+    for uma planilha válida.
+    """
+    planilha, _ = cache_compartilhado.reservar(
+        ("planilha", hash_conteudo), lambda: _abrir(conteudo)
+    )
+    return planilha
+
+
+def detectar_abas(conteudo, hash_conteudo):
+    """Abas com o layout detalhado (ver ingestao.abas_detalhadas), uma vez por arquivo."""
+
+    def detectar():
+        planilha = abrir_planilha(conteudo, hash_conteudo)
+        with planilha["trava"]:
+            return abas_detalhadas(planilha["xls"])
+
+    abas, _ = cache_compartilhado.reservar(("abas_detalhadas", hash_conteudo), detectar)
+    return abas
+
+
+def _ler_e_medir(conteudo, aba, nome, hash_conteudo):
+    inicio = time.perf_counter()
+    try:
+        planilha = abrir_planilha(conteudo, hash_conteudo)
+    except Exception:
+        # ler_detalhado devolve o erro com o motivo
+        resultado = ler_detalhado(conteudo, aba, nome)
+    else:
+        with planilha["trava"]:
+            resultado = ler_detalhado(planilha["xls"], aba, nome)
+    medicao.evento(
+        "ingestao_arquivo",
+        arquivo=nome,
+        aba=aba,
+        segundos=time.perf_counter() - inicio,
+        status=resultado["status"],
+        linhas=resultado["linhas"],
+    )
+    return resultado
+
+
+def ler_arquivo(conteudo, aba, nome, hash_conteudo):
+    """Resultado da leitura de um arquivo, do cache compartilhado quando já lido."""
+    # a reserva não é guardada: a entrada fica no cache, mas pode ser
+    # descartada pelo orçamento de memória
+    resultado, _ = cache_compartilhado.reservar(
+        ("arquivo", hash_conteudo, aba),
+        lambda: _ler_e_medir(conteudo, aba, nome, hash_conteudo),
+    )
+    return resultado
+
+
+def iniciar_ingestao(arquivos, versao):
+    """
+    Envia cada (nome, conteudo, aba, hash do conteúdo) de `arquivos` para o
+    pool.
+
+    `conteudo` são os bytes do arquivo, para que a leitura não dependa do
+    objeto de upload da sessão.
+    """
+    pool = executor()
+    return {
+        "versao": versao,
+        "inicio": time.monotonic(),
+        "futuros": [
+            (nome, pool.submit(ler_arquivo, conteudo, aba, nome, h))
+            for nome, conteudo, aba, h in arquivos
+        ],
+    }
+
+
+def cancelar(tarefa):
+    """Cancela o que ainda está na fila (o que já está rodando termina sozinho)."""
+    if tarefa is not None:
+        for _, futuro in tarefa["futuros"]:
+            futuro.cancel()
+
+
+def progresso(tarefa):
+    """Status de cada arquivo: na fila, lendo, concluído ou erro."""
+    status = []
+    for nome, futuro in tarefa["futuros"]:
+        if futuro.done():
+            erro = None if futuro.cancelled() else futuro.exception()
+            if erro is None and not futuro.cancelled():
+                resultado = futuro.result()
+                erro = resultado["motivo"] if resultado["status"] == "erro" else None
+            status.append({
+                "arquivo": nome,
+                "status": "erro" if erro else "concluído",
+                "mensagem": str(erro) if erro else "",
+            })
+        else:
+            status.append({
+                "arquivo": nome,
+                "status": "lendo" if futuro.running() else "na fila",
+                "mensagem": "",
+            })
+    return status
+
+
+def concluida(tarefa):
+    return all(futuro.done() for _, futuro in tarefa["futuros"])
+
+
+def resultados(tarefa):
+    """Resultados da leitura (ver ingestao.ler_detalhado) na ordem de envio."""
+    return [futuro.result() for _, futuro in tarefa["futuros"]]
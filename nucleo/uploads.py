@@ -0,0 +1,98 @@
+"""
+Controle dos arquivos enviados: duplicatas exatas (mesmo conteúdo) são
+descartadas antes de qualquer leitura e arquivos cujos períodos se cruzam
+são apontados antes de entrarem em dobro na base.
+
+O período de um arquivo é (primeiro dia, último dia) coberto por ele: as
+datas mínima e máxima de Data_Receita no relatório detalhado ou o mês da
+competência nos relatórios B2B.
+"""
+
+import calendar
+import hashlib
+from datetime import date
+
+
+def hash_conteudo(conteudo):
+    return hashlib.sha1(conteudo).hexdigest()
+
+
+def separar_duplicados(arquivos, chave):
+    """
+    Separa `arquivos` em (únicos, duplicados) pela `chave` de cada um
+    (ex.: hash do conteúdo). Cada duplicado vem como (arquivo, primeiro
+    arquivo com a mesma chave); a ordem dos únicos é mantida.
+    """
+    vistos = {}
+    unicos = []
+    duplicados = []
+    for arquivo in arquivos:
+        k = chave(arquivo)
+        if k in vistos:
+            duplicados.append((arquivo, vistos[k]))
+        else:
+            vistos[k] = arquivo
+            unicos.append(arquivo)
+    return unicos, duplicados
+
+
+def periodo(df, coluna="Data_Receita"):
+    """(primeira, última) data de `coluna`, ou None se a base estiver vazia."""
+    if df.empty:
+        return None
+    return df[coluna].min().date(), df[coluna].max().date()
+
+
+def periodo_competencia(competencia):
+    """Primeiro e último dia do mês da competência."""
+    ultimo = calendar.monthrange(competencia.year, competencia.month)[1]
+    return (
+        date(competencia.year, competencia.month, 1),
+        date(competencia.year, competencia.month, ultimo),
+    )
+
+
+def juntar_periodos(periodos):
+    """
+    Um período por nome a partir de pares (nome, período): as abas de um
+    mesmo arquivo viram o trecho da primeira à última data entre elas.
+    """
+    juntos = {}
+    for nome, p in periodos:
+        atual = juntos.get(nome)
+        if atual is None or p is None:
+            juntos[nome] = atual or p
+        else:
+            juntos[nome] = (min(atual[0], p[0]), max(atual[1], p[1]))
+    return list(juntos.items())
+
+
+def sobreposicoes(periodos):
+    """
+    Pares de arquivos com períodos que se cruzam, a partir de pares
+    (nome, período). Devolve (nome_a, nome_b, início, fim) com o trecho em
+    comum; períodos None são ignorados.
+    """
+    itens = sorted(
+        ((nome, p) for nome, p in periodos if p is not None),
+        key=lambda item: item[1][0],
+    )
+    resultado = []
+    abertos = []  # (fim, nome) dos períodos que ainda podem cruzar os próximos
+    for nome, (inicio, fim) in itens:
+        abertos = [a for a in abertos if a[0] >= inicio]
+        for fim_aberto, nome_aberto in abertos:
+            resultado.append((nome_aberto, nome, inicio, min(fim, fim_aberto)))
+        abertos.append((fim, nome))
+    return resultado
+
+
+def descrever_sobreposicao(nome_a, nome_b, inicio, fim):
+    if inicio == fim:
+        trecho = f"em {inicio:%d/%m/%Y}"
+    else:
+        trecho = f"de {inicio:%d/%m/%Y} a {fim:%d/%m/%Y}"
+    return (
+        f"{nome_a} e {nome_b} têm receitas no mesmo período ({trecho}); "
+        f"se forem o mesmo relatório, os valores desse trecho entram em dobro."
+    )
@@ -0,0 +1,96 @@
+"""
+Variação da comissão contra o mês anterior (MoM) e o mesmo mês do ano
+anterior (YoY), por assessor, categoria ou produto.
+
+O cubo é posto numa grade densa grupo x mês (todos os meses entre o primeiro
+e o último, com zero onde não houve comissão). Assim o "mês anterior" é a
+coluna anterior e o "ano anterior" está 12 colunas atrás: as variações de
+todos os meses saem de arrays deslocados, sem filtrar o cubo mês a mês.
+
+A variação de cada grupo é dividida em dois efeitos, em relação ao total do
+grupo pai (todos os grupos, ou os de um mesmo assessor, por exemplo):
+
+    volume = (total atual - total anterior) * participação anterior do grupo
+    mix    = variação do grupo - volume
+
+O volume soma a variação do total; o mix soma zero e mostra quem ganhou ou
+perdeu participação. Sem total anterior (pai zerado), toda a variação é volume.
+"""
+
+import numpy as np
+import pandas as pd
+
+DEFASAGENS = {"MoM": 1, "YoY": 12}
+
+
+def grade_mensal(cubo, chaves, valor="Comissao"):
+    """
+    (grupos, meses, matriz grupo x mês) com todos os meses entre o primeiro e
+    o último do cubo.
+    """
+    chaves = list(chaves)
+    meses = pd.period_range(cubo["Mes_Ano"].min(), cubo["Mes_Ano"].max(), freq="M")
+    tabela = cubo.pivot_table(
+        index=chaves, columns="Mes_Ano", values=valor, aggfunc="sum", fill_value=0.0
+    ).reindex(columns=meses.strftime("%Y-%m"), fill_value=0.0)
+    return tabela.index, tabela.columns, tabela.to_numpy(dtype=float)
+
+
+def _anterior(matriz, defasagem):
+    """Matriz deslocada `defasagem` meses para a direita (NaN onde não há mês anterior)."""
+    anterior = np.full_like(matriz, np.nan)
+    if defasagem < matriz.shape[1]:
+        anterior[:, defasagem:] = matriz[:, :-defasagem]
+    return anterior
+
+
+def _totais_do_pai(matriz, codigos_pai):
+    """Total do grupo pai de cada linha, por mês."""
+    if codigos_pai is None:
+        return np.broadcast_to(matriz.sum(axis=0), matriz.shape)
+    totais = np.zeros((codigos_pai.max() + 1, matriz.shape[1]))
+    np.add.at(totais, codigos_pai, matriz)
+    return totais[codigos_pai]
+
+
+def variacoes(cubo, chaves, pai=None, valor="Comissao"):
+    """
+    Por `chaves` e Mes_Ano: `valor` e, para MoM e YoY, o valor de
+    comparação (Anterior_*), a variação (Delta_*), a variação relativa
+    (Pct_*) e os efeitos Volume_* e Mix_* em relação aos totais de `pai`
+    (colunas de `chaves`; None compara com o total geral).
+    """
+    chaves = list(chaves)
+    grupos, meses, atual = grade_mensal(cubo, chaves, valor)
+
+    codigos_pai = None
+    if pai:
+        codigos_pai = pd.MultiIndex.from_frame(
+            grupos.to_frame(index=False)[list(pai)]
+        ).factorize()[0]
+    total_atual = _totais_do_pai(atual, codigos_pai)
+
+    colunas = {valor: atual}
+    for nome, defasagem in DEFASAGENS.items():
+        anterior = _anterior(atual, defasagem)
+        total_anterior = _anterior(total_atual, defasagem)
+        delta = atual - anterior
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pct = np.where(anterior != 0, delta / np.abs(anterior), np.nan)
+            participacao = np.where(total_anterior != 0, anterior / total_anterior, 0.0)
+        volume = np.where(
+            total_anterior != 0, (total_atual - total_anterior) * participacao, delta
+        )
+
+        colunas[f"Anterior_{nome}"] = anterior
+        colunas[f"Delta_{nome}"] = delta
+        colunas[f"Pct_{nome}"] = pct
+        colunas[f"Volume_{nome}"] = volume
+        colunas[f"Mix_{nome}"] = delta - volume
+
+    linhas, mes = np.indices(atual.shape).reshape(2, -1)
+    resultado = grupos.to_frame(index=False).iloc[linhas].reset_index(drop=True)
+    resultado["Mes_Ano"] = np.asarray(meses)[mes]
+    for nome, matriz in colunas.items():
+        resultado[nome] = matriz.ravel()
+    return resultado
@@ -0,0 +1,256 @@
+"""
+Vigia de pasta: lê automaticamente os relatórios que chegam na pasta
+compartilhada e atualiza o armazém.
+
+A pasta vigiada tem uma subpasta por tipo de relatório:
+
+    <pasta>/detalhado/*.xlsx   relatório detalhado (aba 0, cabeçalho "Data Receita")
+    <pasta>/aa/*.xlsx          relatório B2B de Agente Autônomo
+    <pasta>/corban/*.xlsx      relatório de Corban
+
+Os relatórios B2B não trazem a data; a competência vem do nome do arquivo
+(ex.: "aa_2025-03.xlsx", "corban 03-2025.xlsx").
+
+Uso:
+
+    python -m nucleo.vigia PASTA ARMAZEM [--intervalo 30] [--uma-vez] [--processos N]
+"""
+
+import argparse
+import hashlib
+import logging
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from pathlib import Path
+
+from nucleo import armazem, uploads
+from nucleo.ingestao import (
+    tratar_detalhado,
+    tratar_relatorio_aa,
+    tratar_relatorio_corban,
+)
+
+log = logging.getLogger("nucleo.vigia")
+
+EXTENSOES = {".xlsx", ".xls"}
+
+# arquivos alterados há menos que isso ainda podem estar sendo copiados
+ESPERA_ESTABILIDADE = 5.0
+
+_RE_ANO_MES = re.compile(r"(20\d{2})[-_. ]?(0[1-9]|1[0-2])(?!\d)")
+_RE_MES_ANO = re.compile(r"(?<!\d)(0[1-9]|1[0-2])[-_. ](20\d{2})")
+
+
+def competencia_do_nome(nome):
+    """Competência (date no dia 1) a partir do nome do arquivo, ou None."""
+    m = _RE_ANO_MES.search(nome)
+    if m:
+        return date(int(m.group(1)), int(m.group(2)), 1)
+    m = _RE_MES_ANO.search(nome)
+    if m:
+        return date(int(m.group(2)), int(m.group(1)), 1)
+    return None
+
+
+def hash_arquivo(caminho):
+    h = hashlib.sha1()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def tratar_arquivo(caminho, tipo):
+    """Lê um arquivo da pasta com o tratamento do seu tipo de relatório."""
+    if tipo == "detalhado":
+        return tratar_detalhado(caminho, 0, caminho.name), None
+
+    competencia = competencia_do_nome(caminho.stem)
+    if competencia is None:
+        raise ValueError(
+            f"Não encontrei a competência (AAAA-MM) no nome do arquivo {caminho.name}."
+        )
+    tratar = tratar_relatorio_aa if tipo == "aa" else tratar_relatorio_corban
+    divergencias = []
+    df = tratar(caminho, competencia, divergencias)
+    for tabela in divergencias:
+        for linha in tabela.itertuples(index=False):
+            log.warning(
+                "Subtotal divergente em %s: %s %s = %.2f, soma das contas = %.2f",
+                caminho.name, linha.Assessor, linha.Coluna, linha.Subtotal, linha.Soma_Contas,
+            )
+    return df, competencia.isoformat()
+
+
+def listar_arquivos(pasta):
+    """(origem relativa, caminho, tipo) de cada planilha nas subpastas de tipo."""
+    pasta = Path(pasta)
+    for tipo in armazem.TIPOS:
+        subpasta = pasta / tipo
+        if not subpasta.is_dir():
+            continue
+        for caminho in sorted(subpasta.iterdir()):
+            # "~$arquivo.xlsx" é o arquivo de trava do Excel aberto
+            if caminho.suffix.lower() in EXTENSOES and not caminho.name.startswith("~$"):
+                yield str(caminho.relative_to(pasta)), caminho, tipo
+
+
+def varrer(pasta, raiz_armazem, espera=ESPERA_ESTABILIDADE, processos=1):
+    """
+    Uma passada pela pasta: lê arquivos novos ou alterados, tira do armazém
+    os que sumiram. Retorna quantos arquivos mudaram o armazém.
+
+    Com `processos` > 1 os arquivos alterados são lidos em paralelo.
+    """
+    manifesto = armazem.carregar_manifesto(raiz_armazem)
+    conhecidos = manifesto["arquivos"]
+    # hash -> origem já armazenada, para não ler duas vezes o mesmo conteúdo
+    por_hash = {
+        info["hash"]: origem
+        for origem, info in conhecidos.items()
+        if not info.get("duplicado_de") and not info.get("quarentena")
+    }
+    vistos = set()
+    pendentes = []
+    agora = time.time()
+
+    for origem, caminho, tipo in listar_arquivos(pasta):
+        vistos.add(origem)
+        stat = caminho.stat()
+        info = conhecidos.get(origem)
+
+        if info and info["tamanho"] == stat.st_size and info["mtime"] == stat.st_mtime:
+            continue
+        if agora - stat.st_mtime < espera:
+            continue
+
+        hash_atual = hash_arquivo(caminho)
+        if info and info["hash"] == hash_atual:
+            # só o mtime mudou (arquivo copiado de novo): nada a reler
+            armazem.atualizar_info(
+                raiz_armazem, origem, tamanho=stat.st_size, mtime=stat.st_mtime
+            )
+            continue
+
+        info_atual = {
+            "hash": hash_atual,
+            "tamanho": stat.st_size,
+            "mtime": stat.st_mtime,
+        }
+        original = por_hash.get(hash_atual)
+        if original is not None and original != origem:
+            armazem.registrar_sem_partes(
+                raiz_armazem, origem, tipo, {**info_atual, "duplicado_de": original}
+            )
+            log.warning("Ignorando %s: mesmo conteúdo de %s", origem, original)
+            continue
+        por_hash[hash_atual] = origem
+
+        pendentes.append((origem, caminho, tipo, info_atual))
+
+    if processos > 1 and len(pendentes) > 1:
+        with ProcessPoolExecutor(max_workers=processos) as pool:
+            futuros = [
+                pool.submit(tratar_arquivo, caminho, tipo)
+                for _, caminho, tipo, _ in pendentes
+            ]
+            lidos = [_resultado(f) for f in futuros]
+    else:
+        lidos = [_resultado_direto(caminho, tipo) for _, caminho, tipo, _ in pendentes]
+
+    mudancas = 0
+    gravados = set()
+    for (origem, _, tipo, info), (lido, erro) in zip(pendentes, lidos):
+        if erro is not None:
+            # fica de quarentena até o arquivo mudar; as partes antigas saem
+            armazem.registrar_sem_partes(
+                raiz_armazem, origem, tipo, {**info, "quarentena": str(erro)}
+            )
+            log.warning("Quarentena %s: %s", origem, erro)
+            continue
+
+        df, competencia = lido
+        if competencia is None:
+            periodo = uploads.periodo(df)
+        else:
+            periodo = uploads.periodo_competencia(date.fromisoformat(competencia))
+        armazem.gravar_arquivo(raiz_armazem, origem, tipo, df, {
+            **info,
+            "competencia": competencia,
+            "periodo": None if periodo is None else [d.isoformat() for d in periodo],
+        })
+        log.info("Armazenado %s (%s, %d linhas)", origem, tipo, len(df))
+        gravados.add(origem)
+        mudancas += 1
+
+    for tipo in {tipo for origem, _, tipo, _ in pendentes if origem in gravados}:
+        for a, b, inicio, fim in uploads.sobreposicoes(armazem.periodos(raiz_armazem, tipo)):
+            if a in gravados or b in gravados:
+                log.warning(uploads.descrever_sobreposicao(a, b, inicio, fim))
+
+    for origem in set(conhecidos) - vistos:
+        armazem.remover_arquivo(raiz_armazem, origem)
+        log.info("Removido %s (saiu da pasta)", origem)
+        mudancas += 1
+
+    return mudancas
+
+
+# qualquer falha de leitura põe o arquivo em quarentena sem parar a varredura
+
+def _resultado(futuro):
+    try:
+        return futuro.result(), None
+    except Exception as erro:
+        return None, erro
+
+
+def _resultado_direto(caminho, tipo):
+    try:
+        return tratar_arquivo(caminho, tipo), None
+    except Exception as erro:
+        return None, erro
+
+
+def vigiar(pasta, raiz_armazem, intervalo=30.0, processos=1):
+    """Varre a pasta a cada `intervalo` segundos até ser interrompido."""
+    log.info("Vigiando %s -> %s a cada %.0fs", pasta, raiz_armazem, intervalo)
+    while True:
+        mudancas = varrer(pasta, raiz_armazem, processos=processos)
+        if mudancas:
+            log.info(
+                "Armazém na versão %d (%d mudança(s))",
+                armazem.versao(raiz_armazem), mudancas
+            )
+        time.sleep(intervalo)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Lê automaticamente os relatórios de uma pasta para o armazém."
+    )
+    parser.add_argument("pasta", help="pasta com as subpastas detalhado/, aa/ e corban/")
+    parser.add_argument("armazem", help="pasta do armazém Parquet")
+    parser.add_argument("--intervalo", type=float, default=30.0,
+                        help="segundos entre varreduras (padrão: 30)")
+    parser.add_argument("--uma-vez", action="store_true",
+                        help="faz uma varredura e sai")
+    parser.add_argument("--processos", type=int, default=1,
+                        help="processos para ler os arquivos alterados (padrão: 1)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    if args.uma_vez:
+        varrer(args.pasta, args.armazem, processos=args.processos)
+    else:
+        try:
+            vigiar(args.pasta, args.armazem, args.intervalo, args.processos)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
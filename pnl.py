@@ -4,6 +4,9 @@ import plotly.express as px
 from datetime import date
 from io import BytesIO
 
+from nucleo import uploads
+from nucleo.ingestao import descrever_divergencias, tratar_relatorio_aa
+
 st.set_page_config(
     page_title="Dashboard de Comissões por Assessor",
     layout="wide"
@@ -79,52 +82,6 @@ def formata_brl(x):
     return f"R$ {x:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
 
 
-def tratar_relatorio(file, competencia_date):
-    """
-    Lê o relatório, pega apenas as colunas:
-    5 -> Assessor
-    6 -> Conta
-    7 -> Receita Líquida
-    8 -> Comissão
-
-    Preenche o nome do assessor para baixo.
-    Remove cabeçalhos, linhas vazias e as linhas de subtotal
-    (primeira linha de cada assessor, onde Conta está vazia).
-    Adiciona coluna de competência (mês e ano).
-    """
-    df = pd.read_excel(file)
-
-    # Seleciona colunas 5, 6, 7, 8 (índices 5, 6, 7, 8)
-    df2 = df.iloc[:, [5, 6, 7, 8]].copy()
-    df2.columns = ["Assessor", "Conta", "Receita_Liquida", "Comissao"]
-
-    # Preencher assessor para baixo
-    df2["Assessor"] = df2["Assessor"].ffill()
-
-    # Remover cabeçalho interno e linhas com assessor vazio
-    df2 = df2[df2["Assessor"].notna()]
-    df2 = df2[df2["Assessor"] != "Assessor Principal"]
-
-    # Converter colunas numéricas
-    df2["Receita_Liquida"] = pd.to_numeric(df2["Receita_Liquida"], errors="coerce")
-    df2["Comissao"] = pd.to_numeric(df2["Comissao"], errors="coerce")
-
-    # Remover linhas de subtotal: Conta vazia
-    df2 = df2[df2["Conta"].notna()]
-
-    # Remover linhas totalmente sem valores numéricos
-    df2 = df2[~(df2["Receita_Liquida"].isna() & df2["Comissao"].isna())]
-
-    # Adicionar competência
-    competencia_ts = pd.to_datetime(competencia_date)
-    df2["Competencia"] = competencia_ts
-    df2["Ano"] = df2["Competencia"].dt.year
-    df2["Mes"] = df2["Competencia"].dt.month
-    df2["Mes_Ano"] = df2["Competencia"].dt.strftime("%Y-%m")
-
-    return df2
-
-
 all_dfs = []
 
 if uploaded_files:
@@ -148,7 +105,16 @@ if uploaded_files:
         12: "Dez",
     }
 
-    for file in uploaded_files:
+    # o mesmo conteúdo enviado duas vezes só é lido uma vez
+    arquivos_unicos, duplicados = uploads.separar_duplicados(
+        uploaded_files, chave=lambda f: uploads.hash_conteudo(f.getvalue())
+    )
+    for file, original in duplicados:
+        st.warning(f"{file.name} tem o mesmo conteúdo de {original.name} e foi ignorado.")
+
+    periodos = []
+
+    for file in arquivos_unicos:
         st.markdown(f"**Arquivo:** {file.name}")
         col1, col2 = st.columns(2)
 
@@ -170,9 +136,22 @@ if uploaded_files:
             )
 
         competencia_input = date(ano_sel, mes_sel, 1)
-        df_tratado = tratar_relatorio(file, competencia_input)
+        periodos.append((file.name, uploads.periodo_competencia(competencia_input)))
+        # mesmo layout B2B do relatório de AA; subtotais conferidos na leitura
+        divergencias = []
+        df_tratado = tratar_relatorio_aa(file, competencia_input, divergencias).rename(
+            columns={"Receita_Liquida_AA": "Receita_Liquida", "Comissao_AA": "Comissao"}
+        )
+        aviso = descrever_divergencias(file.name, divergencias)
+        if aviso:
+            st.warning(aviso)
+            with st.expander(f"Ver divergências de {file.name}"):
+                st.dataframe(pd.concat(divergencias, ignore_index=True))
         all_dfs.append(df_tratado)
 
+    for sobreposicao in uploads.sobreposicoes(periodos):
+        st.warning(uploads.descrever_sobreposicao(*sobreposicao))
+
 if not uploaded_files:
     st.info("Envie ao menos um arquivo para iniciar o dashboard.")
 
@@ -1,9 +1,17 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+import os
 from datetime import date
 from io import BytesIO
 
+from nucleo import armazem, uploads
+from nucleo.ingestao import (
+    descrever_divergencias,
+    tratar_relatorio_aa,
+    tratar_relatorio_corban,
+)
+
 st.set_page_config(
     page_title="Dashboard de Comissões por Assessor",
     layout="wide"
@@ -96,86 +104,26 @@ def formata_brl(x):
     return f"R$ {x:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
 
 
-def tratar_relatorio_aa(file, competencia_date):
-    """
-    Tratamento do relatório B2B de AA.
-
-    Colunas usadas (por índice):
-    5 -> Assessor
-    6 -> Conta
-    7 -> Receita Líquida
-    8 -> Comissão AA
-
-    Retorna DataFrame com:
-    Assessor, Conta, Receita_Liquida_AA, Comissao_AA, Competencia, Ano, Mes, Mes_Ano
-    """
-    df = pd.read_excel(file)
-
-    df2 = df.iloc[:, [5, 6, 7, 8]].copy()
-    df2.columns = ["Assessor", "Conta", "Receita_Liquida_AA", "Comissao_AA"]
-
-    df2["Assessor"] = df2["Assessor"].ffill()
-
-    df2 = df2[df2["Assessor"].notna()]
-    df2 = df2[df2["Assessor"] != "Assessor Principal"]
-
-    df2["Receita_Liquida_AA"] = pd.to_numeric(df2["Receita_Liquida_AA"], errors="coerce")
-    df2["Comissao_AA"] = pd.to_numeric(df2["Comissao_AA"], errors="coerce")
-
-    df2 = df2[df2["Conta"].notna()]
-
-    df2 = df2[~(df2["Receita_Liquida_AA"].isna() & df2["Comissao_AA"].isna())]
-
-    competencia_ts = pd.to_datetime(competencia_date)
-    df2["Competencia"] = competencia_ts
-    df2["Ano"] = df2["Competencia"].dt.year
-    df2["Mes"] = df2["Competencia"].dt.month
-    df2["Mes_Ano"] = df2["Competencia"].dt.strftime("%Y-%m")
-
-    return df2
-
-
-def tratar_relatorio_corban(file, competencia_date):
-    """
-    Tratamento do relatório de Corban.
-
-    Assumo o mesmo layout geral: colunas 5..8,
-    onde a 8ª coluna é a Comissão de Corban.
-
-    Retorna DataFrame com:
-    Assessor, Conta, Receita_Liquida_Corban (se existir), Comissao_Corban,
-    Competencia, Ano, Mes, Mes_Ano
-    """
-    df = pd.read_excel(file)
-
-    df2 = df.iloc[:, [5, 6, 7, 8]].copy()
-    df2.columns = ["Assessor", "Conta", "Receita_Liquida_Corban", "Comissao_Corban"]
-
-    df2["Assessor"] = df2["Assessor"].ffill()
-
-    df2 = df2[df2["Assessor"].notna()]
-    df2 = df2[df2["Assessor"] != "Assessor Principal"]
-
-    df2["Receita_Liquida_Corban"] = pd.to_numeric(df2["Receita_Liquida_Corban"], errors="coerce")
-    df2["Comissao_Corban"] = pd.to_numeric(df2["Comissao_Corban"], errors="coerce")
-
-    df2 = df2[df2["Conta"].notna()]
-
-    df2 = df2[~(df2["Receita_Liquida_Corban"].isna() & df2["Comissao_Corban"].isna())]
+all_dfs_aa = []
+all_dfs_corban = []
 
-    competencia_ts = pd.to_datetime(competencia_date)
-    df2["Competencia"] = competencia_ts
-    df2["Ano"] = df2["Competencia"].dt.year
-    df2["Mes"] = df2["Competencia"].dt.month
-    df2["Mes_Ano"] = df2["Competencia"].dt.strftime("%Y-%m")
+# armazém alimentado pelo vigia de pasta (python -m nucleo.vigia)
+raiz_armazem = os.environ.get("PNL_ARMAZEM")
+versao_armazem = armazem.versao(raiz_armazem) if raiz_armazem else 0
 
-    return df2
+if versao_armazem:
+    all_dfs_aa.extend(armazem.ler_tipo(raiz_armazem, "aa"))
+    all_dfs_corban.extend(armazem.ler_tipo(raiz_armazem, "corban"))
 
+    @st.fragment(run_every=30.0)
+    def vigiar_armazem():
+        """Recarrega o app quando o vigia de pasta grava dados novos no armazém."""
+        if armazem.versao(raiz_armazem) != versao_armazem:
+            st.rerun()
 
-all_dfs_aa = []
-all_dfs_corban = []
+    vigiar_armazem()
 
-if not uploaded_files_aa and not uploaded_files_corban:
+if not uploaded_files_aa and not uploaded_files_corban and not versao_armazem:
     st.info("Envie ao menos um arquivo de AA ou de Corban para iniciar o dashboard.")
     st.stop()
 
@@ -197,14 +145,45 @@ meses_dict = {
     12: "Dez",
 }
 
+
+def sem_duplicados(arquivos):
+    """Tira os arquivos com o mesmo conteúdo de um anterior, sem lê-los."""
+    unicos, duplicados = uploads.separar_duplicados(
+        arquivos, chave=lambda f: uploads.hash_conteudo(f.getvalue())
+    )
+    for file, original in duplicados:
+        st.warning(f"{file.name} tem o mesmo conteúdo de {original.name} e foi ignorado.")
+    return unicos
+
+
+def avisar_sobreposicoes(periodos, tipo):
+    """Avisa quando dois arquivos (enviados ou do armazém) cobrem a mesma competência."""
+    if versao_armazem:
+        periodos = periodos + armazem.periodos(raiz_armazem, tipo)
+    for sobreposicao in uploads.sobreposicoes(periodos):
+        st.warning(uploads.descrever_sobreposicao(*sobreposicao))
+
+
+def avisar_divergencias(nome, divergencias):
+    """Avisa quando os subtotais de um arquivo não batem com a soma das contas."""
+    aviso = descrever_divergencias(nome, divergencias)
+    if aviso:
+        st.warning(aviso)
+        with st.expander(f"Ver divergências de {nome}"):
+            st.dataframe(pd.concat(divergencias, ignore_index=True))
+
+
 # =========================
 # Competência para arquivos AA
 # =========================
 
+periodos_aa = []
+periodos_corban = []
+
 if uploaded_files_aa:
     st.subheader("Defina a competência de cada arquivo - Agente Autônomo (AA)")
 
-    for file in uploaded_files_aa:
+    for file in sem_duplicados(uploaded_files_aa):
         st.markdown(f"**Arquivo AA:** {file.name}")
         col1, col2 = st.columns(2)
 
@@ -226,7 +205,10 @@ if uploaded_files_aa:
             )
 
         competencia_input = date(ano_sel, mes_sel, 1)
-        df_tratado = tratar_relatorio_aa(file, competencia_input)
+        periodos_aa.append((file.name, uploads.periodo_competencia(competencia_input)))
+        divergencias = []
+        df_tratado = tratar_relatorio_aa(file, competencia_input, divergencias)
+        avisar_divergencias(file.name, divergencias)
         all_dfs_aa.append(df_tratado)
 
 # =========================
@@ -236,7 +218,7 @@ if uploaded_files_aa:
 if uploaded_files_corban:
     st.subheader("Defina a competência de cada arquivo - Corban")
 
-    for file in uploaded_files_corban:
+    for file in sem_duplicados(uploaded_files_corban):
         st.markdown(f"**Arquivo Corban:** {file.name}")
         col1, col2 = st.columns(2)
 
@@ -258,9 +240,17 @@ if uploaded_files_corban:
             )
 
         competencia_input_c = date(ano_sel_c, mes_sel_c, 1)
-        df_tratado_c = tratar_relatorio_corban(file, competencia_input_c)
+        periodos_corban.append(
+            (file.name, uploads.periodo_competencia(competencia_input_c))
+        )
+        divergencias_c = []
+        df_tratado_c = tratar_relatorio_corban(file, competencia_input_c, divergencias_c)
+        avisar_divergencias(file.name, divergencias_c)
         all_dfs_corban.append(df_tratado_c)
 
+avisar_sobreposicoes(periodos_aa, "aa")
+avisar_sobreposicoes(periodos_corban, "corban")
+
 if not all_dfs_aa and not all_dfs_corban:
     st.warning("Você selecionou arquivos, mas nenhum foi processado. Verifique.")
     st.stop()
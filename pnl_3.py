@@ -4,6 +4,8 @@ import plotly.express as px
 from datetime import date
 from io import BytesIO
 
+from nucleo import tarefas, uploads
+
 st.set_page_config(
     page_title="Dashboard de Comissões por Assessor - Base detalhada",
     layout="wide"
@@ -86,108 +88,42 @@ def formata_brl(x):
     return f"R$ {x:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
 
 
-# categorias da planilha Corban para identificar origem
-CATEGORIAS_CORBAN = {
-    "CAMBIO",
-    "CONTA VIRADA",
-    "CREDITO",
-    "CREDITO ESTRUTURADO",
-    "ENERGIA",
-    "FEE TRANSACIONAL",
-    "FEE TRANSACIONAL PME",
-    "MESA CAMBIO",
-}
-
-
-def tratar_detalhado(file):
-    """
-    Lê a planilha detalhada e normaliza as colunas.
-    Funciona mesmo que o cabeçalho não esteja na primeira linha.
-
-    Espera encontrar uma linha com 'Data Receita' na primeira coluna
-    e, a partir dela, os campos:
-
-    Data Receita, Conta, Cliente, Código Assessor, Assessor Principal,
-    Categoria, Produto, Ativo, Código/CNPJ, Tipo Receita,
-    Receita Bruta, Receita Líquida, Comissão.
-    """
-    # lê tudo sem cabeçalho
-    raw = pd.read_excel(file, sheet_name=0, header=None)
-
-    # procura a linha onde a primeira coluna é "Data Receita"
-    first_col = raw.iloc[:, 0].astype(str).str.strip().str.upper()
-    header_mask = first_col == "DATA RECEITA"
-    if not header_mask.any():
-        st.error(
-            f"Não encontrei a linha de cabeçalho com 'Data Receita' no arquivo {file.name}."
-        )
-        st.stop()
-
-    header_idx = header_mask[header_mask].index[0]
-    header = raw.iloc[header_idx].tolist()
-
-    # dados começam na linha seguinte ao cabeçalho
-    df = raw.iloc[header_idx + 1 :].copy()
-    df.columns = header
-    df.columns = df.columns.astype(str).str.strip()
-
-    rename_map = {
-        "Data Receita": "Data_Receita",
-        "Conta": "Conta",
-        "Cliente": "Cliente",
-        "Código Assessor": "Codigo_Assessor",
-        "Assessor Principal": "Assessor",
-        "Categoria": "Categoria",
-        "Produto": "Produto",
-        "Ativo": "Ativo",
-        "Código/CNPJ": "Codigo_CNPJ",
-        "Tipo Receita": "Tipo_Receita",
-        "Receita Bruta": "Receita_Bruta",
-        "Receita Líquida": "Receita_Liquida",
-        "Comissão": "Comissao",
-    }
-
-    faltando = [c for c in rename_map.keys() if c not in df.columns]
-    if faltando:
-        st.error(f"No arquivo {file.name} ainda faltam as colunas: {faltando}")
-        st.stop()
-
-    df = df.rename(columns=rename_map)
-
-    # conversões
-    df["Data_Receita"] = pd.to_datetime(
-        df["Data_Receita"], errors="coerce", dayfirst=True
-    )
-    df = df[df["Data_Receita"].notna()]
-
-    for col in ["Receita_Bruta", "Receita_Liquida", "Comissao"]:
-        df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
-
-    df["Assessor"] = df["Assessor"].astype(str).str.strip()
-    df["Categoria"] = df["Categoria"].astype(str).str.strip()
-    df["Produto"] = df["Produto"].astype(str).str.strip()
-
-    df["Ano"] = df["Data_Receita"].dt.year
-    df["Mes"] = df["Data_Receita"].dt.month
-    df["Mes_Ano"] = df["Data_Receita"].dt.strftime("%Y-%m")
-
-    # origem com base na categoria
-    cat_upper = df["Categoria"].str.upper()
-    df["Origem"] = cat_upper.apply(
-        lambda x: "CORBAN" if x in CATEGORIAS_CORBAN else "AA"
-    )
-
-    return df
-
-
 all_dfs = []
 
 if not uploaded_files:
     st.info("Envie ao menos um arquivo para iniciar o dashboard.")
 else:
-    for file in uploaded_files:
-        df_tratado = tratar_detalhado(file)
-        all_dfs.append(df_tratado)
+    # o mesmo conteúdo enviado duas vezes só é lido uma vez
+    arquivos_unicos, duplicados = uploads.separar_duplicados(
+        [(file, uploads.hash_conteudo(file.getvalue())) for file in uploaded_files],
+        chave=lambda item: item[1],
+    )
+    for (file, _), (original, _) in duplicados:
+        st.warning(f"{file.name} tem o mesmo conteúdo de {original.name} e foi ignorado.")
+
+    # um arquivo com erro fica de fora (quarentena) sem derrubar os demais;
+    # a leitura de cada arquivo fica em cache pelo hash do conteúdo
+    periodos = []
+    quarentena = []
+    for file, h in arquivos_unicos:
+        resultado = tarefas.ler_arquivo(file.getvalue(), 0, file.name, h)
+        if resultado["status"] == "erro":
+            quarentena.append((file.name, resultado["motivo"]))
+            continue
+        for aviso in resultado["avisos"]:
+            st.caption(f"{file.name}: {aviso}")
+        periodos.append((file.name, uploads.periodo(resultado["df"])))
+        all_dfs.append(resultado["df"])
+
+    if quarentena:
+        st.error(
+            f"{len(quarentena)} arquivo(s) ficaram de fora da base por erro de leitura."
+        )
+        for nome, motivo in quarentena:
+            st.caption(f"{nome}: {motivo}")
+
+    for sobreposicao in uploads.sobreposicoes(periodos):
+        st.warning(uploads.descrever_sobreposicao(*sobreposicao))
 
 if all_dfs:
     base = pd.concat(all_dfs, ignore_index=True)
@@ -2,15 +2,103 @@
 
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-from datetime import date
-from io import BytesIO
+import hashlib
+import os
+
+from graficos import (
+    TOP_N_PADRAO,
+    barra_empilhada,
+    barra_horizontal,
+    barras_pnl,
+    figura_em_cache,
+    linha_por_grupo,
+    linha_simples,
+    mapa_calor,
+    reduzir_pontos,
+    treemap,
+)
+from nucleo import (
+    anomalias,
+    armazem,
+    cache_compartilhado,
+    consulta_duckdb,
+    cenarios,
+    concentracao,
+    contas,
+    coortes,
+    extratos,
+    hierarquia,
+    intervalos,
+    medicao,
+    series,
+    tarefas,
+    uploads,
+    variacao,
+)
+from nucleo.agregacao import comissao_no_mes, comissao_por_mes, filtrar_cubo, participacao
+from nucleo.calculo import ALIQUOTA_IMPOSTO, agregar_assessor_mes, pnl_anual, pnl_mensal
+from nucleo.exportacao import to_excel_bytes
+from nucleo.formatacao import formata_brl
+from nucleo.ingestao import montar_dados
 
 st.set_page_config(
     page_title="Dashboard de Comissões por Assessor - Base detalhada",
     layout="wide"
 )
 
+# painel de desempenho (tempos por etapa e acertos de cache) na barra lateral
+modo_debug = st.sidebar.checkbox(
+    "Painel de desempenho",
+    value=os.environ.get("PNL_DEBUG") == "1"
+)
+if os.environ.get("PNL_LOG_MEDICAO"):
+    medicao.configurar_log(os.environ["PNL_LOG_MEDICAO"])
+medicao.iniciar_rerun("rerun_pnl_4", memoria=modo_debug)
+
+
+def finalizar_medicao():
+    """
+    Fecha a medição do rerun (log JSON) e, no modo debug, mostra o painel de
+    desempenho. Chamada no fim do script e antes de cada st.stop().
+    """
+    resumo_medicao = medicao.finalizar_rerun()
+    if modo_debug and resumo_medicao is not None:
+        with st.sidebar:
+            st.markdown("### Desempenho deste rerun")
+            st.metric("Tempo total", f"{resumo_medicao['segundos_total']:.3f}s")
+            st.caption(
+                f"Etapas medidas: {resumo_medicao['segundos_etapas']:.3f}s"
+            )
+
+            if resumo_medicao["etapas"]:
+                st.dataframe(
+                    pd.DataFrame(resumo_medicao["etapas"])
+                    .sort_values("segundos", ascending=False)
+                    .reset_index(drop=True)
+                )
+
+            for nome, c in resumo_medicao["cache"].items():
+                st.caption(
+                    f"Cache {nome}: {c['acertos']} acerto(s), {c['faltas']} falta(s) "
+                    f"({c['taxa_acerto']*100:.0f}%)"
+                )
+
+            estatisticas = cache_compartilhado.estatisticas()
+            st.caption(
+                f"Cache compartilhado: {estatisticas['entradas']} entrada(s), "
+                f"{estatisticas['bytes'] / 1024 / 1024:.1f} MB de "
+                f"{estatisticas['orcamento_bytes'] / 1024 / 1024:.0f} MB, "
+                f"{estatisticas['acertos']} acerto(s) e {estatisticas['faltas']} falta(s) "
+                f"desde o início do processo"
+            )
+
+
+def parar():
+    """st.stop() que ainda registra a medição do rerun."""
+    finalizar_medicao()
+    st.stop()
+
+
 st.title("Dashboard de Comissões por Assessor (base detalhada)")
 
 st.markdown(
@@ -35,193 +123,387 @@ uploaded_files = st.file_uploader(
 # Configurações de PNL
 # =========================
 
-repasse_por_assessor = {
-    "ABRAAO RIBEIRO DA SILVA": 0.70,
-    "ARTHUR MOTA RODRIGUES": 0.50,
-    "BRUNO TERRA DE ASSUNCAO": 0.60,
-    "CAIO DOS SANTOS CARLOS": 0.40,
-    "CARLOS ALEXANDRE IGNACIO DA SILVA": 0.50,
-    "CARLOS EDUARDO CAMERA LOUREIRO PINTO": 0.60,
-    "CELSO LUIZ DE OLIVEIRA JUNIOR": 0.60,
-    "DANIEL MAGRINA GUIMARAES": 0.40,
-    "EDUARDO KAZAY": 0.70,
-    "EDUARDO MEYER": 0.70,
-    "EMANUEL NASCIMENTO CAVALCANTI": 0.80,
-    "EMERSON CERBINO DOBLAS": 0.50,
-    "EMERSON VIEIRA DE FARIAS JUNIOR": 0.70,
-    "FABIANO JOSE RAMOS BITTENCOURT": 0.75,
-    "FLAVIO LUIZ NUNES DE BARROS": 0.85,
-    "JADER DA MOTA MENDONCA": 0.80,
-    "JOAO VITOR ARAUJO SACCARDO": 0.50,
-    "JOICE ELIANA BRITES DE OLIVEIRA": 0.60,
-    "JONATHAN DA CUNHA VALENTE": 0.80,
-    "LEONARDO BARBOSA FRISONI": 0.80,
-    "LUCIANO HENRIQUE MATTOS DE ALMEIDA": 0.80,
-    "LUIZ FILIPE COSTA GARCIA": 0.80,
-    "MANSUR PAPICHO MIRANDA": 0.90,
-    "OTAVIO NUNES CARDOZO JÚNIOR": 0.60,
-    "PEDRO AMMAR FORATO": 0.80,
-    "PEDRO BORGERTH TEIXEIRA DE LUCA": 0.70,
-    "RAFAEL MADALENA MARTINS": 0.80,
-    "RAFAEL DADOORIAN PREGNOLATI": 0.80,
-    "ROBERTO DE MATTOS BRUNER": 0.70,
-    "RODRIGO RODRIGUES MARINO": 0.70,
-    "RUAN MARINS NOGUEIRA": 0.80,
-    "THIAGO KEMPER RICCIOPPO": 0.90,
-    "TIAGO DE CARVALHO RAMOS": 0.60,
-    "VANESSA PEREIRA DE OLIVEIRA": 0.70,
-}
-
-default_repasse = 0.70
-
-ALIQUOTA_IMPOSTO = 0.1953
-FATOR_LIQUIDO = 1 - ALIQUOTA_IMPOSTO  # 0.8047
-
-
-def get_repasse(assessor):
-    if pd.isna(assessor):
-        return default_repasse
-    chave = str(assessor).strip().upper()
-    return repasse_por_assessor.get(chave, default_repasse)
-
-
-def formata_brl(x):
-    return f"R$ {x:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-
-
-# categorias da planilha Corban para identificar origem
-CATEGORIAS_CORBAN = {
-    "CAMBIO",
-    "CONTA VIRADA",
-    "CREDITO",
-    "CREDITO ESTRUTURADO",
-    "ENERGIA",
-    "FEE TRANSACIONAL",
-    "FEE TRANSACIONAL PME",
-    "MESA CAMBIO",
-}
-
-
-def tratar_detalhado(file):
+# repasse por assessor, alíquota e cálculo do PNL ficam em nucleo.calculo
+# (os mesmos valores usados pelo modo em lote)
+
+
+TODAS_AS_ABAS = "Todas as abas com o layout detalhado"
+
+
+def escolher_abas(file, h):
     """
-    Lê a planilha detalhada, permite escolher a aba e normaliza as colunas.
-    Funciona mesmo que o cabeçalho não esteja na primeira linha.
+    Mostra o arquivo e deixa escolher a aba a ser lida, ou todas as abas com
+    o layout detalhado (ex.: AA e Corban em abas separadas). Devolve a lista
+    de abas; vazia (e o arquivo vai para a quarentena) se nem der para abrir
+    a planilha ou nenhuma aba tiver o layout.
     """
 
     st.markdown(f"### 📄 Arquivo: **{file.name}**")
 
-    # 1. Seleção de aba
-    xls = pd.ExcelFile(file)
-    abas_disponiveis = xls.sheet_names
+    # a planilha aberta fica em cache pelo hash: reruns e trocas de aba não
+    # reabrem o arquivo
+    try:
+        abas_disponiveis = tarefas.abrir_planilha(file.getvalue(), h)["abas"]
+    except Exception as erro:
+        quarentena_uploads.append(
+            (file.name, f"Não foi possível abrir o arquivo {file.name}: {erro}")
+        )
+        return []
 
-    aba_escolhida = st.selectbox(
+    opcoes = abas_disponiveis
+    if len(abas_disponiveis) > 1:
+        opcoes = abas_disponiveis + [TODAS_AS_ABAS]
+    escolha = st.selectbox(
         f"Aba da planilha {file.name}",
-        options=abas_disponiveis,
+        options=opcoes,
         index=0,
         key=f"aba_{file.name}"
     )
+    if escolha != TODAS_AS_ABAS:
+        return [escolha]
+
+    # a busca pelo cabeçalho em cada aba só é feita uma vez por arquivo
+    detectadas = tarefas.detectar_abas(file.getvalue(), h)
+    if not detectadas:
+        quarentena_uploads.append(
+            (file.name, f"Nenhuma aba do arquivo {file.name} tem o cabeçalho 'Data Receita'.")
+        )
+    else:
+        st.caption(f"Abas lidas: {', '.join(detectadas)}")
+    return detectadas
 
-    # 2. Lê a aba escolhida sem cabeçalho fixo
-    raw = pd.read_excel(xls, sheet_name=aba_escolhida, header=None)
 
-    # 3. Procura a linha onde a primeira coluna é "Data Receita"
-    first_col = raw.iloc[:, 0].astype(str).str.strip().str.upper()
-    header_mask = first_col == "DATA RECEITA"
-    if not header_mask.any():
-        st.error(
-            f"Não encontrei a linha de cabeçalho com 'Data Receita' "
-            f"na aba '{aba_escolhida}' do arquivo {file.name}."
+def rotulo(file, aba):
+    """Nome do upload nas mensagens: com a aba quando o arquivo tem várias lidas."""
+    if len(abas_por_arquivo.get(file.name, ())) > 1:
+        return f"{file.name} (aba {aba})"
+    return file.name
+
+
+def hash_arquivo(file):
+    return uploads.hash_conteudo(file.getvalue())
+
+
+# armazém alimentado pelo vigia de pasta (python -m nucleo.vigia)
+raiz_armazem = os.environ.get("PNL_ARMAZEM")
+versao_armazem = armazem.versao(raiz_armazem) if raiz_armazem else 0
+
+# com o DuckDB instalado, o armazém entra no painel só como cubo (agregado em
+# SQL) e as linhas dele são consultadas sob demanda; PNL_DUCKDB=0 desliga
+usar_duckdb = (
+    bool(raiz_armazem)
+    and os.environ.get("PNL_DUCKDB", "1") != "0"
+    and consulta_duckdb.disponivel()
+)
+
+# (arquivo, aba escolhida, hash do conteúdo) de cada upload e aba que serão lidos
+arquivos_abas = []
+# nome do arquivo -> abas escolhidas
+abas_por_arquivo = {}
+# (nome, motivo) dos uploads que nem chegaram a ser lidos
+quarentena_uploads = []
+
+# versão dos dados: conteúdo de cada arquivo + aba escolhida + versão do armazém
+versao_dados = hashlib.sha1(f"armazem:{raiz_armazem}:{versao_armazem};".encode())
+
+if not uploaded_files and not versao_armazem:
+    st.info("Envie ao menos um arquivo para iniciar o dashboard.")
+elif uploaded_files:
+    with medicao.etapa("abas_e_hash_dos_uploads"):
+        for file in uploaded_files:
+            h = hash_arquivo(file)
+            abas_por_arquivo[file.name] = escolher_abas(file, h)
+            arquivos_abas.extend((file, aba, h) for aba in abas_por_arquivo[file.name])
+
+    # o mesmo conteúdo com a mesma aba só é lido uma vez
+    arquivos_abas, duplicados = uploads.separar_duplicados(
+        arquivos_abas, chave=lambda item: (item[2], item[1])
+    )
+    for (file, aba, _), (original, _, _) in duplicados:
+        st.warning(
+            f"{file.name} tem o mesmo conteúdo de {original.name} (aba '{aba}') "
+            "e foi ignorado."
         )
-        st.stop()
-
-    header_idx = header_mask[header_mask].index[0]
-    header = raw.iloc[header_idx].tolist()
-
-    # 4. Dados a partir da linha seguinte ao cabeçalho
-    df = raw.iloc[header_idx + 1 :].copy()
-    df.columns = header
-    df.columns = df.columns.astype(str).str.strip()
-
-    rename_map = {
-        "Data Receita": "Data_Receita",
-        "Conta": "Conta",
-        "Cliente": "Cliente",
-        "Código Assessor": "Codigo_Assessor",
-        "Assessor Principal": "Assessor",
-        "Categoria": "Categoria",
-        "Produto": "Produto",
-        "Ativo": "Ativo",
-        "Código/CNPJ": "Codigo_CNPJ",
-        "Tipo Receita": "Tipo_Receita",
-        "Receita Bruta": "Receita_Bruta",
-        "Receita Líquida": "Receita_Liquida",
-        "Comissão": "Comissao",
-    }
 
-    faltando = [c for c in rename_map.keys() if c not in df.columns]
-    if faltando:
+    for file, aba, h in arquivos_abas:
+        versao_dados.update(f"{h}:{aba};".encode())
+
+versao_dados = versao_dados.hexdigest()
+tem_dados = bool(arquivos_abas) or versao_armazem > 0
+
+
+def mostrar_quarentena(leituras):
+    """Arquivos com erro ficam de quarentena, fora da base; os demais seguem."""
+    quarentena = quarentena_uploads + [
+        (nome, l["motivo"]) for nome, l in leituras if l["status"] == "erro"
+    ]
+    if raiz_armazem:
+        quarentena += armazem.quarentena(raiz_armazem, "detalhado")
+    if quarentena:
         st.error(
-            f"No arquivo {file.name}, aba '{aba_escolhida}', ainda faltam as colunas: {faltando}"
+            f"{len(quarentena)} arquivo(s) ficaram de fora da base por erro de leitura. "
+            "Corrija e envie de novo: só eles serão relidos."
         )
-        st.stop()
+        for nome, motivo in quarentena:
+            st.caption(f"{nome}: {motivo}")
+
+
+cache_figuras = st.session_state.setdefault("cache_figuras", {})
 
-    df = df.rename(columns=rename_map)
 
-    # 5. Conversões
-    df["Data_Receita"] = pd.to_datetime(
-        df["Data_Receita"], errors="coerce", dayfirst=True
+@st.fragment(run_every=1.0)
+def painel_ingestao():
+    """Progresso da leitura em segundo plano; recarrega o app ao terminar."""
+    tarefa = st.session_state.get("tarefa_ingestao")
+    if tarefa is None:
+        return
+
+    status = tarefas.progresso(tarefa)
+    prontos = sum(s["status"] in ("concluído", "erro") for s in status)
+    st.progress(
+        prontos / len(status),
+        text=f"Lendo arquivos em segundo plano: {prontos}/{len(status)}"
     )
-    df = df[df["Data_Receita"].notna()]
+    for s in status:
+        st.caption(f"{s['arquivo']}: {s['status']}")
 
-    for col in ["Receita_Bruta", "Receita_Liquida", "Comissao"]:
-        df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
+    if tarefas.concluida(tarefa):
+        # fragmentos não escrevem na barra lateral: só registra a medição
+        medicao.finalizar_rerun()
+        st.rerun()
 
-    df["Assessor"] = df["Assessor"].astype(str).str.strip()
-    df["Categoria"] = df["Categoria"].astype(str).str.strip()
-    df["Produto"] = df["Produto"].astype(str).str.strip()
 
-    df["Ano"] = df["Data_Receita"].dt.year
-    df["Mes"] = df["Data_Receita"].dt.month
-    df["Mes_Ano"] = df["Data_Receita"].dt.strftime("%Y-%m")
+@st.fragment(run_every=30.0)
+def vigiar_armazem():
+    """Recarrega o app quando o vigia de pasta grava dados novos no armazém."""
+    if armazem.versao(raiz_armazem) != versao_armazem:
+        medicao.finalizar_rerun()
+        st.rerun()
 
-    # 6. Origem (AA x Corban) com base na categoria
-    cat_upper = df["Categoria"].str.upper()
-    df["Origem"] = cat_upper.apply(
-        lambda x: "CORBAN" if x in CATEGORIAS_CORBAN else "AA"
-    )
 
-    return df
+def ler_fontes(tarefa):
+    """
+    Base e cubo com o armazém + os uploads lidos sem erro (da tarefa em
+    segundo plano, se houver), e a leitura de cada upload por (hash, aba):
+    status, motivo do erro, avisos e período.
+    """
+    if tarefa is not None:
+        lidos = tarefas.resultados(tarefa)
+    else:
+        lidos = [
+            tarefas.ler_arquivo(file.getvalue(), aba, rotulo(file, aba), h)
+            for file, aba, h in arquivos_abas
+        ]
+    frames = [r["df"] for r in lidos if r["status"] == "ok"]
+
+    if not versao_armazem:
+        dados = montar_dados(frames)
+    elif usar_duckdb:
+        dados = montar_dados(frames, [consulta_duckdb.cubo(raiz_armazem)])
+    else:
+        dados = montar_dados(armazem.ler_tipo(raiz_armazem, "detalhado") + frames)
+
+    dados["leituras"] = {
+        (h, aba): {
+            "status": r["status"],
+            "motivo": r["motivo"],
+            "avisos": r["avisos"],
+            "linhas": r["linhas"],
+            "periodo": uploads.periodo(r["df"]) if r["status"] == "ok" else None,
+        }
+        for (_, aba, h), r in zip(arquivos_abas, lidos)
+    }
+    return dados
 
 
-all_dfs = []
+def linhas_da_base(filtros=None):
+    """
+    Linhas detalhadas para exportação e extratos: a base da sessão e, com o
+    DuckDB, as linhas do armazém que passam em `filtros`.
+    """
+    if not (usar_duckdb and versao_armazem):
+        return base
+    frames = [consulta_duckdb.linhas(raiz_armazem, filtros)]
+    if not base.empty:
+        frames.insert(0, base)
+    return pd.concat(frames, ignore_index=True)
 
-if not uploaded_files:
-    st.info("Envie ao menos um arquivo para iniciar o dashboard.")
-else:
-    for file in uploaded_files:
-        df_tratado = tratar_detalhado(file)
-        all_dfs.append(df_tratado)
 
-if all_dfs:
-    base = pd.concat(all_dfs, ignore_index=True)
+def somas_das_linhas(somar, chaves, valores="Comissao", filtros=None, datas=None):
+    """
+    Somas das linhas detalhadas por `chaves`, para as seções que trabalham
+    com as linhas (séries, composição, datas, contas): `somar(base)` nas
+    linhas da sessão e, com o DuckDB, o mesmo GROUP BY no armazém, que
+    devolve só as somas. As partes não são agrupadas de novo aqui.
+    """
+    frames = []
+    if not base.empty:
+        frames.append(somar(base))
+    if usar_duckdb and versao_armazem:
+        frames.append(consulta_duckdb.agregar(
+            raiz_armazem, chaves, filtros, valor=valores, datas=datas
+        ))
+    if not frames:
+        valores = [valores] if isinstance(valores, str) else list(valores)
+        return pd.DataFrame(columns=list(chaves) + valores)
+    return pd.concat(frames, ignore_index=True)
+
+
+def datas_das_linhas():
+    """
+    Índice por Data_Receita das linhas da sessão (None sem elas) e a
+    primeira e a última data das linhas detalhadas, com as do armazém
+    consultadas no DuckDB.
+    """
+    indice = None
+    datas = []
+    if not base.empty:
+        indice = intervalos.indexar_datas(base)
+        datas += [indice["datas"][0], indice["datas"][-1]]
+    if usar_duckdb and versao_armazem:
+        datas += consulta_duckdb.limites_datas(raiz_armazem) or []
+    datas = [pd.Timestamp(d) for d in datas]
+    return {"indice": indice, "limites": (min(datas), max(datas)) if datas else None}
+
+
+def exportar_base():
+    """XLSX da base consolidada, gerado quando o botão de download é clicado."""
+    with medicao.etapa("exportacao_xlsx") as m:
+        linhas = linhas_da_base()
+        m["df"] = linhas
+        return to_excel_bytes(linhas).getvalue()
+
+
+def coluna_alerta(alertas_mes, valores):
+    """Coluna "Alerta" das tabelas do mês: ⚠ queda / ⚠ alta (ver nucleo.anomalias)."""
+    return valores.map(lambda v: f"⚠ {alertas_mes[v]}" if v in alertas_mes else "")
+
+
+def legenda_alertas(alertas_mes, chave):
+    if alertas_mes:
+        st.caption(
+            f"⚠ Comissão do mês fora do padrão dos {anomalias.JANELA} meses anteriores "
+            f"(z-score robusto acima de {anomalias.LIMITE_Z:g}), considerando toda a "
+            f"comissão de cada {chave.lower()}, sem os filtros."
+        )
+
+
+if raiz_armazem:
+    vigiar_armazem()
+
+if tem_dados and st.session_state.get("versao_reservada") != versao_dados:
+    # a base é compartilhada entre as sessões que enviaram os mesmos arquivos
+    # (a reserva segura a entrada enquanto esta sessão usar essa versão)
+    tarefa = None
+    if arquivos_abas and cache_compartilhado.consultar(versao_dados) is None:
+        tarefa = st.session_state.get("tarefa_ingestao")
+        if tarefa is None or tarefa["versao"] != versao_dados:
+            tarefas.cancelar(tarefa)
+            tarefa = tarefas.iniciar_ingestao(
+                [
+                    (rotulo(file, aba), file.getvalue(), aba, h)
+                    for file, aba, h in arquivos_abas
+                ],
+                versao_dados,
+            )
+            st.session_state["tarefa_ingestao"] = tarefa
+
+    if tarefa is None or tarefas.concluida(tarefa):
+        st.session_state["tarefa_ingestao"] = None
+        medicao.contar_cache(
+            "bases", cache_compartilhado.consultar(versao_dados) is not None
+        )
+        try:
+            with medicao.etapa("ingestao") as m:
+                dados, reserva = cache_compartilhado.reservar(
+                    versao_dados,
+                    lambda: ler_fontes(tarefa)
+                )
+                m["df"] = dados["base"]
+        except ValueError as erro:
+            st.error(str(erro))
+            parar()
+
+        # troca a base da sessão de uma vez só
+        cache_compartilhado.liberar(st.session_state.get("reserva_dados"))
+        st.session_state["reserva_dados"] = reserva
+        st.session_state["versao_reservada"] = versao_dados
+    else:
+        painel_ingestao()
+elif tem_dados:
+    # a sessão já segura a base desta versão
+    medicao.contar_cache("bases", True)
+else:
+    # sem arquivos: a sessão deixa de segurar a última base
+    cache_compartilhado.liberar(st.session_state.get("reserva_dados"))
+    st.session_state["reserva_dados"] = None
+    st.session_state["versao_reservada"] = None
+
+# enquanto a leitura não termina, o painel segue com os meses já carregados
+dados = None
+if tem_dados and st.session_state.get("versao_reservada"):
+    dados = cache_compartilhado.consultar(st.session_state["versao_reservada"])
+elif tem_dados:
+    st.info("Lendo os arquivos; o painel aparece assim que a leitura terminar.")
+
+if dados is None and quarentena_uploads:
+    mostrar_quarentena([])
+
+if dados is not None:
+    # somente leitura: base e cubo são os mesmos objetos para todas as sessões
+    base = dados["base"]
+    cubo = dados["cubo"]
+    # versão da base em uso (pode ser a anterior enquanto a nova é lida)
+    versao_base = st.session_state["versao_reservada"]
+
+    # leitura de cada upload (a base pode ser de uma versão anterior enquanto
+    # a nova é lida: arquivos ainda não lidos não aparecem)
+    leituras = [
+        (rotulo(file, aba), dados["leituras"][(h, aba)])
+        for file, aba, h in arquivos_abas
+        if (h, aba) in dados["leituras"]
+    ]
+    mostrar_quarentena(leituras)
+
+    avisos = [(nome, l["avisos"]) for nome, l in leituras if l["avisos"]]
+    if avisos:
+        with st.expander(f"Avisos da leitura ({len(avisos)} arquivo(s))"):
+            for nome, lista in avisos:
+                st.markdown(f"**{nome}**")
+                for aviso in lista:
+                    st.caption(aviso)
+
+    if cubo.empty:
+        st.warning("Nenhum arquivo pôde ser lido.")
+        parar()
+
+    # arquivos (enviados ou do armazém) com receitas nas mesmas datas; as
+    # abas de um mesmo arquivo contam como um período só
+    periodos = uploads.juntar_periodos(
+        (file.name, dados["leituras"][(h, aba)]["periodo"])
+        for file, aba, h in arquivos_abas
+        if (h, aba) in dados["leituras"]
+    )
+    if raiz_armazem:
+        periodos += armazem.periodos(raiz_armazem, "detalhado")
+    for sobreposicao in uploads.sobreposicoes(periodos):
+        st.warning(uploads.descrever_sobreposicao(*sobreposicao))
 
     st.subheader("Base detalhada consolidada")
 
     with st.expander("Ver tabela completa"):
         st.dataframe(base)
+        if usar_duckdb and versao_armazem:
+            st.caption(
+                "As linhas do armazém não aparecem aqui: elas são lidas pelo "
+                "DuckDB na exportação e nos extratos, e as seções por linha "
+                "(séries, composição, datas e contas) recebem dele só as somas."
+            )
 
-    # download da base consolidada
-    def to_excel_bytes(df):
-        buffer = BytesIO()
-        with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
-            df.to_excel(writer, index=False, sheet_name="Base")
-        buffer.seek(0)
-        return buffer
-
-    excel_bytes = to_excel_bytes(base)
+    # download da base consolidada: o xlsx só é gerado quando o botão é clicado
     st.download_button(
         label="Baixar base consolidada em Excel",
-        data=excel_bytes,
+        data=exportar_base,
         file_name="base_detalhada_consolidada.xlsx",
         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     )
@@ -237,7 +519,7 @@ if all_dfs:
     col_f1, col_f2, col_f3 = st.columns(3)
 
     with col_f1:
-        assessores_unicos = sorted(base["Assessor"].unique())
+        assessores_unicos = sorted(cubo["Assessor"].unique())
         assessores_selecionados = st.multiselect(
             "Selecione os assessores",
             options=assessores_unicos,
@@ -245,7 +527,7 @@ if all_dfs:
         )
 
     with col_f2:
-        origens_unicas = sorted(base["Origem"].unique())
+        origens_unicas = sorted(cubo["Origem"].unique())
         origens_selecionadas = st.multiselect(
             "Origem da receita",
             options=origens_unicas,
@@ -253,7 +535,7 @@ if all_dfs:
         )
 
     with col_f3:
-        categorias_unicas = sorted(base["Categoria"].unique())
+        categorias_unicas = sorted(cubo["Categoria"].unique())
         categorias_selecionadas = st.multiselect(
             "Categoria",
             options=categorias_unicas,
@@ -263,7 +545,7 @@ if all_dfs:
     col_f4, col_f5 = st.columns(2)
 
     with col_f4:
-        produtos_unicos = sorted(base["Produto"].unique())
+        produtos_unicos = sorted(cubo["Produto"].unique())
         produtos_selecionados = st.multiselect(
             "Produto",
             options=produtos_unicos,
@@ -271,72 +553,167 @@ if all_dfs:
         )
 
     with col_f5:
-        meses_unicos = sorted(base["Mes_Ano"].unique())
+        meses_unicos = sorted(cubo["Mes_Ano"].unique())
         mes_selecionado = st.selectbox(
             "Selecione um mês para ranking e PNL",
             options=meses_unicos
         )
 
-    mask = (
-        base["Assessor"].isin(assessores_selecionados)
-        & base["Origem"].isin(origens_selecionadas)
-        & base["Categoria"].isin(categorias_selecionadas)
-        & base["Produto"].isin(produtos_selecionados)
+    # os filtros são aplicados sobre o cubo, não sobre as linhas da base
+    with medicao.etapa("filtro") as m:
+        cubo_filtrado = filtrar_cubo(
+            cubo,
+            assessores_selecionados,
+            origens_selecionadas,
+            categorias_selecionadas,
+            produtos_selecionados,
+        )
+        m["df"] = cubo_filtrado
+
+    estado_filtros = (
+        tuple(assessores_selecionados),
+        tuple(origens_selecionadas),
+        tuple(categorias_selecionadas),
+        tuple(produtos_selecionados),
     )
-    base_filtrada = base[mask].copy()
 
-    if base_filtrada.empty:
+    if cubo_filtrado.empty:
         st.warning("Nenhum dado após aplicação dos filtros.")
-        st.stop()
+        parar()
 
     # =========================
     # Agregações
     # =========================
 
-    df_mes = (
-        base_filtrada.groupby("Mes_Ano", as_index=False)["Comissao"]
-        .sum()
-        .sort_values("Mes_Ano")
-    )
-
-    df_ass_mes = (
-        base_filtrada.groupby(["Ano", "Mes_Ano", "Assessor"], as_index=False)["Comissao"]
-        .sum()
-        .sort_values(["Ano", "Mes_Ano", "Assessor"])
-    )
+    with medicao.etapa("agregacao_mes") as m:
+        df_mes = comissao_por_mes(cubo_filtrado)
+        m["df"] = df_mes
+
+    with medicao.etapa("agregacao_assessor_mes") as m:
+        df_ass_mes = agregar_assessor_mes(cubo_filtrado)
+        m["df"] = df_ass_mes
+
+    # alertas de queda/alta sobre o cubo inteiro, uma vez por versão dos
+    # dados: não dependem dos filtros nem de quantos assessores estão selecionados
+    with medicao.etapa("anomalias"):
+        alertas = {}
+        for chave_alerta in ["Assessor", "Categoria"]:
+            df_anomalias, _ = cache_compartilhado.reservar(
+                ("anomalias", versao_base, chave_alerta),
+                lambda: anomalias.anomalias(cubo, chave_alerta),
+            )
+            alertas[chave_alerta] = anomalias.alertas_do_mes(
+                df_anomalias, chave_alerta, mes_selecionado
+            )
 
     # =========================
     # Evolução mensal
     # =========================
 
     st.subheader("Evolução mensal da comissão total (filtros aplicados)")
-    fig_total = px.line(
-        df_mes,
-        x="Mes_Ano",
-        y="Comissao",
-        markers=True,
-        labels={"Mes_Ano": "Mês", "Comissao": "Comissão"},
-        title="Comissão total por mês"
-    )
-    fig_total.update_xaxes(type="category")
+    with medicao.etapa("grafico fig_total"):
+        fig_total = linha_simples(
+            df_mes,
+            x="Mes_Ano",
+            y="Comissao",
+            titulo="Comissão total por mês",
+            labels={"Mes_Ano": "Mês", "Comissao": "Comissão"},
+        )
     st.plotly_chart(fig_total, use_container_width=True)
 
     st.subheader("Evolução da comissão por assessor")
+    top_n_assessores = TOP_N_PADRAO
     if not df_ass_mes.empty:
-        fig_ass = px.line(
-            df_ass_mes,
-            x="Mes_Ano",
-            y="Comissao",
-            color="Assessor",
-            markers=True,
-            labels={"Mes_Ano": "Mês", "Comissao": "Comissão"},
-            title="Comissão por assessor ao longo dos meses"
+        if len(assessores_unicos) > TOP_N_PADRAO:
+            top_n_assessores = st.slider(
+                "Quantidade de assessores no gráfico (os demais entram em \"Outros\")",
+                min_value=1,
+                max_value=len(assessores_unicos),
+                value=TOP_N_PADRAO,
+            )
+        fig_ass = figura_em_cache(
+            cache_figuras,
+            ("fig_ass", versao_base, estado_filtros, top_n_assessores),
+            lambda: linha_por_grupo(
+                df_ass_mes,
+                x="Mes_Ano",
+                y="Comissao",
+                cor="Assessor",
+                titulo="Comissão por assessor ao longo dos meses",
+                labels={"Mes_Ano": "Mês", "Comissao": "Comissão"},
+                top_n=top_n_assessores,
+            ),
         )
-        fig_ass.update_xaxes(type="category")
         st.plotly_chart(fig_ass, use_container_width=True)
     else:
         st.warning("Nenhum dado para os assessores selecionados.")
 
+    # =========================
+    # Séries diárias e semanais
+    # =========================
+
+    st.subheader("Receita dia a dia e por semana")
+
+    # uploads e armazém: as seções por linha não podem ver só os uploads;
+    # com o DuckDB, as linhas do armazém ficam nele (só as somas voltam)
+    tem_linhas = not base.empty or bool(usar_duckdb and versao_armazem)
+
+    if not tem_linhas:
+        st.caption("Não há linhas detalhadas para as séries diárias.")
+    else:
+        # séries de todos os assessores e categorias, uma vez por versão dos dados
+        with medicao.etapa("series_diarias"):
+            todas_series, _ = cache_compartilhado.reservar(
+                ("series", versao_base),
+                lambda: series.series(somas_das_linhas(
+                    series.diario, ["Data"] + series.CHAVES, series.VALORES
+                )),
+            )
+
+        col_d1, col_d2, col_d3, col_d4 = st.columns(4)
+        with col_d1:
+            granularidade = st.radio(
+                "Granularidade", ["D", "W"],
+                format_func={"D": "Diária", "W": "Semanal"}.get, horizontal=True,
+            )
+        with col_d2:
+            chave_serie = st.radio("Séries por", ["Assessor", "Categoria"], horizontal=True)
+        with col_d3:
+            valor_serie = st.radio(
+                "Valor", ["Comissao", "Receita_Liquida"],
+                format_func={"Comissao": "Comissão", "Receita_Liquida": "Receita líquida"}.get,
+                horizontal=True,
+            )
+        with col_d4:
+            so_mes = st.checkbox(f"Só {mes_selecionado}", value=granularidade == "D")
+
+        df_serie = todas_series[(granularidade, chave_serie)]
+        if chave_serie == "Assessor":
+            df_serie = df_serie[df_serie["Assessor"].isin(assessores_selecionados)]
+        else:
+            df_serie = df_serie[df_serie["Categoria"].isin(categorias_selecionadas)]
+        if so_mes:
+            df_serie = df_serie[df_serie["Data"].dt.strftime("%Y-%m") == mes_selecionado]
+
+        if df_serie.empty:
+            st.warning("Nenhum dado para as seleções.")
+        else:
+            fig_serie = figura_em_cache(
+                cache_figuras,
+                ("fig_serie", versao_base, estado_filtros, granularidade, chave_serie,
+                 valor_serie, so_mes and mes_selecionado),
+                lambda: linha_por_grupo(
+                    reduzir_pontos(df_serie, "Data", valor_serie, chave_serie),
+                    x="Data",
+                    y=valor_serie,
+                    cor=chave_serie,
+                    titulo="Por dia" if granularidade == "D" else "Por semana",
+                    labels={"Data": "Data", valor_serie: valor_serie.replace("_", " ")},
+                    tipo_eixo="date",
+                ),
+            )
+            st.plotly_chart(fig_serie, use_container_width=True)
+
     # =========================
     # Ranking do mês
     # =========================
@@ -350,23 +727,25 @@ if all_dfs:
 
     tabela_ranking = df_ranking.copy()
     tabela_ranking["Comissao"] = tabela_ranking["Comissao"].apply(formata_brl)
+    tabela_ranking["Alerta"] = coluna_alerta(alertas["Assessor"], tabela_ranking["Assessor"])
 
     col_g1, col_g2 = st.columns([2, 1])
 
     with col_g1:
-        fig_rank = px.bar(
-            df_ranking,
-            x="Comissao",
-            y="Assessor",
-            orientation="h",
-            labels={"Comissao": "Comissão", "Assessor": "Assessor"},
-            title=f"Comissão por assessor em {mes_selecionado}"
-        )
+        with medicao.etapa("grafico fig_rank"):
+            fig_rank = barra_horizontal(
+                df_ranking,
+                x="Comissao",
+                y="Assessor",
+                titulo=f"Comissão por assessor em {mes_selecionado}",
+                labels={"Comissao": "Comissão", "Assessor": "Assessor"},
+            )
         st.plotly_chart(fig_rank, use_container_width=True)
 
     with col_g2:
         st.markdown("Tabela de ranking")
         st.dataframe(tabela_ranking.reset_index(drop=True))
+        legenda_alertas(alertas["Assessor"], "Assessor")
 
     # ================================================================
     # 1. Ranking de receita por categoria (mês selecionado)
@@ -375,40 +754,38 @@ if all_dfs:
     st.markdown("---")
     st.subheader(f"Ranking de receita por categoria em {mes_selecionado}")
 
-    df_cat_mes = (
-        base_filtrada[base_filtrada["Mes_Ano"] == mes_selecionado]
-        .groupby("Categoria", as_index=False)["Comissao"]
-        .sum()
-        .sort_values("Comissao", ascending=False)
-    )
+    with medicao.etapa("agregacao_categoria_mes"):
+        df_cat_mes = comissao_no_mes(cubo_filtrado, mes_selecionado, ["Categoria"])
 
     if df_cat_mes.empty:
         st.warning("Nenhuma categoria encontrada no mês selecionado.")
     else:
         df_cat_mes["Comissao_fmt"] = df_cat_mes["Comissao"].apply(formata_brl)
-        df_cat_mes["Pct"] = df_cat_mes["Comissao"] / df_cat_mes["Comissao"].sum()
+        df_cat_mes["Pct"] = participacao(df_cat_mes)
         df_cat_mes["Pct_fmt"] = df_cat_mes["Pct"].apply(lambda x: f"{x*100:.1f}%")
+        df_cat_mes["Alerta"] = coluna_alerta(alertas["Categoria"], df_cat_mes["Categoria"])
 
         col_c1, col_c2 = st.columns([2, 1])
 
         with col_c1:
-            fig_cat = px.bar(
-                df_cat_mes,
-                x="Comissao",
-                y="Categoria",
-                orientation="h",
-                labels={"Comissao": "Receita", "Categoria": "Categoria"},
-                title=f"Receita por categoria em {mes_selecionado}",
-            )
+            with medicao.etapa("grafico fig_cat"):
+                fig_cat = barra_horizontal(
+                    df_cat_mes,
+                    x="Comissao",
+                    y="Categoria",
+                    titulo=f"Receita por categoria em {mes_selecionado}",
+                    labels={"Comissao": "Receita", "Categoria": "Categoria"},
+                )
             st.plotly_chart(fig_cat, use_container_width=True)
 
         with col_c2:
             st.markdown("Tabela de receita por categoria")
             st.dataframe(
-                df_cat_mes[["Categoria", "Comissao_fmt", "Pct_fmt"]].rename(
+                df_cat_mes[["Categoria", "Comissao_fmt", "Pct_fmt", "Alerta"]].rename(
                     columns={"Comissao_fmt": "Receita", "Pct_fmt": "% do total"}
                 )
             )
+            legenda_alertas(alertas["Categoria"], "Categoria")
 
     # ================================================================
     # 2. Receita dos assessores por categoria (mês selecionado)
@@ -417,11 +794,10 @@ if all_dfs:
     st.markdown("---")
     st.subheader(f"Receita dos assessores por categoria em {mes_selecionado}")
 
-    df_ass_cat = (
-        base_filtrada[base_filtrada["Mes_Ano"] == mes_selecionado]
-        .groupby(["Assessor", "Categoria"], as_index=False)["Comissao"]
-        .sum()
-    )
+    with medicao.etapa("agregacao_assessor_categoria"):
+        df_ass_cat = comissao_no_mes(
+            cubo_filtrado, mes_selecionado, ["Assessor", "Categoria"]
+        )
 
     if df_ass_cat.empty:
         st.warning("Nenhum dado de assessor x categoria no mês selecionado.")
@@ -439,15 +815,19 @@ if all_dfs:
         col_ac1, col_ac2 = st.columns([2, 1])
 
         with col_ac1:
-            fig_stack = px.bar(
-                df_ass_cat,
-                x="Assessor",
-                y="Comissao",
-                color="Categoria",
-                title=f"Composição de receita por categoria para cada assessor ({mes_selecionado})",
-                labels={"Comissao": "Receita"}
+            fig_stack = figura_em_cache(
+                cache_figuras,
+                ("fig_stack", versao_base, estado_filtros, mes_selecionado, top_n_assessores),
+                lambda: barra_empilhada(
+                    df_ass_cat,
+                    x="Assessor",
+                    y="Comissao",
+                    cor="Categoria",
+                    titulo=f"Composição de receita por categoria para cada assessor ({mes_selecionado})",
+                    labels={"Comissao": "Receita"},
+                    top_n_eixo=top_n_assessores,
+                ),
             )
-            fig_stack.update_xaxes(type="category")
             st.plotly_chart(fig_stack, use_container_width=True)
 
         with col_ac2:
@@ -456,6 +836,130 @@ if all_dfs:
 
     st.markdown("---")
 
+    # =========================
+    # Composição da receita em níveis
+    # =========================
+
+    st.subheader(f"Composição da receita em {mes_selecionado}")
+
+    if not tem_linhas:
+        st.caption("Não há linhas detalhadas para a composição da receita.")
+    else:
+        st.caption(
+            "Origem > Categoria > Produto > Tipo de receita > Ativo, com toda a "
+            "receita do mês (sem os filtros)."
+        )
+        # rollup de todos os níveis uma vez por versão dos dados; abrir um
+        # nível é uma consulta no índice dele
+        chaves_rollup = ["Mes_Ano"] + hierarquia.NIVEIS
+        with medicao.etapa("rollup_hierarquia"):
+            niveis_rollup, _ = cache_compartilhado.reservar(
+                ("hierarquia", versao_base),
+                lambda: hierarquia.rollup(somas_das_linhas(
+                    lambda b: b[chaves_rollup + ["Comissao"]], chaves_rollup
+                )),
+            )
+
+        col_t1, col_t2 = st.columns([2, 1])
+
+        with col_t1:
+            profundidade = st.slider(
+                "Níveis no treemap", min_value=1, max_value=len(hierarquia.NIVEIS), value=3
+            )
+            serie_treemap = niveis_rollup[profundidade]
+            if mes_selecionado in serie_treemap.index.get_level_values(0):
+                fig_treemap = figura_em_cache(
+                    cache_figuras,
+                    ("fig_treemap", versao_base, mes_selecionado, profundidade),
+                    lambda: treemap(
+                        serie_treemap.loc[mes_selecionado].reset_index(),
+                        caminho=hierarquia.NIVEIS[:profundidade],
+                        valor="Comissao",
+                        titulo=f"Receita por nível em {mes_selecionado}",
+                    ),
+                )
+                st.plotly_chart(fig_treemap, use_container_width=True)
+
+        with col_t2:
+            caminho = []
+            for nivel in hierarquia.NIVEIS:
+                abaixo = hierarquia.filhos(niveis_rollup, (mes_selecionado,), caminho)
+                if abaixo.empty:
+                    break
+                escolha = st.selectbox(
+                    nivel.replace("_", " "),
+                    options=["(todos)"] + abaixo.index.tolist(),
+                    key=f"hierarquia_{nivel}",
+                )
+                if escolha == "(todos)":
+                    break
+                caminho.append(escolha)
+            else:
+                # até o último nível: a tabela segue mostrando os ativos
+                abaixo = hierarquia.filhos(niveis_rollup, (mes_selecionado,), caminho[:-1])
+
+            if not abaixo.empty:
+                tabela_nivel = abaixo.reset_index()
+                tabela_nivel["% do nível"] = participacao(tabela_nivel).apply(
+                    lambda x: f"{x*100:.1f}%"
+                )
+                tabela_nivel["Comissao"] = tabela_nivel["Comissao"].apply(formata_brl)
+                st.markdown(" > ".join(caminho) or "Todas as origens")
+                st.dataframe(tabela_nivel)
+
+    st.markdown("---")
+
+    # =========================
+    # Variação MoM / YoY
+    # =========================
+
+    st.subheader(f"Variação da comissão em {mes_selecionado}")
+
+    col_v1, col_v2 = st.columns(2)
+    with col_v1:
+        dimensao_variacao = st.radio(
+            "Agrupar por", ["Assessor", "Categoria", "Produto"], horizontal=True
+        )
+    with col_v2:
+        comparacao = st.radio(
+            "Comparar com",
+            ["MoM", "YoY"],
+            format_func={"MoM": "Mês anterior", "YoY": "Mesmo mês do ano anterior"}.get,
+            horizontal=True,
+        )
+
+    with medicao.etapa("variacao") as m:
+        df_variacao = variacao.variacoes(cubo_filtrado, [dimensao_variacao])
+        df_variacao = df_variacao[df_variacao["Mes_Ano"] == mes_selecionado]
+        m["df"] = df_variacao
+
+    if df_variacao[f"Anterior_{comparacao}"].isna().all():
+        st.info("Não há mês de comparação na base para o mês selecionado.")
+    else:
+        df_variacao = df_variacao.sort_values(
+            f"Delta_{comparacao}", key=lambda d: d.abs(), ascending=False
+        )
+        st.caption(
+            f"Variação total: {formata_brl(df_variacao[f'Delta_{comparacao}'].sum())}. "
+            "Efeito volume: parte da variação que vem do total ter crescido ou caído; "
+            "efeito mix: ganho ou perda de participação do grupo no total."
+        )
+
+        tabela_variacao = pd.DataFrame({
+            dimensao_variacao: df_variacao[dimensao_variacao],
+            "Comissão": df_variacao["Comissao"].apply(formata_brl),
+            "Comparação": df_variacao[f"Anterior_{comparacao}"].apply(formata_brl),
+            "Variação": df_variacao[f"Delta_{comparacao}"].apply(formata_brl),
+            "Variação %": df_variacao[f"Pct_{comparacao}"].apply(
+                lambda x: "-" if pd.isna(x) else f"{x*100:+.1f}%"
+            ),
+            "Efeito volume": df_variacao[f"Volume_{comparacao}"].apply(formata_brl),
+            "Efeito mix": df_variacao[f"Mix_{comparacao}"].apply(formata_brl),
+        }).reset_index(drop=True)
+        st.dataframe(tabela_variacao)
+
+    st.markdown("---")
+
     # =========================
     # PNL do mês
     # =========================
@@ -466,11 +970,8 @@ if all_dfs:
     if df_pnl_mes.empty:
         st.warning("Nenhum dado para calcular PNL neste mês.")
     else:
-        df_pnl_mes["Comissao_Liquida"] = df_pnl_mes["Comissao"] * FATOR_LIQUIDO
-
-        df_pnl_mes["Repasse"] = df_pnl_mes["Assessor"].apply(get_repasse)
-        df_pnl_mes["Para_Assessor"] = df_pnl_mes["Comissao_Liquida"] * df_pnl_mes["Repasse"]
-        df_pnl_mes["Para_Empresa"] = df_pnl_mes["Comissao_Liquida"] - df_pnl_mes["Para_Assessor"]
+        with medicao.etapa("pnl_mes"):
+            df_pnl_mes = pnl_mensal(df_pnl_mes)
 
         df_pnl_mes = df_pnl_mes.sort_values("Comissao_Liquida", ascending=False)
 
@@ -481,6 +982,7 @@ if all_dfs:
             "Repasse": df_pnl_mes["Repasse"],
             "Para assessor": df_pnl_mes["Para_Assessor"],
             "Para empresa": df_pnl_mes["Para_Empresa"],
+            "Alerta": coluna_alerta(alertas["Assessor"], df_pnl_mes["Assessor"]),
         }).reset_index(drop=True)
 
         for col in ["Comissão bruta", "Comissão líquida", "Para assessor", "Para empresa"]:
@@ -493,32 +995,44 @@ if all_dfs:
         col_p1, col_p2 = st.columns([2, 1])
 
         with col_p1:
-            df_plot_mes = df_pnl_mes.melt(
-                id_vars=["Assessor"],
-                value_vars=["Para_Assessor", "Para_Empresa"],
-                var_name="Tipo",
-                value_name="Valor"
-            )
-            df_plot_mes["Tipo"] = df_plot_mes["Tipo"].replace({
-                "Para_Assessor": "Para o assessor",
-                "Para_Empresa": "Para a empresa"
-            })
-
-            fig_pnl_mes = px.bar(
-                df_plot_mes,
-                x="Assessor",
-                y="Valor",
-                color="Tipo",
-                barmode="group",
-                labels={"Valor": "Valor", "Assessor": "Assessor", "Tipo": "Tipo"},
-                title="PNL por assessor no mês selecionado (comissão líquida)"
-            )
+            with medicao.etapa("grafico fig_pnl_mes"):
+                fig_pnl_mes = barras_pnl(
+                    df_pnl_mes,
+                    titulo="PNL por assessor no mês selecionado (comissão líquida)"
+                )
             st.plotly_chart(fig_pnl_mes, use_container_width=True)
 
         with col_p2:
             st.markdown("Tabela de PNL do mês")
             st.dataframe(tabela_pnl_mes)
 
+        # extratos individuais: um XLSX + HTML por assessor, num único ZIP
+        chave_extratos = (versao_base, mes_selecionado, tuple(assessores_selecionados))
+        if st.button(f"Gerar extratos por assessor de {mes_selecionado}"):
+            with st.spinner("Gerando extratos..."), medicao.etapa("extratos_zip") as m:
+                linhas_extratos = linhas_da_base({
+                    "Mes_Ano": [mes_selecionado],
+                    "Assessor": assessores_selecionados,
+                })
+                m["df"] = linhas_extratos
+                st.session_state["extratos_zip"] = (
+                    chave_extratos,
+                    extratos.gerar_zip(
+                        linhas_extratos,
+                        mes_selecionado,
+                        assessores=assessores_selecionados,
+                    ),
+                )
+
+        extratos_zip = st.session_state.get("extratos_zip")
+        if extratos_zip is not None and extratos_zip[0] == chave_extratos:
+            st.download_button(
+                label="Baixar extratos (ZIP)",
+                data=extratos_zip[1],
+                file_name=f"extratos_{mes_selecionado}.zip",
+                mime="application/zip"
+            )
+
     st.markdown("---")
 
     # =========================
@@ -532,21 +1046,9 @@ if all_dfs:
     if df_pnl_ytd.empty:
         st.warning("Nenhum dado para calcular PNL acumulado neste ano.")
     else:
-        df_pnl_ytd = df_pnl_ytd.groupby("Assessor", as_index=False)["Comissao"].sum()
-
-        df_pnl_ytd["Comissao_Liquida"] = df_pnl_ytd["Comissao"] * FATOR_LIQUIDO
-
-        df_pnl_ytd["Repasse"] = df_pnl_ytd["Assessor"].apply(get_repasse)
-        df_pnl_ytd["Para_Assessor"] = df_pnl_ytd["Comissao_Liquida"] * df_pnl_ytd["Repasse"]
-        df_pnl_ytd["Para_Empresa"] = df_pnl_ytd["Comissao_Liquida"] - df_pnl_ytd["Para_Assessor"]
-
-        total_empresa_ano = df_pnl_ytd["Para_Empresa"].sum()
-
-        df_pnl_ytd["Pct_Empresa_sobre_Total"] = (
-            df_pnl_ytd["Para_Empresa"] / total_empresa_ano
-        )
-
-        df_pnl_ytd = df_pnl_ytd.sort_values("Para_Empresa", ascending=False)
+        with medicao.etapa("pnl_ano"):
+            # já vem ordenado pela parte da empresa
+            df_pnl_ytd = pnl_anual(df_pnl_ytd)
 
         tabela_pnl_ytd = pd.DataFrame({
             "Assessor": df_pnl_ytd["Assessor"],
@@ -569,28 +1071,377 @@ if all_dfs:
         col_y1, col_y2 = st.columns([2, 1])
 
         with col_y1:
-            df_plot_ytd = df_pnl_ytd.melt(
-                id_vars=["Assessor"],
-                value_vars=["Para_Assessor", "Para_Empresa"],
-                var_name="Tipo",
-                value_name="Valor"
-            )
-            df_plot_ytd["Tipo"] = df_plot_ytd["Tipo"].replace({
-                "Para_Assessor": "Para o assessor",
-                "Para_Empresa": "Para a empresa"
-            })
-
-            fig_pnl_ytd = px.bar(
-                df_plot_ytd,
-                x="Assessor",
-                y="Valor",
-                color="Tipo",
-                barmode="group",
-                labels={"Valor": "Valor", "Assessor": "Assessor", "Tipo": "Tipo"},
-                title="PNL acumulado por assessor no ano (comissão líquida)"
-            )
+            with medicao.etapa("grafico fig_pnl_ytd"):
+                fig_pnl_ytd = barras_pnl(
+                    df_pnl_ytd,
+                    titulo="PNL acumulado por assessor no ano (comissão líquida)"
+                )
             st.plotly_chart(fig_pnl_ytd, use_container_width=True)
 
         with col_y2:
             st.markdown("Tabela de PNL acumulado no ano")
             st.dataframe(tabela_pnl_ytd)
+
+    st.markdown("---")
+
+    # =========================
+    # PNL por período
+    # =========================
+
+    st.subheader("PNL por período")
+
+    tipo_periodo = st.radio(
+        "Período",
+        intervalos.JANELAS + ["Datas"],
+        horizontal=True,
+        help=f"Janelas de meses contam a partir de {mes_selecionado}.",
+    )
+
+    datas_base = None
+    if tipo_periodo == "Datas" and tem_linhas:
+        with medicao.etapa("indice_datas"):
+            datas_base, _ = cache_compartilhado.reservar(
+                ("datas", versao_base), datas_das_linhas
+            )
+
+    df_periodo = None
+    if tipo_periodo != "Datas":
+        mes_inicio, mes_fim = intervalos.janela(tipo_periodo, mes_selecionado)
+        rotulo_periodo = f"{mes_inicio} a {mes_fim}"
+        # somas acumuladas por assessor: cada janela é a diferença de duas colunas
+        with medicao.etapa("periodo_meses"):
+            acumulado, _ = cache_compartilhado.reservar(
+                ("acumulados", versao_base, estado_filtros),
+                lambda: intervalos.acumulados(cubo_filtrado, ["Assessor"]),
+            )
+            df_periodo = (
+                intervalos.soma_meses(acumulado, mes_inicio, mes_fim)
+                .rename("Comissao")
+                .reset_index()
+            )
+    elif datas_base is None or datas_base["limites"] is None:
+        st.caption("Não há linhas detalhadas para consultar por datas.")
+    else:
+        primeira_data, ultima_data = (d.date() for d in datas_base["limites"])
+        intervalo = st.date_input(
+            "De / até",
+            value=(primeira_data, ultima_data),
+            min_value=primeira_data,
+            max_value=ultima_data,
+            format="DD/MM/YYYY",
+        )
+        if len(intervalo) == 2:
+            rotulo_periodo = f"{intervalo[0]:%d/%m/%Y} a {intervalo[1]:%d/%m/%Y}"
+            selecoes = [
+                assessores_selecionados,
+                origens_selecionadas,
+                categorias_selecionadas,
+                produtos_selecionados,
+            ]
+            with medicao.etapa("periodo_datas") as m:
+                df_periodo = (
+                    somas_das_linhas(
+                        lambda b: filtrar_cubo(
+                            intervalos.linhas_no_intervalo(b, datas_base["indice"], *intervalo),
+                            *selecoes,
+                        ).groupby("Assessor", as_index=False)["Comissao"].sum(),
+                        ["Assessor"],
+                        filtros=dict(zip(["Assessor", "Origem", "Categoria", "Produto"], selecoes)),
+                        datas=intervalo,
+                    )
+                    .groupby("Assessor", as_index=False)["Comissao"]
+                    .sum()
+                )
+                m["df"] = df_periodo
+
+    if df_periodo is not None:
+        df_periodo = df_periodo[df_periodo["Comissao"] != 0]
+        if df_periodo.empty:
+            st.warning(f"Nenhuma comissão de {rotulo_periodo}.")
+        else:
+            df_pnl_periodo = pnl_mensal(df_periodo).sort_values("Para_Empresa", ascending=False)
+
+            col_q1, col_q2, col_q3 = st.columns(3)
+            col_q1.metric(f"Comissão bruta ({rotulo_periodo})", formata_brl(df_pnl_periodo["Comissao"].sum()))
+            col_q2.metric("Para assessores", formata_brl(df_pnl_periodo["Para_Assessor"].sum()))
+            col_q3.metric("Para empresa", formata_brl(df_pnl_periodo["Para_Empresa"].sum()))
+
+            tabela_pnl_periodo = pd.DataFrame({
+                "Assessor": df_pnl_periodo["Assessor"],
+                "Comissão bruta": df_pnl_periodo["Comissao"].apply(formata_brl),
+                "Comissão líquida": df_pnl_periodo["Comissao_Liquida"].apply(formata_brl),
+                "Repasse": df_pnl_periodo["Repasse"].apply(lambda x: f"{x*100:.0f}%"),
+                "Para assessor": df_pnl_periodo["Para_Assessor"].apply(formata_brl),
+                "Para empresa": df_pnl_periodo["Para_Empresa"].apply(formata_brl),
+            }).reset_index(drop=True)
+
+            col_q4, col_q5 = st.columns([2, 1])
+            with col_q4:
+                st.plotly_chart(
+                    barras_pnl(df_pnl_periodo, titulo=f"PNL por assessor de {rotulo_periodo}"),
+                    use_container_width=True,
+                )
+            with col_q5:
+                st.dataframe(tabela_pnl_periodo)
+
+    st.markdown("---")
+
+    # =========================
+    # Cenários de repasse e imposto
+    # =========================
+
+    st.subheader(f"Cenários de repasse e imposto em {ano_selecionado}")
+    st.caption(
+        "Parte da empresa no ano se o repasse de todos os assessores mudar "
+        "(em pontos percentuais sobre o repasse atual de cada um) e com outras alíquotas."
+    )
+
+    df_cenarios = df_ass_mes[df_ass_mes["Ano"] == ano_selecionado]
+    if df_cenarios.empty:
+        st.warning("Nenhum dado para simular cenários neste ano.")
+    else:
+        col_c1, col_c2 = st.columns(2)
+        with col_c1:
+            faixa_repasse = st.slider(
+                "Variação do repasse (p.p.)",
+                min_value=-30, max_value=30, value=(-10, 10), step=1,
+            )
+        with col_c2:
+            faixa_aliquota = st.slider(
+                "Alíquota de imposto (%)",
+                min_value=0.0, max_value=40.0,
+                value=(round(ALIQUOTA_IMPOSTO * 100) - 3.0, round(ALIQUOTA_IMPOSTO * 100) + 3.0),
+                step=0.5,
+            )
+
+        variacoes = [v / 100 for v in range(faixa_repasse[0], faixa_repasse[1] + 1)]
+        aliquotas = [
+            a / 1000 for a in range(int(faixa_aliquota[0] * 10), int(faixa_aliquota[1] * 10) + 1, 5)
+        ]
+        # a alíquota atual entra na grade mesmo fora dos passos de 0,5%
+        if faixa_aliquota[0] <= ALIQUOTA_IMPOSTO * 100 <= faixa_aliquota[1]:
+            aliquotas = sorted(set(aliquotas) | {ALIQUOTA_IMPOSTO})
+        with medicao.etapa("cenarios") as m:
+            resultado_cenarios = cenarios.cenarios(df_cenarios, variacoes, aliquotas)
+            m["cenarios"] = len(variacoes) * len(aliquotas)
+
+        tabela_cenarios = resultado_cenarios["total"].copy()
+        tabela_cenarios.index = [f"{a*100:.2f}%" for a in tabela_cenarios.index]
+        tabela_cenarios.columns = [f"{v*100:+.0f} p.p." for v in tabela_cenarios.columns]
+
+        fig_cenarios = figura_em_cache(
+            cache_figuras,
+            ("fig_cenarios", versao_base, estado_filtros, ano_selecionado,
+             faixa_repasse, faixa_aliquota),
+            lambda: mapa_calor(
+                tabela_cenarios,
+                titulo="Parte da empresa no ano por cenário",
+                labels={"x": "Variação do repasse", "y": "Alíquota", "color": "Para empresa"},
+            ),
+        )
+        st.plotly_chart(fig_cenarios, use_container_width=True)
+
+        with st.expander("Tabela de cenários"):
+            st.dataframe(tabela_cenarios.map(formata_brl))
+
+        with st.expander("Cenários por assessor"):
+            aliquota_assessor = st.select_slider(
+                "Alíquota",
+                options=aliquotas,
+                value=min(aliquotas, key=lambda a: abs(a - ALIQUOTA_IMPOSTO)),
+                format_func=lambda a: f"{a*100:.2f}%",
+            )
+            por_assessor = resultado_cenarios["por_assessor"]
+            tabela_assessor = por_assessor[
+                por_assessor["Aliquota"] == aliquota_assessor
+            ].pivot(index="Assessor", columns="Variacao", values="Para_Empresa")
+            tabela_assessor.columns = [f"{v*100:+.0f} p.p." for v in tabela_assessor.columns]
+            st.dataframe(tabela_assessor.map(formata_brl))
+
+    st.markdown("---")
+
+    # =========================
+    # Consulta por conta
+    # =========================
+
+    st.subheader("Consulta por conta")
+
+    if not tem_linhas:
+        st.caption("Não há linhas detalhadas para consultar por conta.")
+    else:
+        # índice por conta (das linhas da sessão) e comissão por conta
+        # montados uma vez por versão dos dados (a reserva não é guardada,
+        # como nas leituras de arquivo); a comissão por conta junta as somas
+        # da sessão e do armazém
+        with medicao.etapa("indice_contas"):
+            if not base.empty:
+                indice_contas, _ = cache_compartilhado.reservar(
+                    ("contas", versao_base), lambda: contas.indexar(base)
+                )
+            df_conta, _ = cache_compartilhado.reservar(
+                ("comissao_por_conta", versao_base),
+                lambda: contas.por_assessor_conta(somas_das_linhas(
+                    contas.por_assessor_conta,
+                    ["Assessor", "Mes_Ano", "Conta", "Cliente"],
+                )),
+            )
+
+        conta_buscada = st.text_input("Conta", placeholder="Número da conta do cliente")
+        if conta_buscada:
+            # do armazém, o DuckDB devolve só as linhas da conta
+            frames_conta = []
+            if not base.empty:
+                frames_conta.append(contas.linhas_da_conta(base, indice_contas, conta_buscada))
+            if usar_duckdb and versao_armazem:
+                frames_conta.append(consulta_duckdb.linhas_da_conta(raiz_armazem, conta_buscada))
+            linhas_conta = pd.concat(frames_conta, ignore_index=True)
+            if linhas_conta.empty:
+                st.info(f"A conta {conta_buscada} não aparece na base.")
+            else:
+                resumo = contas.resumo_conta(linhas_conta)
+                st.markdown(
+                    f"**{linhas_conta['Cliente'].iloc[0]}** — "
+                    f"{formata_brl(linhas_conta['Comissao'].sum())} de comissão "
+                    f"em {len(linhas_conta)} lançamento(s)"
+                )
+                st.plotly_chart(
+                    linha_simples(
+                        resumo["Mes_Ano"],
+                        x="Mes_Ano",
+                        y="Comissao",
+                        titulo=f"Comissão da conta {conta_buscada} por mês",
+                        labels={"Mes_Ano": "Mês", "Comissao": "Comissão"},
+                    ),
+                    use_container_width=True,
+                )
+                col_k1, col_k2, col_k3 = st.columns(3)
+                for coluna_tela, dimensao in zip(
+                    (col_k1, col_k2, col_k3), ["Categoria", "Produto", "Assessor"]
+                ):
+                    with coluna_tela:
+                        tabela = resumo[dimensao].copy()
+                        tabela["Comissao"] = tabela["Comissao"].apply(formata_brl)
+                        st.dataframe(tabela.reset_index(drop=True))
+
+        st.markdown(f"Maiores clientes por assessor em {ano_selecionado}")
+        n_clientes = st.slider(
+            "Clientes por assessor", min_value=1, max_value=50, value=10
+        )
+        df_conta_ano = df_conta[
+            df_conta["Assessor"].isin(assessores_selecionados)
+            & df_conta["Mes_Ano"].str.startswith(str(ano_selecionado))
+        ]
+        tabela_clientes = contas.top_clientes(df_conta_ano, n=n_clientes)
+        tabela_clientes["Comissao"] = tabela_clientes["Comissao"].apply(formata_brl)
+        st.dataframe(tabela_clientes)
+
+        # =========================
+        # Concentração nos maiores clientes
+        # =========================
+
+        st.subheader(f"Concentração da comissão nos {n_clientes} maiores clientes")
+
+        if df_conta_ano.empty:
+            st.warning("Nenhum dado para calcular a concentração neste ano.")
+        else:
+            with medicao.etapa("concentracao") as m:
+                df_concentracao = concentracao.concentracao(df_conta_ano, n=n_clientes)
+                m["df"] = df_concentracao
+
+            col_h1, col_h2 = st.columns([2, 1])
+            with col_h1:
+                fig_concentracao = figura_em_cache(
+                    cache_figuras,
+                    ("fig_concentracao", versao_base, estado_filtros, ano_selecionado, n_clientes),
+                    lambda: linha_por_grupo(
+                        df_concentracao,
+                        x="Mes_Ano",
+                        y="Pct_Top",
+                        cor="Assessor",
+                        titulo=f"Fatia dos {n_clientes} maiores clientes na comissão do mês",
+                        labels={"Mes_Ano": "Mês", "Pct_Top": "Fatia dos maiores clientes"},
+                        top_n=None,
+                    ),
+                )
+                st.plotly_chart(fig_concentracao, use_container_width=True)
+
+            with col_h2:
+                st.markdown(f"Concentração em {mes_selecionado}")
+                tabela_concentracao = df_concentracao[
+                    df_concentracao["Mes_Ano"] == mes_selecionado
+                ].sort_values("Pct_Top", ascending=False)
+                st.dataframe(pd.DataFrame({
+                    "Assessor": tabela_concentracao["Assessor"],
+                    "Clientes": tabela_concentracao["Clientes"],
+                    f"% top {n_clientes}": tabela_concentracao["Pct_Top"].apply(
+                        lambda x: f"{x*100:.1f}%"
+                    ),
+                    "HHI": tabela_concentracao["HHI"].round(3),
+                }).reset_index(drop=True))
+
+            assessor_pareto = st.selectbox(
+                "Curva de Pareto do assessor",
+                options=sorted(df_conta_ano["Assessor"].unique()),
+            )
+            df_pareto = concentracao.pareto(df_conta_ano, assessor_pareto)
+            st.plotly_chart(
+                linha_simples(
+                    df_pareto,
+                    x="Pct_Clientes",
+                    y="Pct_Comissao",
+                    titulo=f"Comissão acumulada por fração dos clientes em {ano_selecionado}",
+                    labels={"Pct_Clientes": "Fração dos clientes", "Pct_Comissao": "Fração da comissão"},
+                ).update_xaxes(type="linear"),
+                use_container_width=True,
+            )
+
+        # =========================
+        # Coortes de clientes
+        # =========================
+
+        st.subheader("Coortes de clientes")
+        st.caption(
+            "Cada conta entra na coorte do primeiro mês em que aparece na base "
+            "carregada; contas anteriores ao primeiro relatório ficam na coorte dele."
+        )
+
+        with medicao.etapa("coortes"):
+            df_coortes, _ = cache_compartilhado.reservar(
+                ("coortes", versao_base), lambda: coortes.coortes(df_conta)
+            )
+        df_coortes_sel = df_coortes[df_coortes["Assessor"].isin(assessores_selecionados)]
+
+        fatia_novas = coortes.fatia_coortes_do_ano(df_coortes_sel, mes_selecionado)
+        if fatia_novas is not None:
+            st.metric(
+                f"Comissão de {mes_selecionado} vinda de contas que começaram em {ano_selecionado}",
+                f"{fatia_novas*100:.1f}%",
+            )
+
+        tabela_coorte = coortes.tabela_coortes(df_coortes_sel)
+        if not tabela_coorte.empty:
+            fig_coortes = figura_em_cache(
+                cache_figuras,
+                ("fig_coortes", versao_base, tuple(assessores_selecionados)),
+                lambda: mapa_calor(
+                    tabela_coorte,
+                    titulo="Comissão por coorte (primeiro mês da conta) e mês",
+                    labels={"x": "Mês", "y": "Coorte", "color": "Comissão"},
+                ),
+            )
+            st.plotly_chart(fig_coortes, use_container_width=True)
+
+            with st.expander("Tabela de coortes"):
+                contas_coorte = coortes.tabela_coortes(df_coortes_sel, valor="Contas")
+                st.dataframe(tabela_coorte.map(
+                    lambda x: "" if pd.isna(x) else formata_brl(x)
+                ))
+                st.markdown("Contas com receita por coorte e mês (somando os assessores)")
+                st.dataframe(contas_coorte.map(lambda x: "" if pd.isna(x) else f"{x:.0f}"))
+
+
+# =========================
+# Painel de desempenho
+# =========================
+
+finalizar_medicao()
@@ -0,0 +1,40 @@
+import pandas as pd
+
+from nucleo.anomalias import anomalias
+
+
+def _cubo(valores_por_assessor, inicio="2024-01"):
+    meses = pd.period_range(inicio, periods=len(next(iter(valores_por_assessor.values()))), freq="M")
+    return pd.DataFrame([
+        {"Assessor": assessor, "Mes_Ano": mes.strftime("%Y-%m"), "Comissao": valor}
+        for assessor, valores in valores_por_assessor.items()
+        for mes, valor in zip(meses, valores)
+    ])
+
+
+def _alertas(resultado, assessor):
+    return resultado.loc[resultado["Assessor"] == assessor, "Alerta"].tolist()
+
+
+def test_serie_estavel_com_pequena_queda_nao_gera_alerta():
+    resultado = anomalias(_cubo({"A": [1000.0] * 8 + [999.0]}), "Assessor")
+    assert _alertas(resultado, "A") == [""] * 9
+    assert resultado["Z"].abs().max() < 1
+
+
+def test_serie_estavel_que_zera_gera_queda():
+    resultado = anomalias(_cubo({"A": [1000.0] * 8 + [0.0]}), "Assessor")
+    assert _alertas(resultado, "A")[-1] == "queda"
+
+
+def test_assessor_novo_nao_gera_alta():
+    # "B" só entra no sétimo mês; antes disso a grade é preenchida com zeros
+    resultado = anomalias(
+        _cubo({
+            "A": [1000.0] * 10,
+            "B": [0.0] * 6 + [500.0, 520.0, 510.0, 505.0],
+        }),
+        "Assessor",
+    )
+    assert _alertas(resultado, "B") == [""] * 10
+    assert not resultado["Z"].isin([float("inf"), float("-inf")]).any()
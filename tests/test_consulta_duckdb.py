@@ -0,0 +1,68 @@
+import pandas as pd
+import pytest
+
+from nucleo import armazem, consulta_duckdb, series
+
+pytest.importorskip("duckdb")
+
+
+def _gravar(raiz):
+    competencia = pd.to_datetime(["2025-01-10", "2025-01-20", "2025-02-05"])
+    df = pd.DataFrame({
+        "Data_Receita": competencia,
+        "Conta": ["1", "2", "1"],
+        "Assessor": ["A", "B", "A"],
+        "Categoria": ["RENDA FIXA", "COE", "RENDA FIXA"],
+        "Comissao": [10.0, 20.0, 30.0],
+        "Receita_Liquida": [100.0, 200.0, 300.0],
+        "Ano": competencia.year,
+        "Mes": competencia.month,
+        "Mes_Ano": competencia.strftime("%Y-%m"),
+    })
+    armazem.gravar_arquivo(raiz, "detalhado/a.xlsx", "detalhado", df, {"hash": "a"})
+
+
+def test_linhas_do_duckdb_tem_as_mesmas_colunas_do_pandas(tmp_path):
+    _gravar(tmp_path)
+    pandas = pd.concat(armazem.ler_tipo(tmp_path, "detalhado"), ignore_index=True)
+    duckdb = consulta_duckdb.linhas(tmp_path)
+
+    assert sorted(duckdb.columns) == sorted(pandas.columns)
+    assert sorted(duckdb["Mes"]) == sorted(pandas["Mes"])
+    assert sorted(duckdb["Mes_Ano"]) == sorted(pandas["Mes_Ano"])
+
+
+def test_filtro_de_mes_continua_podando_as_partes(tmp_path):
+    _gravar(tmp_path)
+    duckdb = consulta_duckdb.linhas(tmp_path, {"Mes_Ano": ["2025-02"]})
+    assert duckdb["Mes_Ano"].tolist() == ["2025-02"]
+
+
+def test_soma_diaria_do_duckdb_bate_com_a_do_pandas(tmp_path):
+    _gravar(tmp_path)
+    pandas = series.diario(pd.concat(armazem.ler_tipo(tmp_path, "detalhado"), ignore_index=True))
+    duckdb = consulta_duckdb.agregar(
+        tmp_path, ["Data"] + series.CHAVES, valor=series.VALORES
+    )
+
+    assert duckdb.columns.tolist() == pandas.columns.tolist()
+    pd.testing.assert_frame_equal(
+        series.series(duckdb)[("D", "Assessor")],
+        series.series(pandas)[("D", "Assessor")],
+        check_dtype=False,
+    )
+
+
+def test_intervalo_de_datas_inclui_o_ultimo_dia(tmp_path):
+    _gravar(tmp_path)
+    soma = consulta_duckdb.agregar(tmp_path, ["Assessor"], datas=("2025-01-15", "2025-02-05"))
+    assert soma.values.tolist() == [["A", 30.0], ["B", 20.0]]
+    assert consulta_duckdb.limites_datas(tmp_path) == (
+        pd.Timestamp("2025-01-10"), pd.Timestamp("2025-02-05")
+    )
+
+
+def test_linhas_da_conta_aceitam_o_ponto_zero_do_excel(tmp_path):
+    _gravar(tmp_path)
+    linhas = consulta_duckdb.linhas_da_conta(tmp_path, "1.0")
+    assert sorted(linhas["Comissao"]) == [10.0, 30.0]
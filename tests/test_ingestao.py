@@ -0,0 +1,34 @@
+import pandas as pd
+
+from nucleo.ingestao import conferir_subtotais
+
+
+def _relatorio(linhas):
+    return pd.DataFrame(linhas, columns=["Assessor", "Conta", "Receita_Liquida", "Comissao"])
+
+
+def _assessor(nome, comissao_subtotal=5.0):
+    # subtotal na primeira linha do assessor, contas logo abaixo
+    return [
+        [nome, None, 50.0, comissao_subtotal],
+        [None, 1001, 25.0, 2.5],
+        [None, 1002, 25.0, 2.5],
+    ]
+
+
+def test_subtotais_que_batem_nao_geram_divergencia():
+    df = _relatorio([["Assessor Principal", "Conta", "Receita", "Comissão"]] + _assessor("A"))
+    assert conferir_subtotais(df, "Receita_Liquida", "Comissao").empty
+
+
+def test_subtotal_alterado_gera_divergencia():
+    df = _relatorio(_assessor("A") + _assessor("B", comissao_subtotal=6.0))
+    divergencias = conferir_subtotais(df, "Receita_Liquida", "Comissao")
+
+    assert divergencias[["Assessor", "Coluna"]].values.tolist() == [["B", "Comissao"]]
+    assert divergencias["Diferenca"].iloc[0] == -1.0
+
+
+def test_linha_de_total_sem_contas_nao_gera_divergencia():
+    df = _relatorio(_assessor("A") + _assessor("B") + [["Total", None, 100.0, 10.0]])
+    assert conferir_subtotais(df, "Receita_Liquida", "Comissao").empty